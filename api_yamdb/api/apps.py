@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .cache import bump_epoch
+        from .signals import connect_signals
+
+        connect_signals()
+        post_migrate.connect(bump_epoch, sender=self)
@@ -0,0 +1,126 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+CATALOGUE = 'catalogue'
+EPOCH = 'epoch'
+VERSION_KEY_TEMPLATE = 'version:{}'
+
+
+def get_cache():
+    return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+
+def get_versions_cache():
+    """Общий для воркеров кеш версий (settings.CACHE_VERSIONS_ALIAS)."""
+    return caches[settings.CACHE_VERSIONS_ALIAS]
+
+
+def now_version():
+    return time.time_ns() // 1000
+
+
+def get_version(name):
+    """
+    Версия коллекции — время последнего изменения в микросекундах.
+    Если счётчик вытеснен из кеша, версия начинается с текущего времени и
+    не совпадает ни с одной из выданных раньше.
+    """
+    cache = get_versions_cache()
+    key = VERSION_KEY_TEMPLATE.format(name)
+    version = cache.get(key)
+    if version is None:
+        now = now_version()
+        cache.add(key, now, None)
+        version = cache.get(key) or now
+    return version
+
+
+def bump_version(name):
+    """
+    Увеличивает версию не меньше чем до текущего времени через incr:
+    на бэкендах с атомарным incr одновременные изменения не теряются.
+    """
+    cache = get_versions_cache()
+    key = VERSION_KEY_TEMPLATE.format(name)
+    now = now_version()
+    if cache.add(key, now, None):
+        return
+    current = cache.get(key) or 0
+    try:
+        cache.incr(key, max(1, now - current))
+    except ValueError:
+        # Ключ вытеснен между add и incr.
+        cache.add(key, now, None)
+
+
+def collection_version(name):
+    """Версия коллекции с учётом эпохи, общей для всех коллекций."""
+    return max(get_version(name), get_version(EPOCH))
+
+
+def catalogue_version():
+    return collection_version(CATALOGUE)
+
+
+def bump_catalogue_version(**kwargs):
+    """Делает недействительными все закешированные ответы каталога."""
+    bump_version(CATALOGUE)
+
+
+def bump_epoch(**kwargs):
+    """Сбрасывает версии всех коллекций: после миграций и массовых загрузок."""
+    bump_version(EPOCH)
+
+
+REVIEWS = 'reviews:{title_id}'
+COMMENTS = 'comments:{review_id}'
+
+
+def reviews_version(title_id):
+    return REVIEWS.format(title_id=title_id)
+
+
+def comments_version(review_id):
+    return COMMENTS.format(review_id=review_id)
+
+
+def recommendations_key(user_id):
+    return f'recommendations:{user_id}'
+
+
+def forget_cached_recommendations(sender, instance, **kwargs):
+    """Новый или изменённый отзыв меняет рекомендации автора."""
+    get_cache().delete(recommendations_key(instance.author_id))
+
+
+def forget_recomputed_recommendations(sender, user_ids, **kwargs):
+    """Пересчитанные рекомендации заменяют закешированные."""
+    get_cache().delete_many(
+        [recommendations_key(user_id) for user_id in user_ids]
+    )
+
+
+def is_cacheable(request):
+    return request.method == 'GET' and not request.user.is_authenticated
+
+
+def request_fingerprint(request):
+    """Хеш хоста, пути и отсортированных непустых параметров запроса."""
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values if value != ''
+    )
+    raw = '|'.join((
+        request.get_host(),
+        request.path,
+        '&'.join(f'{name}={value}' for name, value in params),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def response_cache_key(request):
+    return f'catalogue:{catalogue_version()}:{request_fingerprint(request)}'
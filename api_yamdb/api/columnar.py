@@ -0,0 +1,191 @@
+"""
+Компактный колоночный формат выгрузки (YCOL) на `array` и `struct`.
+
+Используется, если не установлен pyarrow (для Parquet). Все числа
+little-endian.
+
+Файл::
+
+    magic      4 байта   b'YCOL'
+    version    uint8     1
+    columns    uint16    число колонок
+    для каждой колонки:
+        name_len  uint8, затем имя в UTF-8
+        type      uint8, код типа (см. ниже)
+    группы строк, каждая:
+        rows      uint32, > 0
+        для каждой колонки:
+            has_nulls  uint8; если 1, далее ceil(rows / 8) байт маски,
+                       бит i (младший бит первого байта — строка 0)
+                       равен 1, если значение NULL
+            данные
+    uint32 0 — конец файла.
+
+Данные колонки (NULL хранится как 0 или пустая строка):
+
+    1 int8, 2 int16, 3 int32, 4 int64 — `rows` целых со знаком;
+    5 timestamp — int64, микросекунды от 1970-01-01T00:00:00Z;
+    6 string — (rows + 1) смещений uint32, затем байты UTF-8:
+      значение i — байты [offset[i], offset[i + 1]).
+"""
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+MAGIC = b'YCOL'
+VERSION = 1
+
+INT8, INT16, INT32, INT64, TIMESTAMP, STRING = range(1, 7)
+TYPECODES = {INT8: 'b', INT16: 'h', INT32: 'i', INT64: 'q', TIMESTAMP: 'q'}
+OFFSET_TYPECODE = 'I'
+
+# Типы колонок по типу поля в базе; остальные поля выгружаются строками.
+FIELD_TYPES = {
+    'SmallAutoField': INT16,
+    'SmallIntegerField': INT16,
+    'PositiveSmallIntegerField': INT16,
+    'AutoField': INT32,
+    'IntegerField': INT32,
+    'PositiveIntegerField': INT32,
+    'BigAutoField': INT64,
+    'BigIntegerField': INT64,
+    'PositiveBigIntegerField': INT64,
+    'DateTimeField': TIMESTAMP,
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+HEADER = struct.Struct('<4sBH')
+ROWS = struct.Struct('<I')
+
+
+def column_type(field):
+    """Код типа колонки для поля модели (внешний ключ — по целевому)."""
+    if field.is_relation:
+        field = field.target_field
+    return FIELD_TYPES.get(field.get_internal_type(), STRING)
+
+
+def row_groups(rows, size):
+    rows = iter(rows)
+    while True:
+        group = list(islice(rows, size))
+        if not group:
+            return
+        yield group
+
+
+def little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def null_mask(values):
+    mask = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value is None:
+            mask[index // 8] |= 1 << index % 8
+    return bytes(mask)
+
+
+def encode_column(type_code, values):
+    has_nulls = any(value is None for value in values)
+    parts = [bytes((has_nulls, ))]
+    if has_nulls:
+        parts.append(null_mask(values))
+    if type_code == STRING:
+        offsets = array(OFFSET_TYPECODE, [0])
+        data = bytearray()
+        for value in values:
+            if value is not None:
+                data += str(value).encode()
+            offsets.append(len(data))
+        parts += [little_endian(offsets), bytes(data)]
+        return b''.join(parts)
+    if type_code == TIMESTAMP:
+        values = [
+            None if value is None else (value - EPOCH) // MICROSECOND
+            for value in values
+        ]
+    parts.append(little_endian(array(
+        TYPECODES[type_code],
+        (0 if value is None else value for value in values)
+    )))
+    return b''.join(parts)
+
+
+def encode(columns, types, rows, row_group_size=10000):
+    """Поток байтов YCOL; в памяти одновременно не больше одной группы."""
+    header = [HEADER.pack(MAGIC, VERSION, len(columns))]
+    for name, type_code in zip(columns, types):
+        encoded = name.encode()
+        header.append(bytes((len(encoded), )) + encoded + bytes((type_code, )))
+    yield b''.join(header)
+    for group in row_groups(rows, row_group_size):
+        yield ROWS.pack(len(group)) + b''.join(
+            encode_column(type_code, values)
+            for type_code, values in zip(types, zip(*group))
+        )
+    yield ROWS.pack(0)
+
+
+class Reader:
+    """Чтение YCOL из файлоподобного объекта по группам строк."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        magic, version, count = HEADER.unpack(self.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Это не файл YCOL версии 1')
+        self.columns, self.types = [], []
+        for _ in range(count):
+            name = self.read(self.read(1)[0]).decode()
+            self.columns.append(name)
+            self.types.append(self.read(1)[0])
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if len(data) != size:
+            raise ValueError('Файл YCOL обрезан')
+        return data
+
+    def read_array(self, typecode, count):
+        values = array(typecode)
+        values.frombytes(self.read(values.itemsize * count))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def read_column(self, type_code, rows):
+        mask = self.read((rows + 7) // 8) if self.read(1)[0] else None
+        if type_code == STRING:
+            offsets = self.read_array(OFFSET_TYPECODE, rows + 1)
+            data = self.read(offsets[-1])
+            values = [
+                data[offsets[index]:offsets[index + 1]].decode()
+                for index in range(rows)
+            ]
+        else:
+            values = self.read_array(TYPECODES[type_code], rows).tolist()
+            if type_code == TIMESTAMP:
+                values = [EPOCH + value * MICROSECOND for value in values]
+        if mask is not None:
+            for index in range(rows):
+                if mask[index // 8] >> index % 8 & 1:
+                    values[index] = None
+        return values
+
+    def __iter__(self):
+        """Группы строк в виде словарей {колонка: список значений}."""
+        while True:
+            (rows, ) = ROWS.unpack(self.read(ROWS.size))
+            if not rows:
+                return
+            yield {
+                name: self.read_column(type_code, rows)
+                for name, type_code in zip(self.columns, self.types)
+            }
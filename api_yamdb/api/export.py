@@ -0,0 +1,84 @@
+"""
+Потоковая выгрузка таблиц для администраторов.
+
+Строки читаются через values_list().iterator(chunk_size) и сразу
+отдаются в StreamingHttpResponse, поэтому расход памяти не зависит от
+размера таблицы, в отличие от экспорта в админке через tablib.
+Колоночные форматы получают типы колонок по полям моделей.
+"""
+from collections import namedtuple
+
+from reviews.models import Comments, Review, Title
+
+from .columnar import column_type
+from .filters import (CommentsExportFilter, GenreTitleExportFilter,
+                      ReviewExportFilter, TitleFilter)
+
+ExportSource = namedtuple(
+    'ExportSource', ('queryset', 'columns', 'filterset_class')
+)
+
+EXPORT_SOURCES = {
+    'titles': ExportSource(
+        Title.objects.all(),
+        {
+            'id': 'id',
+            'name': 'name',
+            'year': 'year',
+            'description': 'description',
+            'category': 'category__slug',
+            'rating': 'rating',
+            'reviews_count': 'reviews_count',
+        },
+        TitleFilter,
+    ),
+    'reviews': ExportSource(
+        Review.objects.all(),
+        {
+            'id': 'id',
+            'title_id': 'title_id',
+            'author': 'author__username',
+            'text': 'text',
+            'score': 'score',
+            'pub_date': 'pub_date',
+        },
+        ReviewExportFilter,
+    ),
+    'comments': ExportSource(
+        Comments.objects.all(),
+        {
+            'id': 'id',
+            'title_id': 'review__title_id',
+            'review_id': 'review_id',
+            'author': 'author__username',
+            'text': 'text',
+            'pub_date': 'pub_date',
+        },
+        CommentsExportFilter,
+    ),
+    'genre_title': ExportSource(
+        Title.genre.through.objects.all(),
+        {
+            'id': 'id',
+            'title_id': 'title_id',
+            'genre_id': 'genre_id',
+        },
+        GenreTitleExportFilter,
+    ),
+}
+
+
+def lookup_field(model, lookup):
+    """Поле модели, на которое указывает путь вида `author__username`."""
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def column_types(source, columns):
+    model = source.queryset.model
+    return [
+        column_type(lookup_field(model, source.columns[name]))
+        for name in columns
+    ]
@@ -1,28 +1,108 @@
+from django.db.models import Count
 from django_filters import rest_framework as filters
 
-from reviews.models import Title
+from reviews.models import Comments, Review, Title
+from reviews.search import get_backend
+
+GENRE_MODE_OR = 'or'
+GENRE_MODE_AND = 'and'
 
 
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(
+    """
+    Точные фильтры по slug и году используют индексы, поиск по подстроке
+    доступен отдельными параметрами `*_contains`.
+    """
+    category = filters.CharFilter(field_name='category__slug')
+    category_contains = filters.CharFilter(
         field_name='category__slug',
         lookup_expr='icontains'
     )
-    genre = filters.CharFilter(
+    genre = filters.CharFilter(method='filter_genre')
+    genre_mode = filters.ChoiceFilter(
+        choices=((GENRE_MODE_OR, 'Любой из жанров'),
+                 (GENRE_MODE_AND, 'Все жанры')),
+        method='filter_genre_mode'
+    )
+    genre_contains = filters.CharFilter(
         field_name='genre__slug',
-        lookup_expr='icontains'
+        lookup_expr='icontains',
+        distinct=True
     )
     name = filters.CharFilter(
         field_name='name',
         lookup_expr='icontains'
     )
-    year = filters.NumberFilter(
-        field_name='year',
-        lookup_expr='icontains'
-    )
+    search = filters.CharFilter(method='filter_search')
+    year = filters.NumberFilter(field_name='year')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
 
     class Meta:
         model = Title
-        fields = ('id', 'category',
-                  'genre', 'name',
-                  'year', 'description')
+        fields = ('id', 'category', 'category_contains',
+                  'genre', 'genre_mode', 'genre_contains', 'name', 'search',
+                  'year', 'year_min', 'year_max', 'description')
+
+    def filter_genre(self, queryset, name, value):
+        """`genre=a,b`: произведения с любым (или всеми) из жанров."""
+        slugs = {slug.strip() for slug in value.split(',') if slug.strip()}
+        if not slugs:
+            return queryset
+        links = Title.genre.through.objects.filter(genre__slug__in=slugs)
+        if self.data.get('genre_mode') == GENRE_MODE_AND:
+            links = links.values('title_id').annotate(
+                genres=Count('genre_id', distinct=True)
+            ).filter(genres=len(slugs))
+        return queryset.filter(pk__in=links.values('title_id'))
+
+    def filter_genre_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию."""
+        return queryset.filter(pk__in=get_backend().title_ids(value))
+
+
+class ReviewExportFilter(filters.FilterSet):
+    title = filters.NumberFilter(field_name='title_id')
+    author = filters.CharFilter(field_name='author__username')
+    score_min = filters.NumberFilter(field_name='score', lookup_expr='gte')
+    score_max = filters.NumberFilter(field_name='score', lookup_expr='lte')
+    pub_date_after = filters.IsoDateTimeFilter(
+        field_name='pub_date', lookup_expr='gte'
+    )
+    pub_date_before = filters.IsoDateTimeFilter(
+        field_name='pub_date', lookup_expr='lt'
+    )
+
+    class Meta:
+        model = Review
+        fields = ('title', 'author', 'score', 'score_min', 'score_max',
+                  'pub_date_after', 'pub_date_before')
+
+
+class CommentsExportFilter(filters.FilterSet):
+    title = filters.NumberFilter(field_name='review__title_id')
+    review = filters.NumberFilter(field_name='review_id')
+    author = filters.CharFilter(field_name='author__username')
+    pub_date_after = filters.IsoDateTimeFilter(
+        field_name='pub_date', lookup_expr='gte'
+    )
+    pub_date_before = filters.IsoDateTimeFilter(
+        field_name='pub_date', lookup_expr='lt'
+    )
+
+    class Meta:
+        model = Comments
+        fields = ('title', 'review', 'author', 'pub_date_after',
+                  'pub_date_before')
+
+
+class GenreTitleExportFilter(filters.FilterSet):
+    title = filters.NumberFilter(field_name='title_id')
+    genre = filters.CharFilter(field_name='genre__slug')
+
+    class Meta:
+        model = Title.genre.through
+        fields = ('title', 'genre')
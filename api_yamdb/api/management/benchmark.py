@@ -0,0 +1,64 @@
+import timeit
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from reviews.models import Category, Comments, Genre, Review, Title
+
+User = get_user_model()
+PREFIX = 'benchmark'
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def benchmark_data(items):
+    """
+    Создаёт `items` произведений с жанрами и `items` отзывов и комментариев
+    к последнему из них; по выходе из блока всё откатывается.
+    """
+    try:
+        with transaction.atomic():
+            category = Category.objects.create(name=PREFIX, slug=PREFIX)
+            genres = [
+                Genre.objects.create(
+                    name=f'Жанр {idx}', slug=f'{PREFIX}-{idx}'
+                )
+                for idx in range(3)
+            ]
+            title = None
+            for idx in range(items):
+                title = Title.objects.create(
+                    name=f'Произведение {idx}', year=2000,
+                    category=category,
+                    description='Описание произведения ' * 5,
+                )
+                title.genre.set(genres)
+            review = None
+            for idx in range(items):
+                author = User.objects.create(
+                    username=f'{PREFIX}-{idx}',
+                    email=f'{PREFIX}-{idx}@yamdb.fake',
+                )
+                review = Review.objects.create(
+                    title=title, author=author, score=idx % 10 + 1,
+                    text='Текст отзыва ' * 20,
+                )
+            for author in User.objects.filter(
+                username__startswith=f'{PREFIX}-'
+            ):
+                Comments.objects.create(
+                    review=review, author=author, text='Комментарий ' * 10
+                )
+            yield category, title, review
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def rate(func, number, repeat=3):
+    """Лучшее число вызовов func в секунду из `repeat` замеров."""
+    return number / min(timeit.repeat(func, number=number, repeat=repeat))
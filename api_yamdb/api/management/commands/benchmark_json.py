@@ -0,0 +1,66 @@
+import io
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.management.benchmark import benchmark_data, rate
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import ReviewSerializer, TitleReadSerializer
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость стандартного и быстрого JSON-рендерера и '
+        'парсера на страницах TitleReadSerializer и ReviewSerializer. '
+        'Тестовые данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен: FastJSONRenderer использует '
+                'стандартный json.'
+            ))
+        with benchmark_data(options['items']) as (category, title, _):
+            titles = Title.objects.filter(
+                category=category
+            ).select_related('category').prefetch_related('genre')
+            payloads = {
+                'TitleReadSerializer': TitleReadSerializer(
+                    titles, many=True
+                ).data,
+                'ReviewSerializer': ReviewSerializer(
+                    title.reviews.select_related('author'), many=True
+                ).data,
+            }
+        repeat = options['repeat']
+        for name, data in payloads.items():
+            self.stdout.write(f'{name}, {options["items"]} объектов:')
+            self.compare(
+                'render',
+                lambda: JSONRenderer().render(data),
+                lambda: FastJSONRenderer().render(data),
+                repeat,
+            )
+            body = JSONRenderer().render(data)
+            self.compare(
+                'parse',
+                lambda: JSONParser().parse(io.BytesIO(body)),
+                lambda: FastJSONParser().parse(io.BytesIO(body)),
+                repeat,
+            )
+
+    def compare(self, label, default, fast, repeat):
+        default_rate = rate(default, repeat)
+        fast_rate = rate(fast, repeat)
+        self.stdout.write(
+            f'  {label}: json {default_rate:.0f}/с, '
+            f'fast {fast_rate:.0f}/с, x{fast_rate / default_rate:.2f}'
+        )
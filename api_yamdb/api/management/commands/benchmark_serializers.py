@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.management.benchmark import benchmark_data, rate
+from api.serializers import (
+    CommentsSerializer, CommentsValuesSerializer, ReviewSerializer,
+    ReviewValuesSerializer, TitleReadSerializer, TitleValuesSerializer
+)
+from api.views import TitleViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стоимость строки для ModelSerializer и values()-'
+        'сериализаторов списков, включая запросы к БД, и проверяет, что '
+        'их JSON совпадает.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        items, repeat = options['items'], options['repeat']
+        with benchmark_data(items) as (category, title, review):
+            cases = (
+                (
+                    'Title',
+                    TitleViewSet.queryset.filter(category=category),
+                    TitleReadSerializer, TitleValuesSerializer,
+                ),
+                (
+                    'Review',
+                    title.reviews.select_related('author'),
+                    ReviewSerializer, ReviewValuesSerializer,
+                ),
+                (
+                    'Comments',
+                    review.comments.select_related('author'),
+                    CommentsSerializer, CommentsValuesSerializer,
+                ),
+            )
+            for name, queryset, model_serializer, values_serializer in cases:
+                self.compare(
+                    name, queryset, model_serializer, values_serializer,
+                    items, repeat
+                )
+
+    def compare(self, name, queryset, model_serializer, values_serializer,
+                items, repeat):
+        def model_path():
+            return model_serializer(queryset.all(), many=True).data
+
+        def values_path():
+            return values_serializer(
+                values_serializer.values_queryset(queryset.all())
+            ).data
+
+        renderer = JSONRenderer()
+        identical = (
+            renderer.render(model_path()) == renderer.render(values_path())
+        )
+        model_rate = rate(model_path, repeat) * items
+        values_rate = rate(values_path, repeat) * items
+        self.stdout.write(
+            f'{name}: ModelSerializer {1e6 / model_rate:.1f} мкс/строка, '
+            f'values {1e6 / values_rate:.1f} мкс/строка, '
+            f'x{values_rate / model_rate:.2f}, '
+            f'вывод {"совпадает" if identical else "РАЗЛИЧАЕТСЯ"}'
+        )
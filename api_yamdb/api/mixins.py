@@ -1,8 +1,194 @@
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from .cache import (collection_version, get_cache, is_cacheable,
+                    request_fingerprint, response_cache_key)
+
 
 class BasaModelViewMixin(CreateModelMixin, ListModelMixin,
                          DestroyModelMixin, GenericViewSet):
     pass
+
+
+class CatalogueCacheMixin:
+    """Кеширует ответы list для анонимных GET-запросов."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, timeout=None,
+                        **kwargs):
+        """
+        Ответ из кеша каталога; `timeout` по умолчанию —
+        CATALOGUE_CACHE_TIMEOUT.
+        """
+        if not is_cacheable(request):
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                key, response.data,
+                settings.CATALOGUE_CACHE_TIMEOUT if timeout is None
+                else timeout
+            )
+            response['X-Cache'] = 'MISS'
+        return response
+
+
+class CatalogueDetailCacheMixin(CatalogueCacheMixin):
+    """Кеширует также ответы retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalRequestMixin:
+    """
+    ETag и Last-Modified из версии коллекции, без сериализации ответа:
+    304 на If-None-Match/If-Modified-Since и 412 на устаревший If-Match.
+    Версия меняется при любом изменении коллекции, поэтому If-Match
+    строже, чем нужно, но изменения не теряются.
+
+    `version_name` — имя версии коллекции из api.cache; может ссылаться
+    на параметры URL: 'reviews:{title_id}'.
+    """
+    precondition_failed_message = (
+        'Объект изменился с момента последнего запроса'
+    )
+    version_name = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if issubclass(cls, GenericViewSet) and cls.version_name is None:
+            raise ImproperlyConfigured(
+                f'{cls.__name__}: не задан version_name для '
+                'ConditionalRequestMixin'
+            )
+
+    def get_version_name(self):
+        return self.version_name.format(**self.kwargs)
+
+    def get_validators(self, request):
+        version = collection_version(self.get_version_name())
+        digest = hashlib.md5(
+            f'{version}:{request_fingerprint(request)}'.encode()
+        ).hexdigest()
+        return quote_etag(digest), version // 10 ** 6
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        conditional = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if conditional is not None:
+            if conditional.status_code == status.HTTP_412_PRECONDITION_FAILED:
+                return Response(
+                    {'detail': self.precondition_failed_message},
+                    status=status.HTTP_412_PRECONDITION_FAILED
+                )
+            return self.set_validators(
+                Response(status=status.HTTP_304_NOT_MODIFIED),
+                etag, last_modified
+            )
+        response = handler(request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        if request.method not in ('GET', 'HEAD'):
+            etag, last_modified = self.get_validators(request)
+        return self.set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def update(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().update, request, *args, **kwargs
+        )
+
+    def destroy(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().destroy, request, *args, **kwargs
+        )
+
+
+class ValuesListMixin:
+    """list() через `values_serializer_class` вместо ModelSerializer."""
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.values_serializer_class
+        context = self.get_serializer_context()
+        rows = serializer_class.values_queryset(
+            self.filter_queryset(self.get_queryset()), context
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer_class(page, context).data
+            )
+        return Response(serializer_class(rows, context).data)
+
+
+class NestedParentMixin:
+    """
+    Вложенный маршрут (titles/<id>/reviews и т. п.): родитель из URL
+    ищется не больше одного раза за запрос. Отдельный объект ищется сразу
+    с условием на родителя, без запроса самого родителя.
+
+    `parent_field` — поле модели, ссылающееся на родителя;
+    `parent_lookups` — {поле родителя: параметр URL}.
+    """
+    parent_model = None
+    parent_field = None
+    parent_lookups = {}
+
+    def get_parent_filter(self):
+        return {
+            field: self.kwargs[kwarg]
+            for field, kwarg in self.parent_lookups.items()
+        }
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.parent_model, **self.get_parent_filter()
+            )
+        return self._parent
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if (self.lookup_url_kwarg or self.lookup_field) in self.kwargs:
+            return queryset.filter(**{
+                f'{self.parent_field}__{field}': value
+                for field, value in self.get_parent_filter().items()
+            })
+        return queryset.filter(**{self.parent_field: self.get_parent()})
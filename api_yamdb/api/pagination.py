@@ -0,0 +1,181 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+def encode_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Пагинация по ключу: следующая страница выбирается условием
+    WHERE по полям сортировки, а не OFFSET.
+
+    Сортировка берётся из `keyset_ordering` вьюсета, из queryset или из
+    `Meta.ordering` модели и дополняется `pk` для однозначности.
+    Страница может состоять из объектов или из словарей values(), если в
+    них есть все поля сортировки.
+    Параметр `offset` по-прежнему поддерживается для совместимости,
+    `count=false` отключает подсчёт общего количества объектов.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    with_count = True
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = (
+            self.cursor_query_param in request.query_params
+            or self.offset_query_param not in request.query_params
+        )
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.request = request
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset, view)
+        self.count = (
+            self.get_count(queryset) if self.count_enabled(request) else None
+        )
+        position, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = [(name, not desc) for name, desc in ordering]
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        queryset = queryset.order_by(*(
+            f'-{name}' if desc else name for name, desc in ordering
+        ))
+        page = list(queryset[:self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = page
+        return page
+
+    def count_enabled(self, request):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return self.with_count
+        return value.lower() not in FALSE_VALUES
+
+    def get_ordering(self, queryset, view):
+        model = queryset.model
+        ordering = (
+            getattr(view, 'keyset_ordering', None)
+            or queryset.query.order_by
+            or model._meta.ordering
+        )
+        result = []
+        for item in ordering:
+            if not isinstance(item, str):
+                raise ImproperlyConfigured(
+                    f'{self.__class__.__name__} поддерживает сортировку '
+                    f'только по именам полей, получено {item!r}.'
+                )
+            desc = item.startswith('-')
+            name = item.lstrip('-')
+            field = (
+                model._meta.pk if name == 'pk'
+                else model._meta.get_field(name)
+            )
+            result.append((field.attname, desc))
+        tie_breaker = model._meta.pk.attname
+        if not any(name == tie_breaker for name, _ in result):
+            result.append((tie_breaker, False))
+        return result
+
+    def keyset_filter(self, ordering, position):
+        """Условие «строго после позиции» для смешанных направлений."""
+        condition = Q()
+        equal = Q()
+        for (name, desc), value in zip(ordering, position):
+            lookup = 'lt' if desc else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        name, desc = ordering[0]
+        bound = Q(**{f'{name}__{"lte" if desc else "gte"}': position[0]})
+        return bound & condition
+
+    def get_field(self, name):
+        return next(
+            field for field in self.model._meta.concrete_fields
+            if field.attname == name
+        )
+
+    def get_position(self, obj):
+        if isinstance(obj, dict):
+            return [obj[name] for name, _ in self.ordering]
+        return [getattr(obj, name) for name, _ in self.ordering]
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps(
+            {'p': position, 'r': reverse},
+            default=encode_value, separators=(',', ':')
+        )
+        cursor = urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(
+                urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            )
+            values = payload['p']
+            reverse = bool(payload['r'])
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError,
+                binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
@@ -0,0 +1,209 @@
+import csv
+import io
+import json
+
+from django.utils.datastructures import MultiValueDict
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import columnar
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson, если он установлен.
+    Отступы (browsable API, `indent=` в Accept) и данные, которые orjson
+    не умеет кодировать, отдаются стандартному рендереру. QueryDict orjson
+    читает как словарь списков, поэтому он заранее приводится к dict().
+    """
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if isinstance(data, MultiValueDict):
+            data = data.dict()
+        try:
+            ret = orjson.dumps(
+                data, default=JSONEncoder().default, option=self.options
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat().replace('+00:00', 'Z')
+    return value
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV для потоковой выгрузки; render() нужен для ответов с ошибками."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def stream(self, columns, rows, types=None):
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([csv_value(value) for value in row])
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, list):
+            data = [data]
+        columns = list(data[0]) if data else []
+        rows = ([item.get(column) for column in columns] for item in data)
+        return ''.join(self.stream(columns, rows)).encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Объекты JSON по одному на строку (NDJSON)."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def dumps(self, item):
+        if orjson is not None:
+            try:
+                return orjson.dumps(
+                    item, default=JSONEncoder().default,
+                    option=FastJSONRenderer.options | orjson.OPT_APPEND_NEWLINE
+                )
+            except TypeError:
+                pass
+        return json.dumps(
+            item, cls=JSONEncoder, ensure_ascii=False
+        ).encode() + b'\n'
+
+    def stream(self, columns, rows, types=None):
+        for row in rows:
+            yield self.dumps(dict(zip(columns, row)))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(self.dumps(item) for item in data)
+
+
+class ColumnarRenderer(BaseRenderer):
+    """
+    Колоночный формат YCOL (описан в api/columnar.py). `types` — коды
+    типов колонок; без них (ответы с ошибками) все колонки строковые.
+    """
+    media_type = 'application/vnd.yamdb.ycol'
+    format = 'ycol'
+    charset = None
+    row_group_size = 10000
+
+    def stream(self, columns, rows, types=None):
+        return columnar.encode(
+            columns, types or [columnar.STRING] * len(columns), rows,
+            self.row_group_size
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, list):
+            data = [data]
+        columns = list(data[0]) if data else []
+        rows = ([item.get(column) for column in columns] for item in data)
+        return b''.join(self.stream(columns, rows))
+
+
+class ChunkSink(io.RawIOBase):
+    """Файл для ParquetWriter, из которого записанное забирают частями."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ParquetRenderer(ColumnarRenderer):
+    """Parquet через pyarrow; каждая группа строк пишется и отдаётся сразу."""
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+
+    @staticmethod
+    def arrow_type(type_code):
+        return {
+            columnar.INT8: pyarrow.int8(),
+            columnar.INT16: pyarrow.int16(),
+            columnar.INT32: pyarrow.int32(),
+            columnar.INT64: pyarrow.int64(),
+            columnar.TIMESTAMP: pyarrow.timestamp('us', tz='UTC'),
+        }.get(type_code, pyarrow.string())
+
+    @staticmethod
+    def arrow_array(values, arrow_type):
+        if arrow_type == pyarrow.string():
+            values = [None if item is None else str(item) for item in values]
+        return pyarrow.array(values, type=arrow_type)
+
+    def stream(self, columns, rows, types=None):
+        types = types or [columnar.STRING] * len(columns)
+        schema = pyarrow.schema([
+            (name, self.arrow_type(type_code))
+            for name, type_code in zip(columns, types)
+        ])
+        sink = ChunkSink()
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        for group in columnar.row_groups(rows, self.row_group_size):
+            writer.write_table(pyarrow.Table.from_arrays(
+                [
+                    self.arrow_array(values, field.type)
+                    for field, values in zip(schema, zip(*group))
+                ],
+                schema=schema
+            ))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+
+EXPORT_RENDERERS = (CSVRenderer, NDJSONRenderer, ColumnarRenderer) + (
+    (ParquetRenderer, ) if pyarrow is not None else ()
+)
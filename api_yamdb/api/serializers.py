@@ -1,14 +1,27 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.contrib.auth.tokens import default_token_generator
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import Category, Comments, Genre, Review, Title
+from reviews.histogram import as_histogram
+from reviews.models import (HISTOGRAM_FIELDS, Category, Comments, Genre,
+                            Review, Title)
+from reviews.rankings import ORDER_REVIEWS, ORDER_SCORE
+from reviews.changes import KINDS as CHANGE_KINDS, decode_position
+from reviews.search import KINDS
+from reviews.trending import DAY, WINDOWS
+from users.confirmation import redeem_code
 
 
 User = get_user_model()
 
+HISTOGRAM_INCLUDE = 'histogram'
+
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,20 +37,41 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
+def includes(context):
+    """Необязательные поля, запрошенные через `include=a,b`."""
+    request = context.get('request')
+    if request is None:
+        return set()
+    return {
+        name.strip()
+        for name in request.query_params.get('include', '').split(',')
+    }
+
+
 class TitleReadSerializer(serializers.ModelSerializer):
+    """Гистограмма оценок выводится только с `include=histogram`."""
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(
         read_only=True,
         many=True
     )
     rating = serializers.IntegerField(read_only=True)
+    score_histogram = serializers.SerializerMethodField()
 
     class Meta:
         fields = ('id', 'category',
                   'genre', 'name', 'year',
-                  'description', 'rating')
+                  'description', 'rating', 'score_histogram')
         model = Title
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if HISTOGRAM_INCLUDE not in includes(self.context):
+            self.fields.pop('score_histogram')
+
+    def get_score_histogram(self, title):
+        return as_histogram(title.score_counts)
+
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
@@ -59,22 +93,28 @@ class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Review."""
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
-    title = serializers.SlugRelatedField(slug_field='id',
-                                         read_only=True)
+    title = serializers.ReadOnlyField(source='title_id')
 
     class Meta:
         model = Review
         fields = ('id', 'title', 'text', 'author', 'score', 'pub_date')
 
-    def validate(self, data):
-        """Проверяет, что пользователь не оставил отзыв дважды"""
-        if self.context['request'].method == 'PATCH':
-            return data
-        title = self.context['view'].kwargs['title_id']
-        author = self.context['request'].user
-        if author.reviews.filter(title__id=title).exists():
-            raise serializers.ValidationError('Вы уже оставили отзыв')
-        return data
+    def create(self, validated_data):
+        """
+        Второй отзыв на произведение отсекает ограничение unique_review:
+        отдельного запроса на проверку нет.
+        """
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title=validated_data['title'], author=validated_data['author']
+            ).exists():
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ['Вы уже оставили отзыв']
+            })
 
 
 class CommentsSerializer(serializers.ModelSerializer):
@@ -87,6 +127,132 @@ class CommentsSerializer(serializers.ModelSerializer):
         fields = ('id', 'author', 'text', 'pub_date')
 
 
+class ValuesSerializer:
+    """
+    Сериализатор для списков без дерева полей DRF: строки берутся одним
+    запросом через values(), словари собираются напрямую. Вывод совпадает
+    с соответствующим ModelSerializer байт в байт.
+
+    `fields` — пары (ключ в ответе, колонка values()); `converters`
+    задаёт преобразование значения колонки, `extra_columns` — колонки,
+    нужные только пагинации или необязательным полям.
+    """
+    fields = ()
+    converters = {}
+    extra_columns = ()
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+
+    @classmethod
+    def get_extra_columns(cls, context):
+        return list(cls.extra_columns)
+
+    @classmethod
+    def values_queryset(cls, queryset, context=None):
+        columns = [column for _, column in cls.fields] + (
+            cls.get_extra_columns(context or {})
+        )
+        return queryset.prefetch_related(None).values(*columns)
+
+    @property
+    def data(self):
+        fields = [
+            (key, column, self.converters.get(key))
+            for key, column in self.fields
+        ]
+        return [
+            {
+                key: row[column] if convert is None else convert(row[column])
+                for key, column, convert in fields
+            }
+            for row in self.rows
+        ]
+
+
+def datetime_representation(value, field=serializers.DateTimeField()):
+    return field.to_representation(value)
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """Аналог TitleReadSerializer: категории и жанры без N+1."""
+    fields = (
+        ('id', 'id'),
+        ('name', 'name'),
+        ('year', 'year'),
+        ('description', 'description'),
+        ('rating', 'rating'),
+    )
+    extra_columns = ('category__name', 'category__slug')
+
+    @classmethod
+    def get_extra_columns(cls, context):
+        columns = super().get_extra_columns(context)
+        if HISTOGRAM_INCLUDE in includes(context):
+            columns += HISTOGRAM_FIELDS
+        return columns
+
+    @property
+    def data(self):
+        histogram = HISTOGRAM_INCLUDE in includes(self.context)
+        rows = list(self.rows)
+        genres = {row['id']: [] for row in rows}
+        links = Title.genre.through.objects.filter(
+            title_id__in=genres
+        ).order_by('genre__name').values_list(
+            'title_id', 'genre__name', 'genre__slug'
+        )
+        for title_id, name, slug in links:
+            genres[title_id].append({'name': name, 'slug': slug})
+        data = [
+            {
+                'id': row['id'],
+                'category': None if row['category__slug'] is None else {
+                    'name': row['category__name'],
+                    'slug': row['category__slug'],
+                },
+                'genre': genres[row['id']],
+                'name': row['name'],
+                'year': row['year'],
+                'description': row['description'],
+                'rating': row['rating'],
+            }
+            for row in rows
+        ]
+        if histogram:
+            for item, row in zip(data, rows):
+                item['score_histogram'] = as_histogram(
+                    [row[name] for name in HISTOGRAM_FIELDS]
+                )
+        return data
+
+
+class ReviewValuesSerializer(ValuesSerializer):
+    """Аналог ReviewSerializer для списков."""
+    fields = (
+        ('id', 'id'),
+        ('title', 'title_id'),
+        ('text', 'text'),
+        ('author', 'author__username'),
+        ('score', 'score'),
+        ('pub_date', 'pub_date'),
+    )
+    converters = {'pub_date': datetime_representation}
+
+
+class CommentsValuesSerializer(ValuesSerializer):
+    """Аналог CommentsSerializer для списков."""
+    fields = (
+        ('id', 'id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+    )
+    converters = {'pub_date': datetime_representation}
+    extra_columns = ('review_id',)
+
+
 class UserSignUpSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
         required=True,
@@ -131,16 +297,11 @@ class UserAuthTokenSerializer(serializers.Serializer):
     )
 
     def validate(self, attrs):
-        user = get_object_or_404(
-            User,
-            username=attrs['username'],
-        )
-        code = attrs['confirmation_code']
-        if (
-            user
-            and default_token_generator.check_token(user, code)
-        ):
+        user = redeem_code(attrs['username'], attrs['confirmation_code'])
+        if user is not None:
+            attrs['user'] = user
             return super().validate(attrs)
+        get_object_or_404(User.objects.only('pk'), username=attrs['username'])
         raise serializers.ValidationError(
             'Отсутствует обязательное поле или оно некорректно'
         )
@@ -164,3 +325,153 @@ class UserSerializer(serializers.ModelSerializer):
         fields = (
             'username', 'email', 'first_name', 'last_name', 'bio', 'role'
         )
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Параметры полнотекстового поиска."""
+    q = serializers.CharField(max_length=200)
+    type = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, default=20
+    )
+
+    def validate_type(self, value):
+        return parse_kinds(value, KINDS)
+
+
+class SearchHitSerializer(serializers.Serializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    title_id = serializers.IntegerField()
+    review_id = serializers.IntegerField(allow_null=True)
+    score = serializers.FloatField()
+    snippet = serializers.CharField()
+
+
+def parse_kinds(value, kinds):
+    """`a,b` → кортеж типов; пустое значение — все типы."""
+    requested = tuple(
+        kind.strip() for kind in value.split(',') if kind.strip()
+    )
+    unknown = set(requested) - set(kinds)
+    if unknown:
+        raise serializers.ValidationError(
+            f'Неизвестный тип: {", ".join(sorted(unknown))}'
+        )
+    return requested or kinds
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    """`since` — метка времени ISO 8601 или курсор из `next`."""
+    since = serializers.CharField(required=False)
+    type = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=1000, default=100
+    )
+
+    def validate_since(self, value):
+        timestamp = parse_datetime(value)
+        if timestamp is not None:
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp, timezone.utc)
+            return timestamp
+        try:
+            return decode_position(value)
+        except ValueError:
+            raise serializers.ValidationError(
+                'Ожидается метка времени ISO 8601 или курсор.'
+            )
+
+    def validate_type(self, value):
+        return parse_kinds(value, CHANGE_KINDS)
+
+
+class ChangeSerializer(serializers.Serializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    action = serializers.CharField()
+    changed_at = serializers.DateTimeField()
+    data = serializers.DictField(allow_null=True)
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    category = serializers.SlugField(required=False)
+    genre = serializers.SlugField(required=False)
+    year_min = serializers.IntegerField(required=False)
+    year_max = serializers.IntegerField(required=False)
+    order = serializers.ChoiceField(
+        choices=(ORDER_SCORE, ORDER_REVIEWS), default=ORDER_SCORE
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, default=10
+    )
+
+
+class TrendingQuerySerializer(serializers.Serializer):
+    window = serializers.ChoiceField(choices=tuple(WINDOWS), default=DAY)
+    category = serializers.SlugField(required=False)
+    genre = serializers.SlugField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, default=10
+    )
+
+
+def title_card_columns(prefix):
+    """Колонки краткого описания произведения для values_list."""
+    return tuple(f'{prefix}{name}' for name in (
+        'id', 'name', 'year', 'rating', 'category__name', 'category__slug'
+    ))
+
+
+def title_card(columns, **extra):
+    """Краткое описание произведения из колонок title_card_columns."""
+    title_id, name, year, rating, category, slug = columns
+    return {
+        'id': title_id,
+        'name': name,
+        'year': year,
+        'rating': rating,
+        'category': None if slug is None else {
+            'name': category, 'slug': slug,
+        },
+        **extra,
+    }
+
+
+class SimilarTitlesQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, default=10
+    )
+
+
+class RecommendationsQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.RECOMMENDATIONS_LIMIT, default=10
+    )
+
+
+class ScoreStatsQuerySerializer(serializers.Serializer):
+    percentiles = serializers.CharField(required=False)
+
+    def validate_percentiles(self, value):
+        try:
+            values = tuple(
+                float(item) for item in value.split(',') if item.strip()
+            )
+        except ValueError:
+            values = ()
+        if not values or any(not 0 <= item <= 100 for item in values):
+            raise serializers.ValidationError(
+                'Ожидаются числа от 0 до 100 через запятую.'
+            )
+        return values
+
+
+class ScoreStatsSerializer(serializers.Serializer):
+    histogram = serializers.DictField(child=serializers.IntegerField())
+    count = serializers.IntegerField()
+    mean = serializers.FloatField(allow_null=True)
+    median = serializers.FloatField(allow_null=True)
+    percentiles = serializers.DictField(
+        child=serializers.FloatField(allow_null=True)
+    )
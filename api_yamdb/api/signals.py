@@ -0,0 +1,40 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+
+from reviews.models import (Category, Comments, Genre, GenreTitle, Review,
+                            Title)
+from reviews.signals import data_loaded, recommendations_written
+from .cache import (bump_catalogue_version, bump_epoch, bump_version,
+                    comments_version, forget_cached_recommendations,
+                    forget_recomputed_recommendations, reviews_version)
+
+CATALOGUE_MODELS = (Title, Category, Genre, GenreTitle, Review)
+
+
+def bump_reviews_version(sender, instance, **kwargs):
+    bump_version(reviews_version(instance.title_id))
+
+
+def bump_moved_reviews_version(sender, instance, **kwargs):
+    """Отзыв переносят к другому произведению: меняется и старый список."""
+    loaded_title_id = getattr(instance, '_loaded_title_id', None)
+    if loaded_title_id not in (None, instance.title_id):
+        bump_version(reviews_version(loaded_title_id))
+
+
+def bump_comments_version(sender, instance, **kwargs):
+    bump_version(comments_version(instance.review_id))
+
+
+def connect_signals():
+    for model in CATALOGUE_MODELS:
+        post_save.connect(bump_catalogue_version, sender=model)
+        post_delete.connect(bump_catalogue_version, sender=model)
+    m2m_changed.connect(bump_catalogue_version, sender=Title.genre.through)
+    pre_save.connect(bump_moved_reviews_version, sender=Review)
+    for signal in (post_save, post_delete):
+        signal.connect(bump_reviews_version, sender=Review)
+        signal.connect(bump_comments_version, sender=Comments)
+        signal.connect(forget_cached_recommendations, sender=Review)
+    data_loaded.connect(bump_epoch)
+    recommendations_written.connect(forget_recomputed_recommendations)
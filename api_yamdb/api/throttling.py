@@ -0,0 +1,239 @@
+"""
+Ограничение частоты регистрации и получения токена.
+
+Каждый ключ (IP, имя пользователя, email) — это «ведро с токенами»:
+в нём до N токенов, за период добавляется N токенов равномерно, каждый
+запрос забирает один. Ведро хранится как (токенов, когда обновлено),
+поэтому проверка — одно чтение и одна запись по ключу. Токены
+забираются, только если их хватает во всех вёдрах запроса: отклонённый
+запрос не расходует ни одного ведра. Хранилище
+выбирается `settings.AUTH_THROTTLE_BACKEND`: 'memory' — словарь в памяти
+процесса, 'sqlite' — файл AUTH_THROTTLE_SQLITE_PATH, общий для всех
+воркеров на машине.
+"""
+import heapq
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Раз в столько проверок из хранилища удаляются вёдра, которые уже
+# наполнились: они не отличаются от отсутствующих.
+PRUNE_EVERY = 1000
+# Какая доля вёдер остаётся в переполненном хранилище в памяти.
+EVICT_KEEP = 0.9
+
+
+def parse_rate(rate):
+    """'5/hour' -> (5, 3600): ёмкость ведра и период в секундах."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def take(tokens, updated, now, capacity, period):
+    """
+    Забирает токен из ведра. Возвращает (токенов, секунд ожидания):
+    ожидание 0 — запрос разрешён.
+    """
+    refill = capacity / period
+    if tokens is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / refill
+
+
+def full_at(tokens, now, capacity, period):
+    return now + (capacity - tokens) * period / capacity
+
+
+def take_all(stored, buckets, now):
+    """
+    Забирает по токену из каждого ведра `buckets` — списка (ключ,
+    ёмкость, период); `stored` — {ключ: (токенов, когда обновлено)}.
+    Возвращает (секунд ожидания, новые вёдра): если ждать надо хотя бы
+    одного ведра, новых вёдер нет.
+    """
+    taken, waits = {}, [0]
+    for key, capacity, period in buckets:
+        tokens, wait = take(
+            *stored.get(key, (None, now)), now, capacity, period
+        )
+        waits.append(wait)
+        taken[key] = (tokens, now, full_at(tokens, now, capacity, period))
+    wait = max(waits)
+    return wait, {} if wait else taken
+
+
+class MemoryBucketStore:
+    """
+    Вёдра в памяти процесса, не больше `max_size`. В переполненном
+    хранилище удаляются наполнившиеся вёдра, а если их мало — ближайшие
+    к наполнению: удалённое ведро считается полным.
+    """
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, period, now):
+        return self.consume_all([(key, capacity, period)], now)
+
+    def consume_all(self, buckets, now):
+        with self.lock:
+            wait, taken = take_all({
+                key: self.buckets[key][:2]
+                for key, _, _ in buckets if key in self.buckets
+            }, buckets, now)
+            if len(self.buckets) + len(taken) > self.max_size:
+                self.prune(now, len(taken))
+            self.buckets.update(taken)
+        return wait
+
+    def prune(self, now, incoming):
+        """Освобождает место под `incoming` новых вёдер."""
+        buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if bucket[2] > now
+        }
+        keep = min(
+            int(self.max_size * EVICT_KEEP), self.max_size - incoming
+        )
+        if len(buckets) > keep:
+            buckets = dict(heapq.nlargest(
+                keep, buckets.items(), key=lambda item: item[1][2]
+            ))
+        self.buckets = buckets
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class SQLiteBucketStore:
+    """
+    Вёдра в файле SQLite: общие для процессов одной машины. Чтение и
+    запись вёдер запроса идут в одной транзакции BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.calls = 0
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                str(self.path), timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS throttle_bucket ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL, full_at REAL NOT NULL)'
+            )
+            self.local.connection = connection
+        return connection
+
+    def consume(self, key, capacity, period, now):
+        return self.consume_all([(key, capacity, period)], now)
+
+    def consume_all(self, buckets, now):
+        connection = self.connection()
+        keys = [key for key, _, _ in buckets]
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            wait, taken = take_all({
+                key: (tokens, updated)
+                for key, tokens, updated in connection.execute(
+                    'SELECT key, tokens, updated FROM throttle_bucket '
+                    f'WHERE key IN ({", ".join("?" * len(keys))})',
+                    keys
+                )
+            }, buckets, now)
+            connection.executemany(
+                'INSERT OR REPLACE INTO throttle_bucket '
+                'VALUES (?, ?, ?, ?)',
+                [(key, *bucket) for key, bucket in taken.items()]
+            )
+            self.calls += 1
+            if self.calls % PRUNE_EVERY == 0:
+                connection.execute(
+                    'DELETE FROM throttle_bucket WHERE full_at <= ?', (now, )
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return wait
+
+    def clear(self):
+        self.connection().execute('DELETE FROM throttle_bucket')
+
+
+_stores = {}
+
+
+def get_store():
+    """Хранилище вёдер согласно `settings.AUTH_THROTTLE_BACKEND`."""
+    choice = getattr(settings, 'AUTH_THROTTLE_BACKEND', 'memory')
+    if choice not in _stores:
+        if choice == 'sqlite':
+            _stores[choice] = SQLiteBucketStore(
+                settings.AUTH_THROTTLE_SQLITE_PATH
+            )
+        else:
+            _stores[choice] = MemoryBucketStore()
+    return _stores[choice]
+
+
+class AuthThrottle(BaseThrottle):
+    """
+    Лимиты `settings.AUTH_THROTTLE_RATES[scope]` по IP и по полям
+    запроса (username, email). Запрос отклоняется, если пусто хотя бы
+    одно ведро, и тогда не расходует ни одного; ответ 429 с
+    Retry-After формирует DRF.
+    """
+    scope = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def idents(self, request):
+        yield 'ip', self.get_ident(request)
+        if not isinstance(request.data, Mapping):
+            return
+        for field in ('username', 'email'):
+            value = request.data.get(field)
+            if isinstance(value, str) and value.strip():
+                yield field, value.strip().lower()
+
+    def allow_request(self, request, view):
+        rates = settings.AUTH_THROTTLE_RATES.get(self.scope, {})
+        buckets = [
+            (f'{self.scope}:{kind}:{ident}', *parse_rate(rates[kind]))
+            for kind, ident in self.idents(request) if kind in rates
+        ]
+        if not buckets:
+            return True
+        self.wait_seconds = get_store().consume_all(buckets, time.time())
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class SignUpThrottle(AuthThrottle):
+    scope = 'signup'
+
+
+class AuthTokenThrottle(AuthThrottle):
+    scope = 'token'
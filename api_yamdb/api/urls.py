@@ -2,8 +2,9 @@ from django.urls import path, include
 from rest_framework.routers import SimpleRouter
 
 from .views import (
-    CategoryViewSet, CommentsViewSet, GenreViewSet, ReviewViewSet,
-    TitleViewSet, UserSignUpViewSet, UserAuthTokenAPIView, UserModelViewSet
+    CategoryViewSet, ChangeFeedAPIView, CommentsViewSet, ExportAPIView,
+    GenreViewSet, ReviewViewSet, SearchAPIView, TitleViewSet,
+    UserSignUpViewSet, UserAuthTokenAPIView, UserModelViewSet
 )
 
 
@@ -28,4 +29,7 @@ auth_v1 = [
 urlpatterns = [
     path('v1/', include(router_v1.urls)),
     path('v1/auth/', include(auth_v1)),
+    path('v1/search/', SearchAPIView.as_view(), name='search'),
+    path('v1/export/<str:model>/', ExportAPIView.as_view(), name='export'),
+    path('v1/changes/', ChangeFeedAPIView.as_view(), name='changes'),
 ]
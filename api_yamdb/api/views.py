@@ -1,33 +1,55 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, views, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from .export import EXPORT_SOURCES, column_types
 from .filters import TitleFilter
-from .mixins import BasaModelViewMixin
+from .cache import (CATALOGUE, COMMENTS, REVIEWS, get_cache,
+                    recommendations_key)
+from .mixins import (
+    BasaModelViewMixin, CatalogueCacheMixin, CatalogueDetailCacheMixin,
+    ConditionalRequestMixin, NestedParentMixin, ValuesListMixin
+)
+from .pagination import KeysetPagination
+from .renderers import EXPORT_RENDERERS
+from .throttling import AuthTokenThrottle, SignUpThrottle
 from .serializers import (
-    CategorySerializer, CommentsSerializer, GenreSerializer,
-    ReviewSerializer, TitleReadSerializer, TitleWriteSerializer,
-    UserAuthTokenSerializer, UserSerializer, UserSignUpSerializer
+    CategorySerializer, ChangeFeedQuerySerializer, ChangeSerializer,
+    CommentsSerializer, CommentsValuesSerializer, GenreSerializer,
+    LeaderboardQuerySerializer, ReviewSerializer, ReviewValuesSerializer,
+    ScoreStatsQuerySerializer, ScoreStatsSerializer, SearchHitSerializer,
+    RecommendationsQuerySerializer, SearchQuerySerializer,
+    SimilarTitlesQuerySerializer, TitleReadSerializer, TitleValuesSerializer,
+    TitleWriteSerializer, TrendingQuerySerializer, UserAuthTokenSerializer,
+    UserSerializer, UserSignUpSerializer, title_card, title_card_columns
 )
-from django.conf import settings
 from .permissions import (
     IsAdmin, IsAdminOrReadOnly,
     ReadOrUpdateOnlyMe, AuthorAdminModeratorOrReadOnly
 )
-from reviews.models import Category, Genre, Review, Title
+from reviews.changes import (ChangeFeed, CursorExpired,
+                             KINDS as CHANGE_KINDS, encode_position)
+from reviews.histogram import DEFAULT_PERCENTILES, score_stats
+from reviews.models import (HISTOGRAM_FIELDS, Category, Comments, Genre,
+                            Review, Title, TitleRanking, TitleSimilarity)
+from reviews.rankings import top_titles
+from reviews.search import KINDS, get_backend
+from reviews.trending import trending_titles
+from users.authentication import issue_access_token, load_full_user
+from users.confirmation import issue_code
+from users.outbox import enqueue_mail
 
 
 User = get_user_model()
 
 
-class CategoryViewSet(BasaModelViewMixin):
+class CategoryViewSet(CatalogueCacheMixin, BasaModelViewMixin):
     """
     Получить список всех категорий. Права доступа: Доступно без токена
     """
@@ -42,7 +64,7 @@ class CategoryViewSet(BasaModelViewMixin):
     lookup_field = 'slug'
 
 
-class GenreViewSet(BasaModelViewMixin):
+class GenreViewSet(CatalogueCacheMixin, BasaModelViewMixin):
     """
     Получить список всех жанров. Права доступа: Доступно без токена
     """
@@ -57,60 +79,265 @@ class GenreViewSet(BasaModelViewMixin):
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalRequestMixin, CatalogueDetailCacheMixin,
+                   ValuesListMixin, viewsets.ModelViewSet):
     """
     Получить список всех объектов. Права доступа: Доступно без токена
     """
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).all()
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
+    values_serializer_class = TitleValuesSerializer
+    pagination_class = KeysetPagination
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly & IsAdminOrReadOnly,
     )
     filter_backends = (DjangoFilterBackend, )
     filterset_class = TitleFilter
     http_method_names = ['get', 'post', 'patch', 'delete']
+    version_name = CATALOGUE
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleReadSerializer
         return TitleWriteSerializer
 
+    @action(detail=False, methods=['get'], url_path='top')
+    def top(self, request):
+        """
+        Лучшие произведения по байесовской оценке (`order=score`) или по
+        числу отзывов (`order=reviews`) из предрасчитанного рейтинга.
+        Фильтры: category, genre, year_min, year_max; `limit` до 100.
+        """
+        return self.cached_response(self.top_response, request)
+
+    def titles_by_id(self, title_ids):
+        context = self.get_serializer_context()
+        return {
+            row['id']: row for row in TitleValuesSerializer(
+                TitleValuesSerializer.values_queryset(
+                    Title.objects.filter(pk__in=title_ids), context
+                ),
+                context
+            ).data
+        }
+
+    def top_response(self, request):
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        ranking = top_titles(**query.validated_data)
+        titles = self.titles_by_id([row[0] for row in ranking])
+        return Response({'results': [
+            dict(titles[title_id], score=round(score, 2),
+                 reviews_count=reviews_count)
+            for title_id, score, reviews_count in ranking
+        ]})
+
+    @action(detail=False, methods=['get'], url_path='trending')
+    def trending(self, request):
+        """
+        Произведения с наибольшей недавней активностью (отзывы и
+        комментарии, вклад которых уменьшается вдвое за окно `window`:
+        day, week или month). Фильтры: category, genre; `limit` до 100.
+        Комментарии не меняют версию каталога, поэтому ответ кешируется
+        на короткий TRENDING_CACHE_TIMEOUT.
+        """
+        return self.cached_response(
+            self.trending_response, request,
+            timeout=settings.TRENDING_CACHE_TIMEOUT
+        )
+
+    def trending_response(self, request):
+        query = TrendingQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        trending = trending_titles(**query.validated_data)
+        titles = self.titles_by_id([title_id for title_id, _ in trending])
+        return Response({'results': [
+            dict(titles[title_id], activity=round(activity, 3))
+            for title_id, activity in trending
+        ]})
+
+    @action(detail=True, methods=['get'], url_path='scores')
+    def scores(self, request, pk=None):
+        """
+        Гистограмма оценок произведения, среднее, медиана и перцентили
+        (`percentiles=10,90`) по сохранённым счётчикам, без чтения отзывов.
+        """
+        query = ScoreStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        title = get_object_or_404(Title.objects.only(*HISTOGRAM_FIELDS), pk=pk)
+        stats = score_stats(
+            title.score_counts,
+            query.validated_data.get('percentiles', DEFAULT_PERCENTILES)
+        )
+        return Response(ScoreStatsSerializer(stats).data)
+
+    @action(detail=True, methods=['get'], url_path='similar')
+    def similar(self, request, pk=None):
+        """
+        Похожие произведения из предрасчитанной таблицы (compute_similarities)
+        одним запросом по индексу; `limit` до 100.
+        """
+        query = SimilarTitlesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise NotFound()
+        rows = TitleSimilarity.objects.filter(
+            title_id=pk
+        ).order_by('-score', 'similar_id').values_list(
+            *title_card_columns('similar__'), 'score'
+        )[:query.validated_data['limit']]
+        results = [
+            title_card(columns, similarity=round(score, 4))
+            for *columns, score in rows
+        ]
+        if not results and not Title.objects.filter(pk=pk).exists():
+            raise NotFound()
+        return Response({'results': results})
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(NestedParentMixin, ConditionalRequestMixin,
+                    ValuesListMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с моделью Review."""
+    queryset = Review.objects.select_related('author')
     serializer_class = ReviewSerializer
+    values_serializer_class = ReviewValuesSerializer
+    pagination_class = KeysetPagination
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly & AuthorAdminModeratorOrReadOnly,
     )
     http_method_names = ['get', 'post', 'head', 'options', 'patch', 'delete']
-
-    def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+    parent_model = Title
+    parent_field = 'title'
+    parent_lookups = {'pk': 'title_id'}
+    version_name = REVIEWS
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_parent())
 
 
-class CommentsViewSet(viewsets.ModelViewSet):
+class CommentsViewSet(NestedParentMixin, ConditionalRequestMixin,
+                      ValuesListMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с моделью Comments."""
+    queryset = Comments.objects.select_related('author')
     serializer_class = CommentsSerializer
+    values_serializer_class = CommentsValuesSerializer
+    pagination_class = KeysetPagination
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly & AuthorAdminModeratorOrReadOnly,
     )
     http_method_names = ['get', 'post', 'head', 'options', 'patch', 'delete']
+    parent_model = Review
+    parent_field = 'review'
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+    version_name = COMMENTS
 
-    def get_review(self):
-        return get_object_or_404(Review, id=self.kwargs.get('review_id'),
-                                 title__id=self.kwargs.get('title_id'))
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user, review=self.get_parent())
 
-    def get_queryset(self):
-        return self.get_review().comments.all()
 
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+class SearchAPIView(views.APIView):
+    """
+    Полнотекстовый поиск по произведениям, отзывам и комментариям.
+    Права доступа: Доступно без токена
+    """
+    permission_classes = (permissions.AllowAny, )
+
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        hits = get_backend().search(
+            serializer.validated_data['q'],
+            kinds=serializer.validated_data.get('type', KINDS),
+            limit=serializer.validated_data['limit'],
+        )
+        return Response({
+            'count': len(hits),
+            'results': SearchHitSerializer(hits, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+class ExportAPIView(views.APIView):
+    """
+    Потоковая выгрузка произведений, отзывов, комментариев и связей
+    произведений с жанрами в CSV, NDJSON, колоночный YCOL или Parquet (если
+    установлен pyarrow); формат — `?format=` или заголовок Accept.
+    `fields=a,b` — выбор колонок, остальные параметры — фильтры.
+    Права доступа: Администратор
+    """
+    permission_classes = (IsAdmin, )
+    renderer_classes = EXPORT_RENDERERS
+    chunk_size = 2000
+
+    def get_columns(self, request, source):
+        requested = request.query_params.get('fields')
+        if not requested:
+            return list(source.columns)
+        columns = [name.strip() for name in requested.split(',')]
+        unknown = [name for name in columns if name not in source.columns]
+        if unknown:
+            raise ValidationError({'fields': [
+                f'Неизвестные поля: {", ".join(unknown)}. Доступны: '
+                f'{", ".join(source.columns)}'
+            ]})
+        return columns
+
+    def get(self, request, model):
+        source = EXPORT_SOURCES.get(model)
+        if source is None:
+            raise NotFound(f'Выгрузка {model} не поддерживается')
+        columns = self.get_columns(request, source)
+        filterset = source.filterset_class(
+            request.query_params, queryset=source.queryset, request=request
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        rows = filterset.qs.order_by('pk').values_list(
+            *(source.columns[name] for name in columns)
+        ).iterator(chunk_size=self.chunk_size)
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(columns, rows, column_types(source, columns)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{model}.{renderer.format}"'
+        )
+        return response
+
+
+class ChangeFeedAPIView(views.APIView):
+    """
+    Изменённые и удалённые объекты по порядку, начиная с `since`
+    (метка времени или курсор `next` из прошлого ответа). Курсор старше
+    CHANGE_LOG_RETENTION отклоняется с 400: нужна полная синхронизация.
+    Права доступа: Администратор
+    """
+    permission_classes = (IsAdmin, )
+
+    def get(self, request):
+        serializer = ChangeFeedQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        try:
+            changes, position = ChangeFeed(
+                kinds=serializer.validated_data.get('type', CHANGE_KINDS)
+            ).read(
+                serializer.validated_data.get('since'),
+                limit=serializer.validated_data['limit'],
+            )
+        except CursorExpired:
+            raise ValidationError({'since': [
+                'Курсор устарел: журнал изменений уже очищен.'
+            ]})
+        return Response({
+            'next': encode_position(position),
+            'results': ChangeSerializer(changes, many=True).data,
+        }, status=status.HTTP_200_OK)
 
 
 class UserSignUpViewSet(viewsets.GenericViewSet):
@@ -120,6 +347,7 @@ class UserSignUpViewSet(viewsets.GenericViewSet):
     queryset = User.objects.all()
     serializer_class = UserSignUpSerializer
     permission_classes = (permissions.AllowAny, )
+    throttle_classes = (SignUpThrottle, )
 
     def required_fields_not_exist(self, request):
         error_context = {}
@@ -130,8 +358,8 @@ class UserSignUpViewSet(viewsets.GenericViewSet):
         return error_context
 
     def generate_and_send_code(self, user):
-        confirmation_code = default_token_generator.make_token(user)
-        send_mail(
+        confirmation_code = issue_code(user)
+        enqueue_mail(
             subject='Код для получения токена',
             message=f'''
                 <p>
@@ -143,9 +371,7 @@ class UserSignUpViewSet(viewsets.GenericViewSet):
                     <strong>{confirmation_code}</strong>
                 </p>
             ''',
-            from_email=settings.EMAIL_HOST_USER,
             recipient_list=[user.email],
-            fail_silently=False,
         )
 
     def create(self, request):
@@ -170,25 +396,20 @@ class UserSignUpViewSet(viewsets.GenericViewSet):
 
 class UserAuthTokenAPIView(views.APIView):
     permission_classes = (permissions.AllowAny, )
+    throttle_classes = (AuthTokenThrottle, )
 
     def post(self, request):
         serializer = UserAuthTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        username = request.data['username']
-        user = User.objects.filter(username=username).first()
-        if user:
-            token = str(RefreshToken.for_user(user).access_token)
-            return Response({'token': token}, status=status.HTTP_200_OK)
-        return Response(
-            {'message': f'There is no user with username {username}'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        token = str(issue_access_token(serializer.validated_data['user']))
+        return Response({'token': token}, status=status.HTTP_200_OK)
 
 
 class UserModelViewSet(viewsets.ModelViewSet):
     PERSONAL_PATH = 'me'
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = KeysetPagination
     filter_backends = (filters.SearchFilter, )
     search_fields = ('username', )
     http_method_names = ['get', 'post', 'patch', 'delete']
@@ -213,13 +434,59 @@ class UserModelViewSet(viewsets.ModelViewSet):
         url_path=PERSONAL_PATH
     )
     def read_and_update_me(self, request):
+        user = load_full_user(request.user)
         if request.method == 'PATCH':
             serializer = UserSerializer(
-                request.user, data=request.data,
+                user, data=request.data,
                 partial=True, context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save(role=request.user.role)
+            serializer.save(role=user.role)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=f'{PERSONAL_PATH}/recommendations',
+        permission_classes=(permissions.IsAuthenticated, )
+    )
+    def recommendations(self, request):
+        """
+        Рекомендации по отзывам пользователя (compute_recommendations).
+        Кешируются на RECOMMENDATIONS_CACHE_TIMEOUT секунд и
+        сбрасываются, когда пользователь меняет свои отзывы.
+        """
+        query = RecommendationsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        cache = get_cache()
+        key = recommendations_key(request.user.pk)
+        results = cache.get(key)
+        if results is None:
+            results = self.load_recommendations(request.user)
+            cache.set(key, results, settings.RECOMMENDATIONS_CACHE_TIMEOUT)
+        return Response({'results': results[:query.validated_data['limit']]})
+
+    @staticmethod
+    def recommendation_cards(rows, user):
+        """Карточки без произведений, которые пользователь уже оценил."""
+        return [
+            title_card(columns, score=round(score, 2))
+            for *columns, score in rows.exclude(
+                title_id__in=user.reviews.values('title_id')
+            ).order_by('-score', 'title_id').values_list(
+                *title_card_columns('title__'), 'score'
+            )[:settings.RECOMMENDATIONS_LIMIT]
+        ]
+
+    def load_recommendations(self, user):
+        """
+        Предрасчитанные рекомендации (после изменения отзывов — прежние,
+        до пересчёта compute_recommendations --stale); если их нет —
+        популярные по рейтингу произведения. В запросе ничего не
+        пересчитывается.
+        """
+        return self.recommendation_cards(
+            user.recommendations.all(), user
+        ) or self.recommendation_cards(TitleRanking.objects.all(), user)
@@ -1,3 +1,4 @@
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -63,6 +64,28 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api_yamdb',
+    },
+    # Версии коллекций (api.cache) должны быть общими для всех воркеров:
+    # иначе изменение в одном не сбрасывает кеш и ETag в остальных. Файлы
+    # общие для воркеров одной машины; для нескольких машин — Memcached
+    # или Redis, у них и incr атомарный.
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(Path(tempfile.gettempdir()) / 'api_yamdb_versions'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+CATALOGUE_CACHE_ALIAS = 'default'
+CACHE_VERSIONS_ALIAS = 'versions'
+CATALOGUE_CACHE_TIMEOUT = 60 * 15
+# Популярное сейчас меняется с каждым комментарием: кеш короткий.
+TRENDING_CACHE_TIMEOUT = 30
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -106,9 +129,25 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ],
+
+    # Число прокси перед приложением. При 0 лимиты считаются по
+    # REMOTE_ADDR, а X-Forwarded-For, который присылает клиент,
+    # игнорируется; за nginx укажите число прокси.
+    'NUM_PROXIES': 0,
 }
 
 
@@ -117,8 +156,47 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Как часто (в секундах) журнал отзыва токенов перечитывается из базы:
+# не позже этого срока отзыв из другого процесса (смена роли, блокировка,
+# удаление пользователя) действует и здесь.
+JWT_DENYLIST_SYNC_INTERVAL = 5
+
+# Лимиты регистрации и получения токена (api.throttling): «N/период»
+# отдельно на IP, имя пользователя и email. Хранилище: 'memory' — в
+# процессе, 'sqlite' — файл, общий для воркеров.
+AUTH_THROTTLE_RATES = {
+    'signup': {'ip': '20/hour', 'username': '5/hour', 'email': '5/hour'},
+    'token': {'ip': '60/hour', 'username': '10/hour'},
+}
+AUTH_THROTTLE_BACKEND = 'memory'
+AUTH_THROTTLE_SQLITE_PATH = BASE_DIR / 'throttle.sqlite3'
+
+# Сколько секунд действует код подтверждения из письма.
+CONFIRMATION_CODE_TTL = 2 * 60 * 60
+
 DOMAIN_NAME = 'yamdb.ru'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 EMAIL_HOST_USER = f'api@{DOMAIN_NAME}'
+
+EMAIL_OUTBOX_EAGER = False
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+EMAIL_OUTBOX_LEASE = 5 * 60
+# Сколько секунд хранятся отправленные и исчерпавшие попытки письма.
+EMAIL_OUTBOX_RETENTION = 7 * 24 * 60 * 60
+
+# Сколько секунд хранятся записи журнала ленты изменений (purge_changes).
+CHANGE_LOG_RETENTION = 30 * 24 * 60 * 60
+
+# Сколько отзывов со средней оценкой добавляется каждому произведению
+# в байесовском рейтинге /api/v1/titles/top/.
+RANKING_PRIOR_WEIGHT = 10
+
+# Сколько рекомендаций хранится для пользователя и сколько секунд
+# ответ /api/v1/users/me/recommendations/ живёт в кеше.
+RECOMMENDATIONS_LIMIT = 50
+RECOMMENDATIONS_CACHE_TIMEOUT = 60 * 10
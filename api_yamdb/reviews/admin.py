@@ -8,7 +8,9 @@ from reviews.models import (Title, Genre, GenreTitle, Category,
 
 @admin.register(Title)
 class TitleAdmin(ImportExportActionModelAdmin):
-    list_display = ('id', 'name', 'year', 'category', 'description')
+    list_display = ('id', 'name', 'year', 'category', 'description',
+                    'rating', 'reviews_count')
+    readonly_fields = ('rating', 'reviews_count', 'score_sum')
 
 
 @admin.register(Genre)
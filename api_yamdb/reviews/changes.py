@@ -0,0 +1,264 @@
+"""
+Лента изменений для синхронизации внешних хранилищ.
+
+Каждое изменение и удаление объекта записывается в журнал
+(ChangeLogEntry). Позиции в ленте записи получают уже после коммита,
+под блокировкой ChangeSequence, и всегда больше выданных раньше: запись
+долгой транзакции, закоммиченная позже, окажется после курсора, а не
+позади него. Несколько записей об одном объекте отдаются одной, по
+последней; данные изменённых объектов читаются на момент запроса.
+Записи старше CHANGE_LOG_RETENTION секунд удаляет `purge_changes`;
+курсор, указывающий в очищенную часть журнала, недействителен.
+"""
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from reviews.models import (Category, ChangeLogEntry, ChangeSequence,
+                            Comments, Genre, Review, Title)
+
+ChangeSource = namedtuple('ChangeSource', ('kind', 'model', 'fields'))
+Change = namedtuple(
+    'Change', ('kind', 'object_id', 'action', 'changed_at', 'data')
+)
+
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+SOURCES = (
+    ChangeSource('category', Category, {
+        'id': 'id', 'name': 'name', 'slug': 'slug',
+    }),
+    ChangeSource('genre', Genre, {
+        'id': 'id', 'name': 'name', 'slug': 'slug',
+    }),
+    ChangeSource('title', Title, {
+        'id': 'id', 'name': 'name', 'year': 'year',
+        'description': 'description', 'category': 'category__slug',
+        'rating': 'rating', 'reviews_count': 'reviews_count',
+    }),
+    ChangeSource('review', Review, {
+        'id': 'id', 'title_id': 'title_id', 'author': 'author__username',
+        'text': 'text', 'score': 'score', 'pub_date': 'pub_date',
+    }),
+    ChangeSource('comment', Comments, {
+        'id': 'id', 'review_id': 'review_id', 'author': 'author__username',
+        'text': 'text', 'pub_date': 'pub_date',
+    }),
+)
+KINDS = tuple(source.kind for source in SOURCES)
+SEQUENCE_PK = 1
+
+
+class CursorExpired(ValueError):
+    """Курсор указывает в очищенную часть журнала."""
+
+
+def kind_of(model):
+    for source in SOURCES:
+        if model is source.model:
+            return source.kind
+    return None
+
+
+def record_changes(kind, object_ids, deleted=False,
+                   using=DEFAULT_DB_ALIAS):
+    """Записывает в журнал изменение (или удаление) объектов."""
+    entries = [
+        ChangeLogEntry(kind=kind, object_id=object_id, deleted=deleted)
+        for object_id in object_ids
+    ]
+    if len(entries) == 1:
+        # bulk_create открыл бы транзакцию ради одной строки.
+        entries[0].save(using=using)
+    else:
+        ChangeLogEntry.objects.using(using).bulk_create(entries)
+
+
+def touch_titles(**lookups):
+    """Отмечает изменёнными произведения, которые меняются без save()."""
+    titles = Title.objects.filter(**lookups)
+    title_ids = list(titles.values_list('pk', flat=True))
+    Title.objects.filter(pk__in=title_ids).update(updated_at=timezone.now())
+    record_changes('title', title_ids)
+
+
+def get_sequence(using=DEFAULT_DB_ALIAS, lock=False):
+    sequences = ChangeSequence.objects.using(using)
+    if lock:
+        sequences = sequences.select_for_update()
+    sequence = sequences.filter(pk=SEQUENCE_PK).first()
+    if sequence is None:
+        sequence, _ = sequences.get_or_create(pk=SEQUENCE_PK)
+    return sequence
+
+
+def assign_positions(using=DEFAULT_DB_ALIAS):
+    """
+    Назначает позиции записям журнала, у которых их ещё нет. Видны только
+    закоммиченные записи; каждая получает позицию больше всех выданных,
+    по порядку id. Возвращает последнюю выданную позицию.
+    """
+    pending = ChangeLogEntry.objects.using(using).filter(
+        position__isnull=True
+    )
+    if not pending.exists():
+        return get_sequence(using).last
+    with transaction.atomic(using=using):
+        sequence = get_sequence(using, lock=True)
+        bounds = pending.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            return sequence.last
+        offset = sequence.last + 1 - bounds['first']
+        pending.filter(pk__lte=bounds['last']).update(
+            position=F('pk') + offset
+        )
+        sequence.last = bounds['last'] + offset
+        sequence.save(using=using, update_fields=['last'])
+    return sequence.last
+
+
+def purge_changes(using=DEFAULT_DB_ALIAS):
+    """
+    Удаляет записи журнала старше CHANGE_LOG_RETENTION секунд; курсоры
+    до удалённых позиций становятся недействительными.
+    """
+    assign_positions(using)
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.CHANGE_LOG_RETENTION
+    )
+    with transaction.atomic(using=using):
+        sequence = get_sequence(using, lock=True)
+        entries = ChangeLogEntry.objects.using(using)
+        purged = entries.filter(
+            created_at__lt=cutoff, position__isnull=False
+        ).aggregate(position=Max('position'))['position']
+        if purged is None:
+            return 0
+        deleted = entries.filter(position__lte=purged).delete()[0]
+        sequence.purged = max(sequence.purged, purged)
+        sequence.save(using=using, update_fields=['purged'])
+    return deleted
+
+
+def encode_position(position):
+    payload = json.dumps([position], separators=(',', ':'))
+    return urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_position(cursor):
+    """Позиция из курсора; ValueError, если курсор повреждён."""
+    try:
+        position, = json.loads(
+            urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        )
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError(cursor)
+    if not isinstance(position, int) or isinstance(position, bool):
+        raise ValueError(cursor)
+    return position
+
+
+class ChangeFeed:
+
+    def __init__(self, kinds=KINDS):
+        self.sources = [source for source in SOURCES if source.kind in kinds]
+
+    def entries(self, since):
+        """Записи журнала после позиции (или с метки времени)."""
+        entries = ChangeLogEntry.objects.filter(
+            position__isnull=False,
+            kind__in=[source.kind for source in self.sources],
+        )
+        if isinstance(since, int):
+            return entries.filter(position__gt=since)
+        if since is not None:
+            return entries.filter(created_at__gte=since)
+        return entries
+
+    def latest_entries(self, since, limit):
+        """
+        Последние записи о не более чем `limit` объектах по порядку
+        позиций: запись об объекте заменяет его более ранние записи.
+        """
+        entries = self.entries(since).order_by('position').values_list(
+            'position', 'kind', 'object_id', 'deleted', 'created_at'
+        )
+        latest = {}
+        scanned = None
+        while len(latest) < limit:
+            page = entries
+            if scanned is not None:
+                page = page.filter(position__gt=scanned)
+            rows = list(page[:limit])
+            for row in rows:
+                latest[row[1:3]] = row
+            if len(rows) < limit:
+                break
+            scanned = rows[-1][0]
+        return sorted(latest.values())[:limit]
+
+    def load(self, entries):
+        """Текущие данные изменённых объектов: запрос на каждый тип."""
+        data = {}
+        for source in self.sources:
+            object_ids = [
+                object_id for _, kind, object_id, deleted, _ in entries
+                if kind == source.kind and not deleted
+            ]
+            if not object_ids:
+                continue
+            rows = source.model.objects.filter(
+                pk__in=object_ids
+            ).values_list('pk', *source.fields.values())
+            for pk, *values in rows:
+                data[source.kind, pk] = dict(zip(source.fields, values))
+        return data
+
+    def read(self, since=None, limit=100):
+        """
+        До `limit` изменений после позиции `since` (или с метки времени)
+        и позиция для следующего запроса. Изменённый объект, которого уже
+        нет, отдаётся удалённым. CursorExpired — позиция в очищенной
+        части журнала.
+        """
+        last = assign_positions()
+        if isinstance(since, int) and since < get_sequence().purged:
+            raise CursorExpired(since)
+        entries = self.latest_entries(since, limit)
+        data = self.load(entries)
+        changes = []
+        for _, kind, object_id, deleted, changed_at in entries:
+            values = None if deleted else data.get((kind, object_id))
+            changes.append(Change(
+                kind, object_id, UPDATED if values is not None else DELETED,
+                changed_at, values
+            ))
+        self.add_genres(changes)
+        if entries:
+            return changes, entries[-1][0]
+        return changes, since if isinstance(since, int) else last
+
+    @staticmethod
+    def add_genres(changes):
+        """Жанры обновлённых произведений одним запросом."""
+        titles = {
+            change.object_id: change.data for change in changes
+            if change.kind == 'title' and change.action == UPDATED
+        }
+        if not titles:
+            return
+        for data in titles.values():
+            data['genre'] = []
+        links = Title.genre.through.objects.filter(
+            title_id__in=titles
+        ).order_by('genre__slug').values_list('title_id', 'genre__slug')
+        for title_id, slug in links:
+            titles[title_id]['genre'].append(slug)
@@ -0,0 +1,351 @@
+"""
+Потоковая загрузка CSV из static/data через bulk_create.
+
+Файлы читаются построчно и вставляются пачками в одной транзакции на
+файл. Первичные ключи берутся из CSV, внешние ключи проверяются по
+множествам уже известных id в памяти, без запросов на каждую строку.
+"""
+import csv
+import time
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connections, DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from reviews.changes import kind_of, record_changes
+from reviews.models import Category, Comments, Genre, Review, Title
+from reviews.signals import data_loaded
+
+User = get_user_model()
+GenreTitleLink = Title.genre.through
+
+LoadResult = namedtuple(
+    'LoadResult', ('name', 'rows', 'created', 'skipped', 'seconds')
+)
+
+
+class Dataset(namedtuple(
+    'Dataset', ('name', 'filename', 'model', 'references')
+)):
+    """Набор данных; `references` — (поле, набор данных, обязательно)."""
+
+    @property
+    def depends(self):
+        return tuple(target for _, target, _ in self.references)
+
+
+DATASETS = (
+    Dataset('users', 'users.csv', User, ()),
+    Dataset('category', 'category.csv', Category, ()),
+    Dataset('genre', 'genre.csv', Genre, ()),
+    Dataset('titles', 'titles.csv', Title, (
+        ('category_id', 'category', False),
+    )),
+    Dataset('genre_title', 'genre_title.csv', GenreTitleLink, (
+        ('title_id', 'titles', True),
+        ('genre_id', 'genre', True),
+    )),
+    Dataset('review', 'review.csv', Review, (
+        ('title_id', 'titles', True),
+        ('author_id', 'users', True),
+    )),
+    Dataset('comments', 'comments.csv', Comments, (
+        ('review_id', 'review', True),
+        ('author_id', 'users', True),
+    )),
+)
+DATASETS_BY_NAME = {dataset.name: dataset for dataset in DATASETS}
+
+
+class RowError(ValueError):
+    pass
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'ожидалось целое число, получено {value!r}')
+
+
+def to_optional_int(value):
+    return None if value in ('', None) else to_int(value)
+
+
+def to_datetime(value):
+    parsed = parse_datetime(value or '')
+    if parsed is None:
+        raise RowError(f'некорректная дата {value!r}')
+    return parsed
+
+
+def parse_users(row):
+    return {
+        'id': to_int(row['id']),
+        'username': row['username'],
+        'email': row['email'],
+        'role': row.get('role') or User.USER_ROLE,
+        'bio': row.get('bio') or '',
+        'first_name': row.get('first_name') or '',
+        'last_name': row.get('last_name') or '',
+        'password': make_password(None),
+    }
+
+
+def parse_category(row):
+    return {'id': to_int(row['id']), 'name': row['name'], 'slug': row['slug']}
+
+
+parse_genre = parse_category
+
+
+def parse_titles(row):
+    return {
+        'id': to_int(row['id']),
+        'name': row['name'],
+        'year': to_int(row['year']),
+        'category_id': to_optional_int(row.get('category')),
+        'description': row.get('description') or None,
+    }
+
+
+def parse_genre_title(row):
+    return {
+        'id': to_int(row['id']),
+        'title_id': to_int(row['title_id']),
+        'genre_id': to_int(row['genre_id']),
+    }
+
+
+def parse_review(row):
+    return {
+        'id': to_int(row['id']),
+        'title_id': to_int(row['title_id']),
+        'text': row['text'],
+        'author_id': to_int(row['author']),
+        'score': to_int(row['score']),
+        'pub_date': to_datetime(row['pub_date']),
+    }
+
+
+def parse_comments(row):
+    return {
+        'id': to_int(row['id']),
+        'review_id': to_int(row['review_id']),
+        'text': row['text'],
+        'author_id': to_int(row['author']),
+        'pub_date': to_datetime(row['pub_date']),
+    }
+
+
+PARSERS = {
+    'users': parse_users,
+    'category': parse_category,
+    'genre': parse_genre,
+    'titles': parse_titles,
+    'genre_title': parse_genre_title,
+    'review': parse_review,
+    'comments': parse_comments,
+}
+
+
+def parse_row(dataset, row):
+    """Приводит типы строки CSV; ссылки на другие наборы не проверяет."""
+    try:
+        return PARSERS[dataset.name](row)
+    except KeyError as error:
+        raise RowError(f'нет колонки {error}')
+
+
+def resolve_references(dataset, fields, ids):
+    """
+    Проверяет внешние ключи по известным id: необязательная ссылка на
+    неизвестный объект обнуляется, обязательная — RowError.
+    """
+    for field, target, required in dataset.references:
+        value = fields[field]
+        if value is not None and value in ids[target]:
+            continue
+        if required:
+            raise RowError(f'нет объекта {target} с id {value}')
+        fields[field] = None
+    return dataset.model(**fields)
+
+
+def dependency_order(names):
+    """Наборы данных в порядке зависимостей (как в DATASETS)."""
+    unknown = set(names) - set(DATASETS_BY_NAME)
+    if unknown:
+        raise ValueError(
+            f'Неизвестные наборы данных: {", ".join(sorted(unknown))}'
+        )
+    return [dataset for dataset in DATASETS if dataset.name in names]
+
+
+def timestamp_fields(model):
+    """Поля auto_now и auto_now_add: их заполняет pre_save."""
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+
+
+class KnownIds(dict):
+    """
+    Множества id по наборам данных; id набора загружаются из базы при
+    первом обращении — только для наборов, на которые есть ссылки.
+    """
+
+    def __init__(self, using):
+        super().__init__()
+        self.using = using
+
+    def __missing__(self, name):
+        ids = self[name] = set(
+            DATASETS_BY_NAME[name].model.objects.using(
+                self.using
+            ).values_list('pk', flat=True)
+        )
+        return ids
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8', newline='') as csv_file:
+        yield from csv.DictReader(csv_file)
+
+
+class CsvLoader:
+    """
+    Загружает наборы данных в порядке зависимостей. Строки с битыми
+    значениями или ссылками на неизвестные объекты пропускаются и
+    попадают в `errors`.
+    """
+
+    def __init__(self, batch_size=1000, ignore_conflicts=False,
+                 using=DEFAULT_DB_ALIAS, max_errors=20):
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        self.using = using
+        self.max_errors = max_errors
+        self.errors = []
+        self.ids = KnownIds(using)
+        # Наборы, записанные в базу: finish пересчитывает данные для них.
+        self.committed = []
+
+    def record_error(self, dataset, line, error):
+        if len(self.errors) < self.max_errors:
+            self.errors.append(f'{dataset.filename}:{line}: {error}')
+
+    def build_objects(self, dataset, rows, skipped):
+        for line, row in enumerate(rows, 2):
+            try:
+                yield resolve_references(
+                    dataset, parse_row(dataset, row), self.ids
+                )
+            except RowError as error:
+                skipped[0] += 1
+                self.record_error(dataset, line, error)
+
+    def batches(self, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def insert_raw(self, model, batch):
+        """
+        Вставляет пачку как loaddata (raw): pre_save полей не вызывается,
+        поэтому даты из CSV попадают в базу прямо в INSERT, а пустые поля
+        auto_now и auto_now_add получают текущее время.
+        """
+        now = timezone.now()
+        for name in timestamp_fields(model):
+            for obj in batch:
+                if getattr(obj, name) is None:
+                    setattr(obj, name, now)
+        fields = model._meta.concrete_fields
+        size = connections[self.using].ops.bulk_batch_size(fields, batch)
+        for start in range(0, len(batch), max(size, 1)):
+            model._base_manager._insert(
+                batch[start:start + size], fields=fields, raw=True,
+                using=self.using, ignore_conflicts=self.ignore_conflicts,
+            )
+
+    def record_changes(self, dataset, batch):
+        """Записывает вставленные объекты в журнал ленты изменений."""
+        if dataset.model is GenreTitleLink:
+            kind, object_ids = 'title', {obj.title_id for obj in batch}
+        else:
+            kind, object_ids = kind_of(dataset.model), [
+                obj.pk for obj in batch
+            ]
+        if kind is not None:
+            record_changes(kind, object_ids, using=self.using)
+
+    def insert(self, dataset, objects):
+        """
+        Вставляет готовые объекты пачками; возвращает (объектов,
+        вставлено). С ignore_conflicts вставлено считается по числу строк
+        в таблице: конфликтующие объекты пропускаются молча.
+        """
+        rows = 0
+        manager = dataset.model.objects.using(self.using)
+        with transaction.atomic(using=self.using):
+            before = manager.count() if self.ignore_conflicts else 0
+            for batch in self.batches(objects):
+                self.insert_raw(dataset.model, batch)
+                self.record_changes(dataset, batch)
+                if dataset.name in self.ids:
+                    self.ids[dataset.name].update(obj.pk for obj in batch)
+                rows += len(batch)
+            created = (
+                manager.count() - before if self.ignore_conflicts else rows
+            )
+        self.committed.append(dataset)
+        return rows, created
+
+    def load(self, dataset, path):
+        started = time.monotonic()
+        skipped = [0]
+        rows, created = self.insert(
+            dataset, self.build_objects(dataset, read_rows(path), skipped)
+        )
+        return LoadResult(
+            dataset.name, rows + skipped[0], created, skipped[0],
+            time.monotonic() - started
+        )
+
+    def reset_sequences(self, datasets):
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [dataset.model for dataset in datasets]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def finish(self, sender, stdout=None):
+        """
+        Для записанных наборов сбрасывает счётчики id, пересчитывает
+        рейтинги и шлёт сигнал. Вызывается и после ошибки в одном из
+        наборов: записанные раньше уже в базе.
+        """
+        datasets = self.committed
+        if not datasets:
+            return
+        self.reset_sequences(datasets)
+        if {'titles', 'review'} & {dataset.name for dataset in datasets}:
+            call_command('recalculate_ratings', verbosity=0, stdout=stdout)
+        data_loaded.send(
+            sender=sender, datasets=[dataset.name for dataset in datasets]
+        )
@@ -0,0 +1,55 @@
+"""
+Статистика оценок произведения по сохранённой гистограмме.
+
+Гистограмма — число отзывов с каждой оценкой (Title.score_counts), поэтому
+среднее, медиана и перцентили считаются без обращения к отзывам.
+Перцентили интерполируются линейно между соседними оценками, как
+`numpy.percentile` по умолчанию.
+"""
+from reviews.models import SCORES
+
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+
+def as_histogram(counts):
+    return {str(score): count for score, count in zip(SCORES, counts)}
+
+
+def nth_score(counts, index):
+    """Оценка на месте `index` (с нуля) в упорядоченном списке оценок."""
+    for score, count in zip(SCORES, counts):
+        if index < count:
+            return score
+        index -= count
+    raise IndexError(index)
+
+
+def percentile(counts, value):
+    total = sum(counts)
+    if not total:
+        return None
+    position = (total - 1) * value / 100
+    lower = int(position)
+    score = nth_score(counts, lower)
+    if position == lower:
+        return float(score)
+    return score + (nth_score(counts, lower + 1) - score) * (position - lower)
+
+
+def mean(counts):
+    total = sum(counts)
+    if not total:
+        return None
+    return sum(score * count for score, count in zip(SCORES, counts)) / total
+
+
+def score_stats(counts, percentiles=DEFAULT_PERCENTILES):
+    return {
+        'histogram': as_histogram(counts),
+        'count': sum(counts),
+        'mean': mean(counts),
+        'median': percentile(counts, 50),
+        'percentiles': {
+            f'{value:g}': percentile(counts, value) for value in percentiles
+        },
+    }
@@ -0,0 +1,186 @@
+"""
+Параллельная загрузка нескольких CSV с учётом зависимостей.
+
+Файлы разбираются в пуле процессов одновременно: процесс приводит типы
+строк и складывает их пачками во временный файл. В базу пишет только
+текущий процесс (SQLite допускает одного писателя): набор данных
+вставляется, как только разобран его файл и записаны все наборы, от
+которых он зависит. Ссылки проверяются при записи по множествам id, как
+в CsvLoader. В конце количество строк в базе сверяется с файлами.
+"""
+import os
+import pickle
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.db import DEFAULT_DB_ALIAS
+
+from reviews.csv_loader import (DATASETS_BY_NAME, CsvLoader, RowError,
+                                parse_row, read_rows, resolve_references)
+
+ParsedFile = namedtuple(
+    'ParsedFile', ('name', 'spool', 'rows', 'invalid', 'errors', 'seconds')
+)
+PipelineResult = namedtuple(
+    'PipelineResult',
+    ('name', 'rows', 'skipped', 'inserted', 'conflicts', 'parse_seconds',
+     'write_seconds')
+)
+
+
+def parse_file(name, path, spool_dir, batch_size=1000, max_errors=20):
+    """
+    Выполняется в процессе пула: разбирает CSV и пишет пары (номер
+    строки, словарь полей) пачками в pickle-файл. К базе не обращается.
+    """
+    started = time.monotonic()
+    dataset = DATASETS_BY_NAME[name]
+    rows = invalid = 0
+    errors = []
+    batch = []
+    with tempfile.NamedTemporaryFile(
+        'wb', dir=spool_dir, prefix=f'{name}-', suffix='.pickle',
+        delete=False
+    ) as spool:
+        for line, row in enumerate(read_rows(path), 2):
+            rows += 1
+            try:
+                batch.append((line, parse_row(dataset, row)))
+            except RowError as error:
+                invalid += 1
+                if len(errors) < max_errors:
+                    errors.append(f'{dataset.filename}:{line}: {error}')
+            if len(batch) >= batch_size:
+                pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+    return ParsedFile(
+        name, spool.name, rows, invalid, errors, time.monotonic() - started
+    )
+
+
+def read_spool(path):
+    with open(path, 'rb') as spool:
+        while True:
+            try:
+                yield from pickle.load(spool)
+            except EOFError:
+                return
+
+
+class ImportPipeline:
+    """
+    Загружает наборы данных: разбор в `workers` процессах, запись в
+    порядке зависимостей. `progress` получает строки для вывода.
+    Наборы, которых нет в загрузке, считаются уже загруженными.
+    """
+
+    def __init__(self, workers=None, batch_size=1000, ignore_conflicts=False,
+                 using=DEFAULT_DB_ALIAS, progress=None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.loader = CsvLoader(
+            batch_size=batch_size, ignore_conflicts=ignore_conflicts,
+            using=using
+        )
+        self.progress = progress or (lambda message: None)
+
+    @property
+    def errors(self):
+        return self.loader.errors
+
+    def objects(self, dataset, parsed, skipped):
+        for line, fields in read_spool(parsed.spool):
+            try:
+                yield resolve_references(dataset, fields, self.loader.ids)
+            except RowError as error:
+                skipped[0] += 1
+                self.loader.record_error(dataset, line, error)
+
+    def write(self, parsed):
+        """Вставляет разобранный файл; конфликты — не попавшие в базу."""
+        started = time.monotonic()
+        dataset = DATASETS_BY_NAME[parsed.name]
+        skipped = [parsed.invalid]
+        try:
+            _, inserted = self.loader.insert(
+                dataset, self.objects(dataset, parsed, skipped)
+            )
+        finally:
+            os.remove(parsed.spool)
+        result = PipelineResult(
+            dataset.name, parsed.rows, skipped[0], inserted,
+            parsed.rows - skipped[0] - inserted, parsed.seconds,
+            time.monotonic() - started
+        )
+        self.progress(
+            f'{result.name}: записано {result.inserted} из {result.rows} '
+            f'строк, пропущено {result.skipped}, {result.write_seconds:.2f} с'
+        )
+        return result
+
+    def collect(self, futures, parsed):
+        """Ждёт хотя бы один разобранный файл."""
+        done, _ = wait(futures.values(), return_when=FIRST_COMPLETED)
+        for name, future in list(futures.items()):
+            if future not in done:
+                continue
+            result = futures.pop(name).result()
+            self.errors.extend(result.errors[
+                :max(0, self.loader.max_errors - len(self.errors))
+            ])
+            parsed[name] = result
+            self.progress(
+                f'{name}: разобрано {result.rows} строк, с ошибками '
+                f'{result.invalid}, {result.seconds:.2f} с'
+            )
+
+    def run(self, datasets, path):
+        """`datasets` — в порядке зависимостей (см. dependency_order)."""
+        names = [dataset.name for dataset in datasets]
+        waits_for = {
+            dataset.name: set(dataset.depends) & set(names)
+            for dataset in datasets
+        }
+        results, parsed, written = [], {}, set()
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=django.setup
+        )
+        with tempfile.TemporaryDirectory(prefix='import-') as spool_dir, \
+                executor:
+            futures = {
+                dataset.name: executor.submit(
+                    parse_file, dataset.name,
+                    os.path.join(path, dataset.filename), spool_dir,
+                    self.loader.batch_size, self.loader.max_errors
+                )
+                for dataset in datasets
+            }
+            try:
+                while futures or parsed:
+                    ready = [
+                        name for name in names
+                        if name in parsed and waits_for[name] <= written
+                    ]
+                    if not ready:
+                        self.collect(futures, parsed)
+                        continue
+                    results.append(self.write(parsed.pop(ready[0])))
+                    written.add(ready[0])
+            finally:
+                for future in futures.values():
+                    future.cancel()
+        return results
+
+    def check(self, results):
+        """Расхождения файлов и базы; конфликты — только с ignore_conflicts."""
+        return [
+            f'{result.name}: в файле {result.rows} строк, пропущено '
+            f'{result.skipped}, в базу попало {result.inserted}'
+            for result in results
+            if result.conflicts and not self.loader.ignore_conflicts
+            or result.conflicts < 0
+        ]
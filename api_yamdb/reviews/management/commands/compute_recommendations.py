@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.models import Review
+from reviews.recommendations import (compute_recommendations,
+                                     compute_stale_recommendations)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает персональные рекомендации по похожим произведениям '
+        '(сначала compute_similarities). Без --users и --stale — для всех '
+        'авторов отзывов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--users', type=int, nargs='+', metavar='ID',
+            help='Пересчитать только этих пользователей.'
+        )
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='Пересчитать только пользователей, менявших отзывы.'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('limit', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должен быть больше нуля'
+                )
+        if options['stale']:
+            result = compute_stale_recommendations(
+                limit=options['limit'], batch_size=options['batch_size'],
+            )
+        else:
+            user_ids = options['users'] or Review.objects.order_by(
+                'author_id'
+            ).values_list('author_id', flat=True).distinct()
+            result = compute_recommendations(
+                set(user_ids),
+                limit=options['limit'],
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {result.users}, '
+            f'записано рекомендаций: {result.recommendations}'
+        ))
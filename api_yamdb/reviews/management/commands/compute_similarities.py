@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from reviews.models import Title
+from reviews.recommendations import affected_titles, compute_similarities
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие произведения по оценкам в отзывах. Без '
+        'параметров пересчитывает все произведения; с --changed-since — '
+        'только изменённые после указанного времени и их соседей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=20)
+        parser.add_argument('--chunk-size', type=int, default=200)
+        parser.add_argument('--min-support', type=int, default=2)
+        parser.add_argument('--shrinkage', type=float, default=10)
+        parser.add_argument(
+            '--titles', type=int, nargs='+', metavar='ID',
+            help='Пересчитать только эти произведения.'
+        )
+        parser.add_argument(
+            '--changed-since', metavar='ISO_DATETIME',
+            help='Пересчитать произведения, изменённые после этого времени.'
+        )
+
+    def get_title_ids(self, options):
+        if options['titles']:
+            return set(options['titles'])
+        if options['changed_since']:
+            changed_since = parse_datetime(options['changed_since'])
+            if changed_since is None:
+                raise CommandError('Некорректное значение --changed-since')
+            if timezone.is_naive(changed_since):
+                changed_since = timezone.make_aware(changed_since)
+            return affected_titles(Title.objects.filter(
+                updated_at__gte=changed_since
+            ).values_list('pk', flat=True))
+        return Title.objects.values_list('pk', flat=True)
+
+    def handle(self, *args, **options):
+        for name in ('top_k', 'chunk_size', 'min_support'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должен быть больше нуля'
+                )
+        result = compute_similarities(
+            self.get_title_ids(options),
+            top_k=options['top_k'],
+            chunk_size=options['chunk_size'],
+            min_support=options['min_support'],
+            shrinkage=options['shrinkage'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано произведений: {result.titles}, '
+            f'записано соседей: {result.neighbours}'
+        ))
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from reviews.csv_loader import DATASETS, dependency_order
+from reviews.import_pipeline import ImportPipeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает CSV из static/data: файлы разбираются параллельно в '
+        'пуле процессов, запись идёт в порядке зависимостей, в конце '
+        'количество строк в базе сверяется с файлами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'datasets', nargs='*',
+            help='Наборы данных: ' + ', '.join(d.name for d in DATASETS)
+        )
+        parser.add_argument(
+            '--path', default=settings.BASE_DIR / 'static' / 'data',
+            help='Каталог с CSV-файлами.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Число процессов для разбора файлов.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе.'
+        )
+
+    def progress(self, message):
+        if self.verbosity > 0:
+            self.stdout.write(message)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            datasets = dependency_order(
+                options['datasets'] or [d.name for d in DATASETS]
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        pipeline = ImportPipeline(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'],
+            progress=self.progress,
+        )
+        try:
+            results = pipeline.run(datasets, Path(options['path']))
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Данные уже загружены? '
+                'Используйте --ignore-conflicts.'
+            )
+        except FileNotFoundError as error:
+            raise CommandError(error)
+        finally:
+            for error in pipeline.errors:
+                self.stderr.write(error)
+            pipeline.loader.finish(sender=self.__class__, stdout=self.stdout)
+        mismatches = pipeline.check(results)
+        if mismatches:
+            raise CommandError(
+                'Количество строк не сходится: ' + '; '.join(mismatches)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {sum(r.inserted for r in results)} строк, '
+            f'пропущено {sum(r.skipped for r in results)}, '
+            f'уже было в базе {sum(r.conflicts for r in results)}'
+        ))
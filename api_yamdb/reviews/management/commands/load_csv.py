@@ -0,0 +1,73 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from reviews.csv_loader import DATASETS, CsvLoader, dependency_order
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает CSV из static/data через bulk_create в '
+        'порядке зависимостей и сообщает скорость загрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'datasets', nargs='*',
+            help='Наборы данных: ' + ', '.join(d.name for d in DATASETS)
+        )
+        parser.add_argument(
+            '--path', default=settings.BASE_DIR / 'static' / 'data',
+            help='Каталог с CSV-файлами.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе.'
+        )
+
+    def load_all(self, loader, datasets, path):
+        total_rows = total_seconds = 0
+        for dataset in datasets:
+            try:
+                result = loader.load(dataset, path / dataset.filename)
+            except IntegrityError as error:
+                raise CommandError(
+                    f'{dataset.filename}: {error}. Данные уже загружены? '
+                    'Используйте --ignore-conflicts.'
+                )
+            except FileNotFoundError as error:
+                raise CommandError(error)
+            total_rows += result.created
+            total_seconds += result.seconds
+            self.stdout.write(
+                f'{result.name}: {result.created} строк, пропущено '
+                f'{result.skipped}, {result.seconds:.2f} с, '
+                f'{result.created / max(result.seconds, 1e-9):.0f} строк/с'
+            )
+        return total_rows, total_seconds
+
+    def handle(self, *args, **options):
+        try:
+            datasets = dependency_order(
+                options['datasets'] or [d.name for d in DATASETS]
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        path = Path(options['path'])
+        loader = CsvLoader(
+            batch_size=options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'],
+        )
+        try:
+            total_rows, total_seconds = self.load_all(loader, datasets, path)
+        finally:
+            for error in loader.errors:
+                self.stderr.write(error)
+            loader.finish(sender=self.__class__, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total_rows} строк за {total_seconds:.2f} с, '
+            f'{total_rows / max(total_seconds, 1e-9):.0f} строк/с'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from reviews.changes import purge_changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из журнала ленты изменений записи старше '
+        'CHANGE_LOG_RETENTION секунд.'
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_changes()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала: {deleted}'
+        ))
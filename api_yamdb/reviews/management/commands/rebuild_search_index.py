@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from reviews.search import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовый индекс произведений, отзывов '
+        'и комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['database'])
+        counts = backend.rebuild()
+        for kind, count in counts.items():
+            self.stdout.write(f'{kind}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс {backend.__class__.__name__} перестроен.'
+        ))
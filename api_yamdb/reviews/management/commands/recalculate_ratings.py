@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from reviews.changes import record_changes
+from reviews.models import HISTOGRAM_FIELDS, SCORES, Title
+
+STORED_FIELDS = ('rating', 'reviews_count', 'score_sum') + HISTOGRAM_FIELDS
+RATING_FIELDS = STORED_FIELDS + ('updated_at', )
+
+
+def save_titles(titles):
+    Title.objects.bulk_update(titles, RATING_FIELDS)
+    record_changes('title', [title.pk for title in titles])
+
+
+def actual_values(title):
+    """Значения STORED_FIELDS, посчитанные по отзывам."""
+    score_sum = title.actual_sum or 0
+    count = title.actual_count
+    return (
+        score_sum // count if count else None, count, score_sum,
+        *(getattr(title, f'actual_{name}') for name in HISTOGRAM_FIELDS)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сохранённые рейтинг, количество отзывов, сумму и '
+        'гистограмму оценок произведений и сообщает о расхождениях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки для bulk_update.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, не сохраняя их.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        titles = Title.objects.annotate(
+            actual_count=Count('reviews'),
+            actual_sum=Sum('reviews__score'),
+            **{
+                f'actual_{name}': Count(
+                    'reviews', filter=Q(reviews__score=score)
+                )
+                for score, name in zip(SCORES, HISTOGRAM_FIELDS)
+            },
+        ).order_by('pk')
+        drifted = []
+        checked = drift = 0
+        with transaction.atomic():
+            for title in titles.iterator(chunk_size=batch_size):
+                checked += 1
+                actual = actual_values(title)
+                stored = tuple(getattr(title, name) for name in STORED_FIELDS)
+                if stored == actual:
+                    continue
+                if options['verbosity'] > 0:
+                    self.stdout.write(f'{title.pk}: {stored} -> {actual}')
+                drift += 1
+                for name, value in zip(STORED_FIELDS, actual):
+                    setattr(title, name, value)
+                title.updated_at = timezone.now()
+                drifted.append(title)
+                if not options['dry_run'] and len(drifted) >= batch_size:
+                    save_titles(drifted)
+                    drifted.clear()
+            if not options['dry_run'] and drifted:
+                save_titles(drifted)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено произведений: {checked}, '
+            f'с расхождениями: {drift}'
+        ))
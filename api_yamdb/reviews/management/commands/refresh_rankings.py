@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from reviews.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает среднюю оценку для байесовского рейтинга и все '
+        'строки рейтинга произведений. Запускайте периодически: между '
+        'запусками средняя обновляется с каждым отзывом, но строки '
+        'остальных произведений хранят среднюю на момент своего обновления.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prior, created = refresh_rankings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Средняя оценка: {prior.mean:.2f}, вес: {prior.weight:g}, '
+            f'произведений в рейтинге: {created}'
+        ))
@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 from reviews.validates import validate_year
 
@@ -8,6 +9,12 @@ User = get_user_model()
 
 MIN_SCORE = 1
 MAX_SCORE = 10
+SCORES = range(MIN_SCORE, MAX_SCORE + 1)
+HISTOGRAM_FIELDS = tuple(f'score_{score}_count' for score in SCORES)
+
+
+def histogram_field(score):
+    return HISTOGRAM_FIELDS[score - MIN_SCORE]
 
 
 class Title(models.Model):
@@ -29,6 +36,50 @@ class Title(models.Model):
     genre = models.ManyToManyField('Genre',
                                    related_name='title',
                                    verbose_name='Жанр')
+    rating = models.PositiveSmallIntegerField('Рейтинг',
+                                              null=True,
+                                              blank=True,
+                                              editable=False)
+    reviews_count = models.PositiveIntegerField('Количество отзывов',
+                                                default=0,
+                                                editable=False)
+    score_sum = models.PositiveIntegerField('Сумма оценок',
+                                            default=0,
+                                            editable=False)
+    # Гистограмма оценок: по счётчику на каждую оценку (HISTOGRAM_FIELDS).
+    score_1_count = models.PositiveIntegerField('Оценок 1',
+                                                default=0,
+                                                editable=False)
+    score_2_count = models.PositiveIntegerField('Оценок 2',
+                                                default=0,
+                                                editable=False)
+    score_3_count = models.PositiveIntegerField('Оценок 3',
+                                                default=0,
+                                                editable=False)
+    score_4_count = models.PositiveIntegerField('Оценок 4',
+                                                default=0,
+                                                editable=False)
+    score_5_count = models.PositiveIntegerField('Оценок 5',
+                                                default=0,
+                                                editable=False)
+    score_6_count = models.PositiveIntegerField('Оценок 6',
+                                                default=0,
+                                                editable=False)
+    score_7_count = models.PositiveIntegerField('Оценок 7',
+                                                default=0,
+                                                editable=False)
+    score_8_count = models.PositiveIntegerField('Оценок 8',
+                                                default=0,
+                                                editable=False)
+    score_9_count = models.PositiveIntegerField('Оценок 9',
+                                                default=0,
+                                                editable=False)
+    score_10_count = models.PositiveIntegerField('Оценок 10',
+                                                 default=0,
+                                                 editable=False)
+    updated_at = models.DateTimeField('Изменено',
+                                      auto_now=True,
+                                      db_index=True)
 
     class Meta:
         verbose_name = 'Произведение'
@@ -38,6 +89,11 @@ class Title(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def score_counts(self):
+        """Число отзывов с каждой оценкой от MIN_SCORE до MAX_SCORE."""
+        return [getattr(self, name) for name in HISTOGRAM_FIELDS]
+
 
 class Category(models.Model):
     name = models.CharField('Название',
@@ -45,6 +101,9 @@ class Category(models.Model):
     slug = models.SlugField(unique=True,
                             max_length=50,
                             db_index=True)
+    updated_at = models.DateTimeField('Изменено',
+                                      auto_now=True,
+                                      db_index=True)
 
     class Meta:
         verbose_name = 'Категория'
@@ -61,6 +120,9 @@ class Genre(models.Model):
                             unique=True,
                             max_length=50,
                             db_index=True)
+    updated_at = models.DateTimeField('Изменено',
+                                      auto_now=True,
+                                      db_index=True)
 
     class Meta:
         verbose_name = 'Жанр'
@@ -97,6 +159,8 @@ class Review(models.Model):
         'Оценка', validators=[MinValueValidator(MIN_SCORE),
                               MaxValueValidator(MAX_SCORE)])
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Изменено', auto_now=True,
+                                      db_index=True)
 
     class Meta:
         ordering = ('-score', '-pub_date')
@@ -109,6 +173,13 @@ class Review(models.Model):
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_title_id = instance.__dict__.get('title_id')
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
 
 class Comments(models.Model):
     text = models.TextField('Текст комментария')
@@ -116,6 +187,8 @@ class Comments(models.Model):
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     review = models.ForeignKey(Review, on_delete=models.CASCADE,
                                related_name='comments')
+    updated_at = models.DateTimeField('Изменено', auto_now=True,
+                                      db_index=True)
 
     class Meta:
         ordering = ('review', '-pub_date')
@@ -124,3 +197,211 @@ class Comments(models.Model):
 
     def __str__(self):
         return self.text[:15]
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Запись журнала изменений: объект изменён или удалён. Позицию в ленте
+    назначает лента изменений после коммита записи.
+    """
+    kind = models.CharField('Тип объекта', max_length=20)
+    object_id = models.BigIntegerField('id объекта')
+    deleted = models.BooleanField('Удалён', default=False)
+    created_at = models.DateTimeField('Создано', auto_now_add=True,
+                                      db_index=True)
+    position = models.BigIntegerField('Позиция', null=True, unique=True)
+
+    class Meta:
+        ordering = ('position', 'id')
+        verbose_name = 'Запись журнала изменений'
+        verbose_name_plural = 'Журнал изменений'
+
+    def __str__(self):
+        action = 'удалён' if self.deleted else 'изменён'
+        return f'{self.kind} {self.object_id} {action}'
+
+
+class ChangeSequence(models.Model):
+    """
+    Последняя выданная позиция ленты изменений и позиция, до которой
+    журнал очищен. Одна строка.
+    """
+    last = models.BigIntegerField('Последняя позиция', default=0)
+    purged = models.BigIntegerField('Очищено до позиции', default=0)
+
+    class Meta:
+        verbose_name = 'Позиция ленты изменений'
+        verbose_name_plural = 'Позиция ленты изменений'
+
+    def __str__(self):
+        return str(self.last)
+
+
+class RankingPrior(models.Model):
+    """
+    Априорная оценка байесовского рейтинга: сумма и число всех оценок
+    (меняются вместе со счётчиками произведений) и вес средней оценки в
+    отзывах. Одна строка.
+    """
+    score_sum = models.BigIntegerField('Сумма оценок', default=0)
+    reviews_count = models.BigIntegerField('Число отзывов', default=0)
+    weight = models.FloatField('Вес', default=0)
+    refreshed_at = models.DateTimeField('Пересчитано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Параметры рейтинга'
+        verbose_name_plural = 'Параметры рейтинга'
+
+    def __str__(self):
+        return f'{self.mean:.2f} × {self.weight:g}'
+
+    @property
+    def mean(self):
+        """Средняя оценка по всем отзывам."""
+        if not self.reviews_count:
+            return 0
+        return self.score_sum / self.reviews_count
+
+
+class TitleRanking(models.Model):
+    """Место произведения в рейтингах (только для произведений с отзывами)."""
+    title = models.OneToOneField(Title,
+                                 on_delete=models.CASCADE,
+                                 primary_key=True,
+                                 related_name='ranking')
+    category = models.ForeignKey(Category,
+                                 on_delete=models.SET_NULL,
+                                 null=True,
+                                 related_name='+')
+    year = models.PositiveSmallIntegerField('Год написания')
+    score = models.FloatField('Байесовская оценка')
+    reviews_count = models.PositiveIntegerField('Количество отзывов')
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Места в рейтинге'
+        indexes = [
+            models.Index(fields=('-score', 'title'),
+                         name='ranking_score_idx'),
+            models.Index(fields=('category', '-score', 'title'),
+                         name='ranking_category_score_idx'),
+            models.Index(fields=('-reviews_count', 'title'),
+                         name='ranking_reviews_idx'),
+            models.Index(fields=('category', '-reviews_count', 'title'),
+                         name='ranking_category_reviews_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.title_id}: {self.score:.2f}'
+
+
+class TitleSimilarity(models.Model):
+    """Сосед произведения для «похожих произведений» (top-K по сходству)."""
+    title = models.ForeignKey(Title,
+                              on_delete=models.CASCADE,
+                              related_name='similarities')
+    similar = models.ForeignKey(Title,
+                                on_delete=models.CASCADE,
+                                related_name='+')
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        ordering = ('title', '-score')
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        constraints = [models.UniqueConstraint(
+            fields=['title', 'similar'],
+            name='unique_title_similarity')]
+        indexes = [models.Index(fields=('title', '-score'),
+                                name='similarity_title_score_idx')]
+
+    def __str__(self):
+        return f'{self.title_id} ~ {self.similar_id}: {self.score:.3f}'
+
+
+class UserRecommendation(models.Model):
+    """Рекомендованное пользователю произведение с ожидаемой оценкой."""
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='recommendations')
+    title = models.ForeignKey(Title,
+                              on_delete=models.CASCADE,
+                              related_name='+')
+    score = models.FloatField('Ожидаемая оценка')
+
+    class Meta:
+        ordering = ('user', '-score')
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'title'],
+            name='unique_user_recommendation')]
+        indexes = [models.Index(fields=('user', '-score'),
+                                name='recommendation_user_score_idx')]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.title_id}: {self.score:.2f}'
+
+
+class StaleRecommendations(models.Model):
+    """
+    Пользователь менял отзывы после расчёта рекомендаций: до пересчёта
+    командой compute_recommendations --stale отдаются прежние.
+    """
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='+')
+    marked_at = models.DateTimeField('Отмечено', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Устаревшие рекомендации'
+        verbose_name_plural = 'Устаревшие рекомендации'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.marked_at}'
+
+
+class TrendReference(models.Model):
+    """
+    Точка отсчёта счётчиков активности (TitleTrend). Одна строка,
+    переносится вперёд, когда множители счётчиков становятся слишком
+    большими.
+    """
+    reference = models.DateTimeField('Точка отсчёта')
+
+    class Meta:
+        verbose_name = 'Точка отсчёта активности'
+        verbose_name_plural = 'Точка отсчёта активности'
+
+    def __str__(self):
+        return self.reference.isoformat()
+
+
+class TitleTrend(models.Model):
+    """
+    Затухающие счётчики активности по отзывам и комментариям к
+    произведению, по одному на окно (см. reviews.trending).
+    """
+    title = models.OneToOneField(Title,
+                                 on_delete=models.CASCADE,
+                                 primary_key=True,
+                                 related_name='trend')
+    day_score = models.FloatField('Активность за день', default=0)
+    week_score = models.FloatField('Активность за неделю', default=0)
+    month_score = models.FloatField('Активность за месяц', default=0)
+
+    class Meta:
+        verbose_name = 'Активность произведения'
+        verbose_name_plural = 'Активность произведений'
+        indexes = [
+            models.Index(fields=('-day_score', 'title'),
+                         name='trend_day_idx'),
+            models.Index(fields=('-week_score', 'title'),
+                         name='trend_week_idx'),
+            models.Index(fields=('-month_score', 'title'),
+                         name='trend_month_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.title_id}: {self.day_score:g}'
@@ -0,0 +1,145 @@
+"""
+Предрасчитанные рейтинги произведений.
+
+Место в рейтинге определяется байесовской оценкой
+
+    (weight * mean + score_sum) / (weight + reviews_count),
+
+где mean — средняя оценка по всем отзывам, а weight — число «виртуальных»
+отзывов со средней оценкой, которое добавляется каждому произведению.
+Так произведение с одним отзывом на 10 не обгоняет произведение с сотней
+отзывов в среднем на 9. Сумма и число всех оценок (RankingPrior)
+меняются тем же сигналом, что и счётчики произведения, поэтому строка
+TitleRanking при изменении отзывов считается по текущему mean. Строки
+остальных произведений хранят mean на момент своего обновления: команда
+refresh_rankings (по расписанию, например раз в сутки) и массовая
+загрузка данных пересчитывают все строки по одному mean.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, Sum
+
+from reviews.models import RankingPrior, Title, TitleRanking
+
+ORDER_SCORE = 'score'
+ORDER_REVIEWS = 'reviews'
+ORDERINGS = {
+    ORDER_SCORE: ('-score', 'title'),
+    ORDER_REVIEWS: ('-reviews_count', 'title'),
+}
+PRIOR_PK = 1
+
+
+def compute_prior(using=DEFAULT_DB_ALIAS):
+    totals = Title.objects.using(using).aggregate(
+        score_sum=Sum('score_sum'), reviews_count=Sum('reviews_count')
+    )
+    return RankingPrior(
+        pk=PRIOR_PK,
+        score_sum=totals['score_sum'] or 0,
+        reviews_count=totals['reviews_count'] or 0,
+        weight=getattr(settings, 'RANKING_PRIOR_WEIGHT', 10),
+    )
+
+
+def get_prior(using=DEFAULT_DB_ALIAS):
+    prior = RankingPrior.objects.using(using).filter(pk=PRIOR_PK).first()
+    if prior is None:
+        prior = compute_prior(using)
+        prior.save(using=using)
+    return prior
+
+
+def shift_prior(score_delta, count_delta, using=DEFAULT_DB_ALIAS):
+    """
+    Сдвигает сумму и число оценок. Если строки ещё нет, get_prior
+    посчитает её по счётчикам произведений, где сдвиг уже учтён.
+    """
+    if score_delta or count_delta:
+        RankingPrior.objects.using(using).filter(pk=PRIOR_PK).update(
+            score_sum=F('score_sum') + score_delta,
+            reviews_count=F('reviews_count') + count_delta,
+        )
+
+
+def bayesian_score(score_sum, reviews_count, prior):
+    return (prior.weight * prior.mean + score_sum) / (
+        prior.weight + reviews_count
+    )
+
+
+def update_title_ranking(title_id, create=True, using=DEFAULT_DB_ALIAS):
+    """
+    Пересчитывает строку рейтинга произведения. С `create=False` только
+    обновляет существующую строку: удаление отзыва при каскадном
+    удалении произведения не должно создавать её заново.
+    """
+    rankings = TitleRanking.objects.using(using).filter(title_id=title_id)
+    title = Title.objects.using(using).filter(pk=title_id).values(
+        'category_id', 'year', 'score_sum', 'reviews_count'
+    ).first()
+    if title is None or not title['reviews_count']:
+        rankings.delete()
+        return
+    values = {
+        'category_id': title['category_id'],
+        'year': title['year'],
+        'reviews_count': title['reviews_count'],
+        'score': bayesian_score(
+            title['score_sum'], title['reviews_count'], get_prior(using)
+        ),
+    }
+    if rankings.update(**values) or not create:
+        return
+    try:
+        with transaction.atomic(using=using):
+            rankings.create(title_id=title_id, **values)
+    except IntegrityError:
+        rankings.update(**values)
+
+
+def refresh_rankings(batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """Пересчитывает mean и weight и все строки рейтинга."""
+    prior = compute_prior(using)
+    titles = Title.objects.using(using).filter(
+        reviews_count__gt=0
+    ).order_by('pk').values_list(
+        'pk', 'category_id', 'year', 'score_sum', 'reviews_count'
+    )
+    created = 0
+    with transaction.atomic(using=using):
+        prior.save(using=using)
+        TitleRanking.objects.using(using).all().delete()
+        batch = []
+        for pk, category_id, year, score_sum, count in titles.iterator(
+            chunk_size=batch_size
+        ):
+            batch.append(TitleRanking(
+                title_id=pk, category_id=category_id, year=year,
+                reviews_count=count,
+                score=bayesian_score(score_sum, count, prior),
+            ))
+            if len(batch) >= batch_size:
+                TitleRanking.objects.using(using).bulk_create(batch)
+                created += len(batch)
+                batch = []
+        TitleRanking.objects.using(using).bulk_create(batch)
+        created += len(batch)
+    return prior, created
+
+
+def top_titles(category=None, genre=None, year_min=None, year_max=None,
+               order=ORDER_SCORE, limit=10, using=DEFAULT_DB_ALIAS):
+    """Первые `limit` строк рейтинга: (title_id, score, reviews_count)."""
+    rankings = TitleRanking.objects.using(using)
+    if category is not None:
+        rankings = rankings.filter(category__slug=category)
+    if genre is not None:
+        rankings = rankings.filter(title__genre__slug=genre)
+    if year_min is not None:
+        rankings = rankings.filter(year__gte=year_min)
+    if year_max is not None:
+        rankings = rankings.filter(year__lte=year_max)
+    return list(rankings.order_by(*ORDERINGS[order]).values_list(
+        'title_id', 'score', 'reviews_count'
+    )[:limit])
@@ -0,0 +1,486 @@
+"""
+Похожие произведения по оценкам пользователей (item-item).
+
+Сходство двух произведений — скорректированный косинус: оценка каждого
+отзыва центрируется по средней оценке его автора,
+
+    sim(i, j) = sum_u c_ui * c_uj / (|c_i| * |c_j|) * n / (n + shrinkage),
+
+где сумма по n пользователям, оценившим оба произведения, а |c_i| —
+норма по всем отзывам на произведение. Множитель n / (n + shrinkage)
+занижает сходство, подтверждённое парой отзывов. Пары с n < min_support
+и неположительным сходством отбрасываются, для каждого произведения
+хранятся `top_k` соседей (TitleSimilarity).
+
+Матрица сходства считается по частям из `chunk_size` произведений, так
+что в памяти одновременно не больше chunk_size x (число произведений)
+сумм. С NumPy суммы накапливаются векторно, без него — в словарях;
+результаты совпадают.
+
+Персональные рекомендации — взвешенная по сходству сумма отклонений
+оценок пользователя от его средней по соседям оценённых произведений:
+
+    pred(u, j) = m_u + sum_i sim(i, j) * c_ui / sum_i sim(i, j),
+
+по произведениям i, оценённым пользователем, у которых j среди соседей.
+Они считаются пачками пользователей и хранятся в UserRecommendation.
+Пользователи, менявшие отзывы после расчёта, отмечены в
+StaleRecommendations и пересчитываются `compute_stale_recommendations`.
+"""
+import heapq
+import math
+from collections import defaultdict, namedtuple
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from reviews.models import (MAX_SCORE, MIN_SCORE, Review,
+                            StaleRecommendations, TitleSimilarity,
+                            UserRecommendation)
+from reviews.signals import recommendations_written
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+SimilarityResult = namedtuple('SimilarityResult', ('titles', 'neighbours'))
+RecommendationResult = namedtuple(
+    'RecommendationResult', ('users', 'recommendations')
+)
+
+# Сколько пар отзывов обрабатывается за один шаг в NumPy.
+PAIRS_PER_BLOCK = 1_000_000
+
+
+def center(ratings):
+    """Оценки за вычетом средней автора и сами средние."""
+    centered, means = {}, {}
+    for author_id, scores in ratings.items():
+        means[author_id] = sum(score for _, score in scores) / len(scores)
+        centered[author_id] = [
+            (title_id, score - means[author_id]) for title_id, score in scores
+        ]
+    return centered, means
+
+
+def load_ratings(using=DEFAULT_DB_ALIAS):
+    """Центрированные оценки: {автор: [(произведение, оценка), ...]}."""
+    ratings = defaultdict(list)
+    reviews = Review.objects.using(using).order_by(
+        'author_id', 'title_id'
+    ).values_list('author_id', 'title_id', 'score')
+    for author_id, title_id, score in reviews.iterator(chunk_size=10000):
+        ratings[author_id].append((title_id, score))
+    return center(ratings)[0]
+
+
+def shrunk(dot, norm, other_norm, count, shrinkage):
+    return dot / (norm * other_norm) * (count / (count + shrinkage))
+
+
+def top_neighbours(candidates, top_k):
+    """Лучшие `top_k` пар (сходство, id): по убыванию сходства, затем id."""
+    return [
+        (similar_id, score) for score, similar_id in heapq.nsmallest(
+            top_k, candidates, key=lambda item: (-item[0], item[1])
+        )
+    ]
+
+
+class PythonEngine:
+    """Расчёт на словарях; используется, если NumPy не установлен."""
+
+    def __init__(self, ratings):
+        self.ratings = ratings
+        self.norms = defaultdict(float)
+        self.raters = defaultdict(list)
+        for author_id, scores in ratings.items():
+            for title_id, value in scores:
+                self.norms[title_id] += value * value
+                self.raters[title_id].append(author_id)
+        self.norms = {
+            title_id: math.sqrt(norm) for title_id, norm in self.norms.items()
+        }
+
+    def neighbours(self, title_ids, top_k, min_support, shrinkage):
+        dots = {title_id: defaultdict(float) for title_id in title_ids}
+        counts = {title_id: defaultdict(int) for title_id in title_ids}
+        for author_id in sorted({
+            author_id for title_id in title_ids
+            for author_id in self.raters.get(title_id, ())
+        }):
+            scores = self.ratings[author_id]
+            for title_id, value in scores:
+                if title_id not in dots:
+                    continue
+                for other_id, other_value in scores:
+                    dots[title_id][other_id] += value * other_value
+                    counts[title_id][other_id] += 1
+        result = {}
+        for title_id in title_ids:
+            norm = self.norms.get(title_id, 0)
+            candidates = []
+            for other_id, count in counts[title_id].items():
+                other_norm = self.norms[other_id]
+                if other_id == title_id or count < min_support or not (
+                    norm and other_norm
+                ):
+                    continue
+                score = shrunk(
+                    dots[title_id][other_id], norm, other_norm, count,
+                    shrinkage
+                )
+                if score > 0:
+                    candidates.append((score, other_id))
+            result[title_id] = top_neighbours(candidates, top_k)
+        return result
+
+
+class NumpyEngine:
+    """
+    Векторный расчёт. Отзывы хранятся по авторам (как CSR-матрица
+    автор x произведение); для части произведений строятся все пары
+    «отзыв на произведение из части — отзыв того же автора» и
+    суммируются в плотные матрицы часть x все произведения.
+    """
+
+    def __init__(self, ratings):
+        authors = sorted(ratings)
+        self.title_ids = numpy.array(sorted({
+            title_id for scores in ratings.values() for title_id, _ in scores
+        }), dtype=numpy.int64)
+        self.items = numpy.array([
+            title_id for author_id in authors
+            for title_id, _ in ratings[author_id]
+        ], dtype=numpy.int64)
+        self.items = numpy.searchsorted(self.title_ids, self.items)
+        self.values = numpy.array([
+            value for author_id in authors for _, value in ratings[author_id]
+        ], dtype=numpy.float64)
+        lengths = numpy.array(
+            [len(ratings[author_id]) for author_id in authors],
+            dtype=numpy.int64
+        )
+        self.users = numpy.repeat(numpy.arange(len(authors)), lengths)
+        self.indptr = numpy.zeros(len(authors) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=self.indptr[1:])
+        squares = numpy.zeros(len(self.title_ids))
+        numpy.add.at(squares, self.items, self.values * self.values)
+        self.norms = numpy.sqrt(squares)
+
+    def blocks(self, entries):
+        """Пачки отзывов из части, дающие не больше PAIRS_PER_BLOCK пар."""
+        users = self.users[entries]
+        lengths = self.indptr[users + 1] - self.indptr[users]
+        totals = numpy.cumsum(lengths)
+        start = 0
+        while start < len(entries):
+            offset = totals[start - 1] if start else 0
+            stop = max(start + 1, int(numpy.searchsorted(
+                totals, offset + PAIRS_PER_BLOCK, side='right'
+            )))
+            yield entries[start:stop], users[start:stop], \
+                lengths[start:stop]
+            start = stop
+
+    def accumulate(self, rows, entries, dots, counts):
+        size = len(self.title_ids)
+        for block, users, lengths in self.blocks(entries):
+            starts = numpy.repeat(self.indptr[users], lengths)
+            offsets = numpy.arange(lengths.sum()) - numpy.repeat(
+                numpy.cumsum(lengths) - lengths, lengths
+            )
+            others = starts + offsets
+            cells = (
+                numpy.repeat(rows[self.items[block]], lengths) * size
+                + self.items[others]
+            )
+            numpy.add.at(
+                dots, cells,
+                numpy.repeat(self.values[block], lengths)
+                * self.values[others]
+            )
+            numpy.add.at(counts, cells, 1)
+
+    def neighbours(self, title_ids, top_k, min_support, shrinkage):
+        result = {title_id: [] for title_id in title_ids}
+        positions = numpy.searchsorted(self.title_ids, title_ids)
+        known = positions < len(self.title_ids)
+        known[known] = self.title_ids[positions[known]] == numpy.array(
+            title_ids, dtype=numpy.int64
+        )[known]
+        chunk = positions[known]
+        if not len(chunk):
+            return result
+        size = len(self.title_ids)
+        rows = numpy.full(size, -1, dtype=numpy.int64)
+        rows[chunk] = numpy.arange(len(chunk))
+        dots = numpy.zeros(len(chunk) * size)
+        counts = numpy.zeros(len(chunk) * size, dtype=numpy.int64)
+        self.accumulate(
+            rows, numpy.flatnonzero(rows[self.items] >= 0), dots, counts
+        )
+        dots = dots.reshape(len(chunk), size)
+        counts = counts.reshape(len(chunk), size)
+        counts[numpy.arange(len(chunk)), chunk] = 0
+        for row, item in enumerate(chunk):
+            result[int(self.title_ids[item])] = self.top(
+                item, dots[row], counts[row], top_k, min_support, shrinkage
+            )
+        return result
+
+    def top(self, item, dots, counts, top_k, min_support, shrinkage):
+        norm = self.norms[item]
+        candidates = numpy.flatnonzero(
+            (counts >= max(min_support, 1)) & (self.norms > 0)
+        )
+        if not norm or not len(candidates):
+            return []
+        scores = shrunk(
+            dots[candidates], norm, self.norms[candidates],
+            counts[candidates], shrinkage
+        )
+        positive = scores > 0
+        candidates, scores = candidates[positive], scores[positive]
+        if len(candidates) > top_k:
+            best = numpy.argpartition(-scores, top_k - 1)[:top_k]
+            # Равные последнему попавшему тоже участвуют в выборе по id.
+            scores_limit = scores[best].min()
+            best = numpy.flatnonzero(scores >= scores_limit)
+            candidates, scores = candidates[best], scores[best]
+        return top_neighbours(
+            zip(scores.tolist(), self.title_ids[candidates].tolist()), top_k
+        )
+
+
+def get_engine(ratings, use_numpy=None):
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy and numpy is None:
+        raise RuntimeError('NumPy не установлен')
+    return NumpyEngine(ratings) if use_numpy else PythonEngine(ratings)
+
+
+def write_neighbours(neighbours, using=DEFAULT_DB_ALIAS):
+    """Заменяет соседей перечисленных произведений."""
+    similarities = TitleSimilarity.objects.using(using)
+    with transaction.atomic(using=using):
+        similarities.filter(title_id__in=list(neighbours)).delete()
+        similarities.bulk_create([
+            TitleSimilarity(title_id=title_id, similar_id=similar_id,
+                            score=score)
+            for title_id, rows in neighbours.items()
+            for similar_id, score in rows
+        ])
+    return sum(len(rows) for rows in neighbours.values())
+
+
+def compute_similarities(title_ids, top_k=20, chunk_size=200, min_support=2,
+                         shrinkage=10, use_numpy=None,
+                         using=DEFAULT_DB_ALIAS):
+    """
+    Пересчитывает соседей произведений `title_ids` по всем отзывам и
+    записывает их по частям. Возвращает SimilarityResult.
+    """
+    engine = get_engine(load_ratings(using), use_numpy)
+    title_ids = sorted(title_ids)
+    written = 0
+    for start in range(0, len(title_ids), chunk_size):
+        written += write_neighbours(
+            engine.neighbours(
+                title_ids[start:start + chunk_size], top_k, min_support,
+                shrinkage
+            ),
+            using
+        )
+    return SimilarityResult(len(title_ids), written)
+
+
+def affected_titles(changed_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Произведения, соседей которых нужно пересчитать после изменения
+    `changed_ids`: сами они, произведения, оценённые их авторами
+    (у тех изменились средние и общие оценки), и прежние соседи.
+    """
+    changed_ids = set(changed_ids)
+    reviews = Review.objects.using(using)
+    rated = reviews.filter(author_id__in=reviews.filter(
+        title_id__in=changed_ids
+    ).values('author_id')).values_list('title_id', flat=True).distinct()
+    previous = TitleSimilarity.objects.using(using).filter(
+        similar_id__in=changed_ids
+    ).values_list('title_id', flat=True)
+    return changed_ids | set(rated) | set(previous)
+
+
+def load_user_ratings(user_ids, using=DEFAULT_DB_ALIAS):
+    ratings = defaultdict(list)
+    reviews = Review.objects.using(using).filter(
+        author_id__in=user_ids
+    ).order_by('author_id', 'title_id').values_list(
+        'author_id', 'title_id', 'score'
+    )
+    for author_id, title_id, score in reviews:
+        ratings[author_id].append((title_id, score))
+    return center(ratings)
+
+
+def load_neighbours(title_ids, using=DEFAULT_DB_ALIAS):
+    """Строки сходства (произведение, сосед, сходство) по возрастанию id."""
+    return list(TitleSimilarity.objects.using(using).filter(
+        title_id__in=title_ids
+    ).order_by('title_id', 'similar_id').values_list(
+        'title_id', 'similar_id', 'score'
+    ))
+
+
+def clip_score(value):
+    return min(max(value, MIN_SCORE), MAX_SCORE)
+
+
+def predict_python(ratings, means, similarities, limit):
+    neighbours = defaultdict(list)
+    for title_id, similar_id, score in similarities:
+        neighbours[title_id].append((similar_id, score))
+    result = {}
+    for author_id, scores in ratings.items():
+        seen = {title_id for title_id, _ in scores}
+        sums, weights = defaultdict(float), defaultdict(float)
+        for title_id, value in scores:
+            for similar_id, score in neighbours[title_id]:
+                sums[similar_id] += score * value
+                weights[similar_id] += score
+        result[author_id] = top_neighbours(
+            (
+                (clip_score(means[author_id] + total / weights[title_id]),
+                 title_id)
+                for title_id, total in sums.items()
+                if title_id not in seen and weights[title_id] > 0
+            ),
+            limit
+        )
+    return result
+
+
+def predict_numpy(ratings, means, similarities, limit):
+    """
+    То же для пачки пользователей: пары «отзыв — сосед его произведения»
+    суммируются в плотные матрицы пользователь x кандидат.
+    """
+    authors = sorted(ratings)
+    result = {author_id: [] for author_id in authors}
+    if not similarities:
+        return result
+    sources, targets, weights = (
+        numpy.array(column) for column in zip(*similarities)
+    )
+    candidates = numpy.unique(targets)
+    rows = numpy.repeat(
+        numpy.arange(len(authors)),
+        [len(ratings[author_id]) for author_id in authors]
+    )
+    titles = numpy.array([
+        title_id for author_id in authors
+        for title_id, _ in ratings[author_id]
+    ], dtype=numpy.int64)
+    values = numpy.array([
+        value for author_id in authors for _, value in ratings[author_id]
+    ], dtype=numpy.float64)
+    starts = numpy.searchsorted(sources, titles, side='left')
+    lengths = numpy.searchsorted(sources, titles, side='right') - starts
+    pairs = numpy.repeat(starts, lengths) + numpy.arange(lengths.sum()) - (
+        numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+    )
+    cells = (
+        numpy.repeat(rows, lengths) * len(candidates)
+        + numpy.searchsorted(candidates, targets[pairs])
+    )
+    size = len(authors) * len(candidates)
+    sums, totals = numpy.zeros(size), numpy.zeros(size)
+    numpy.add.at(sums, cells, weights[pairs] * numpy.repeat(values, lengths))
+    numpy.add.at(totals, cells, weights[pairs])
+    sums = sums.reshape(len(authors), len(candidates))
+    totals = totals.reshape(len(authors), len(candidates))
+    seen = numpy.searchsorted(candidates, titles).clip(max=len(candidates) - 1)
+    known = candidates[seen] == titles
+    totals[rows[known], seen[known]] = 0
+    for row, author_id in enumerate(authors):
+        columns = numpy.flatnonzero(totals[row] > 0)
+        scores = numpy.clip(
+            means[author_id] + sums[row, columns] / totals[row, columns],
+            MIN_SCORE, MAX_SCORE
+        )
+        result[author_id] = top_neighbours(
+            zip(scores.tolist(), candidates[columns].tolist()), limit
+        )
+    return result
+
+
+def recommend(user_ids, limit=50, use_numpy=None, using=DEFAULT_DB_ALIAS):
+    """
+    Рекомендации пачке пользователей по сохранённым соседям:
+    {пользователь: [(произведение, ожидаемая оценка), ...]}.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy and numpy is None:
+        raise RuntimeError('NumPy не установлен')
+    ratings, means = load_user_ratings(user_ids, using)
+    similarities = load_neighbours(
+        {title_id for scores in ratings.values() for title_id, _ in scores},
+        using
+    )
+    predict = predict_numpy if use_numpy else predict_python
+    result = {user_id: [] for user_id in user_ids}
+    result.update(predict(ratings, means, similarities, limit))
+    return result
+
+
+def write_recommendations(recommendations, using=DEFAULT_DB_ALIAS):
+    """Заменяет рекомендации перечисленных пользователей."""
+    stored = UserRecommendation.objects.using(using)
+    with transaction.atomic(using=using):
+        stored.filter(user_id__in=list(recommendations)).delete()
+        stored.bulk_create([
+            UserRecommendation(user_id=user_id, title_id=title_id,
+                               score=score)
+            for user_id, rows in recommendations.items()
+            for title_id, score in rows
+        ])
+    return sum(len(rows) for rows in recommendations.values())
+
+
+def compute_recommendations(user_ids, limit=50, batch_size=100,
+                            use_numpy=None, using=DEFAULT_DB_ALIAS):
+    """
+    Пересчитывает и записывает рекомендации пачками пользователей,
+    снимает с них отметки об устаревании, поставленные до начала расчёта,
+    и после каждой пачки шлёт recommendations_written.
+    """
+    user_ids = sorted(user_ids)
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        started = timezone.now()
+        written += write_recommendations(
+            recommend(batch, limit, use_numpy, using), using
+        )
+        StaleRecommendations.objects.using(using).filter(
+            user_id__in=batch, marked_at__lte=started
+        ).delete()
+        recommendations_written.send(
+            sender=UserRecommendation, user_ids=batch
+        )
+    return RecommendationResult(len(user_ids), written)
+
+
+def compute_stale_recommendations(limit=50, batch_size=100, use_numpy=None,
+                                  using=DEFAULT_DB_ALIAS):
+    """Пересчитывает рекомендации пользователей, менявших отзывы."""
+    return compute_recommendations(
+        StaleRecommendations.objects.using(using).values_list(
+            'user_id', flat=True
+        ),
+        limit, batch_size, use_numpy, using
+    )
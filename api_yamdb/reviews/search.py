@@ -0,0 +1,409 @@
+"""
+Полнотекстовый поиск по произведениям, отзывам и комментариям.
+
+На SQLite с FTS5 индекс хранится в виртуальных таблицах с внешним
+содержимым и поддерживается триггерами, поэтому его не обходят ни
+`QuerySet.update()`, ни массовые удаления. На остальных СУБД используется
+инвертированный индекс в памяти процесса, который строится при первом
+поиске и дальше обновляется сигналами.
+"""
+import bisect
+import heapq
+import math
+import re
+import sys
+import threading
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.html import escape
+
+from reviews.models import Comments, Review, Title
+
+SNIPPET_START = '<b>'
+SNIPPET_END = '</b>'
+SNIPPET_ELLIPSIS = '…'
+# Границы совпадений в сниппете FTS5: управляющие символы, которых нет в
+# экранированном тексте; заменяются на SNIPPET_START и SNIPPET_END.
+FTS_MATCH_START = '\x02'
+FTS_MATCH_END = '\x03'
+SNIPPET_WORDS = 10
+
+SearchHit = namedtuple(
+    'SearchHit',
+    ('kind', 'object_id', 'title_id', 'review_id', 'score', 'snippet')
+)
+SearchSource = namedtuple('SearchSource', ('kind', 'model', 'fields'))
+
+SOURCES = (
+    SearchSource('title', Title, ('name', 'description')),
+    SearchSource('review', Review, ('text',)),
+    SearchSource('comment', Comments, ('text',)),
+)
+KINDS = tuple(source.kind for source in SOURCES)
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def source_for(model):
+    for source in SOURCES:
+        if isinstance(model, source.model) or model is source.model:
+            return source
+    return None
+
+
+class Fts5SearchBackend:
+    """Поиск через виртуальные таблицы SQLite FTS5."""
+    rank_weights = {'title': (2.0, 1.0)}
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @staticmethod
+    def fts_table(source):
+        return f'{source.model._meta.db_table}_fts'
+
+    def install(self):
+        """Создаёт таблицы и триггеры; новую таблицу сразу заполняет."""
+        with connections[self.using].cursor() as cursor:
+            existing = {
+                row[0] for row in cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+            for source in SOURCES:
+                if self.fts_table(source) in existing:
+                    continue
+                for statement in self.install_sql(source):
+                    cursor.execute(statement)
+                self.rebuild_source(cursor, source)
+
+    def install_sql(self, source):
+        fts = self.fts_table(source)
+        table = source.model._meta.db_table
+        columns = ', '.join(source.fields)
+        new = ', '.join(f'new.{field}' for field in source.fields)
+        old = ', '.join(f'old.{field}' for field in source.fields)
+        delete = (
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old});"
+        )
+        insert = f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new});'
+        return (
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, "
+            f"content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')",
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} '
+            f'BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} '
+            f'BEGIN {delete} END',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_au '
+            f'AFTER UPDATE OF {columns} ON {table} '
+            f'BEGIN {delete} {insert} END',
+        )
+
+    def rebuild_source(self, cursor, source):
+        fts = self.fts_table(source)
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    def rebuild(self):
+        self.install()
+        with connections[self.using].cursor() as cursor:
+            for source in SOURCES:
+                self.rebuild_source(cursor, source)
+        return {
+            source.kind: source.model.objects.using(self.using).count()
+            for source in SOURCES
+        }
+
+    @staticmethod
+    def match_expression(query):
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def select_sql(self, source):
+        fts = self.fts_table(source)
+        table = source.model._meta.db_table
+        weights = ', '.join(
+            str(weight) for weight in self.rank_weights.get(source.kind, ())
+        )
+        bm25 = f'bm25({fts}, {weights})' if weights else f'bm25({fts})'
+        snippet = (
+            f"snippet({fts}, -1, char(2), char(3), "
+            f"'{SNIPPET_ELLIPSIS}', {SNIPPET_WORDS})"
+        )
+        if source.model is Title:
+            ids, joins = 'obj.id, NULL', ''
+        elif source.model is Review:
+            ids, joins = 'obj.title_id, NULL', ''
+        else:
+            review_table = Review._meta.db_table
+            ids = 'review.title_id, obj.review_id'
+            joins = f'JOIN {review_table} review ON review.id = obj.review_id'
+        return (
+            f"SELECT '{source.kind}', obj.id, {ids}, -{bm25}, {snippet} "
+            f'FROM {fts} JOIN {table} obj ON obj.id = {fts}.rowid {joins} '
+            f'WHERE {fts} MATCH %s'
+        )
+
+    def search(self, query, kinds=KINDS, limit=20):
+        expression = self.match_expression(query)
+        sources = [source for source in SOURCES if source.kind in kinds]
+        if not expression or not sources:
+            return []
+        sql = ' UNION ALL '.join(self.select_sql(source) for source in sources)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'{sql} ORDER BY 5 DESC LIMIT %s',
+                [expression] * len(sources) + [limit]
+            )
+            return [
+                SearchHit(*row[:-1], mark_fts_snippet(row[-1]))
+                for row in cursor.fetchall()
+            ]
+
+    def title_ids(self, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        fts = self.fts_table(SOURCES[0])
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [expression]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def object_saved(self, instance):
+        pass
+
+    def object_deleted(self, instance):
+        pass
+
+
+class PythonSearchBackend:
+    """
+    Инвертированный индекс в памяти процесса с ранжированием BM25.
+    Слова индекса хранятся ещё и отсортированным списком: слова с данным
+    префиксом находятся двоичным поиском. Изменения, сделанные другими
+    процессами, видны только после rebuild().
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.postings = {}
+        self.terms = []
+        self.documents = {}
+        self.total_length = 0
+
+    def install(self):
+        pass
+
+    def rebuild(self):
+        with self.lock:
+            self.postings.clear()
+            self.terms.clear()
+            self.documents.clear()
+            self.total_length = 0
+            counts = {}
+            for source in SOURCES:
+                queryset = source.model.objects.using(self.using)
+                if source.model is Comments:
+                    queryset = queryset.select_related('review')
+                counts[source.kind] = 0
+                for instance in queryset.iterator():
+                    self.add(source, instance)
+                    counts[source.kind] += 1
+            self.loaded = True
+            return counts
+
+    def add(self, source, instance):
+        key = (source.kind, instance.pk)
+        self.discard(key)
+        text = ' '.join(
+            getattr(instance, field) or '' for field in source.fields
+        )
+        if source.model is Title:
+            ids = (instance.pk, None)
+        elif source.model is Review:
+            ids = (instance.title_id, None)
+        else:
+            ids = (instance.review.title_id, instance.review_id)
+        tokens = tokenize(text)
+        for token in set(tokens):
+            if token not in self.postings:
+                self.postings[token] = {}
+                bisect.insort(self.terms, token)
+            self.postings[token][key] = tokens.count(token)
+        self.documents[key] = (text, ids, len(tokens))
+        self.total_length += len(tokens)
+
+    def discard(self, key):
+        document = self.documents.pop(key, None)
+        if document is None:
+            return
+        self.total_length -= document[2]
+        for token in set(tokenize(document[0])):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[token]
+                    del self.terms[bisect.bisect_left(self.terms, token)]
+
+    def object_saved(self, instance):
+        source = source_for(instance)
+        if source is None:
+            return
+        with self.lock:
+            if self.loaded:
+                self.add(source, instance)
+
+    def object_deleted(self, instance):
+        source = source_for(instance)
+        if source is None:
+            return
+        with self.lock:
+            if self.loaded:
+                self.discard((source.kind, instance.pk))
+
+    def prefixed(self, prefix):
+        """Слова индекса, начинающиеся с `prefix`."""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + chr(sys.maxunicode))
+        return self.terms[start:end]
+
+    def score(self, query_tokens, kinds):
+        """BM25 по документам, содержащим все слова запроса (как префиксы)."""
+        total = len(self.documents) or 1
+        average = self.total_length / total or 1
+        scores = None
+        for query_token in query_tokens:
+            matches = defaultdict(int)
+            for token in self.prefixed(query_token):
+                for key, frequency in self.postings[token].items():
+                    matches[key] += frequency
+            idf = math.log(1 + (total - len(matches) + 0.5)
+                           / (len(matches) + 0.5))
+            token_scores = {}
+            for key, frequency in matches.items():
+                if key[0] not in kinds:
+                    continue
+                length = self.documents[key][2]
+                token_scores[key] = idf * frequency * (self.k1 + 1) / (
+                    frequency
+                    + self.k1 * (1 - self.b + self.b * length / average)
+                )
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    key: value + token_scores[key]
+                    for key, value in scores.items() if key in token_scores
+                }
+        return scores or {}
+
+    def search(self, query, kinds=KINDS, limit=20):
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        with self.lock:
+            if not self.loaded:
+                self.rebuild()
+            scores = self.score(query_tokens, kinds)
+            ranked = heapq.nlargest(
+                limit, scores.items(), key=lambda item: item[1]
+            )
+            # Сниппеты — только для возвращаемой страницы.
+            return [
+                SearchHit(
+                    key[0], key[1], *self.documents[key][1], score,
+                    make_snippet(self.documents[key][0], query_tokens)
+                )
+                for key, score in ranked
+            ]
+
+    def title_ids(self, query):
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        with self.lock:
+            if not self.loaded:
+                self.rebuild()
+            return [
+                key[1] for key in self.score(query_tokens, ('title', ))
+            ]
+
+
+def mark_fts_snippet(snippet):
+    """Экранирует HTML в сниппете FTS5 и выделяет совпадения."""
+    return escape(snippet).replace(
+        FTS_MATCH_START, SNIPPET_START
+    ).replace(FTS_MATCH_END, SNIPPET_END)
+
+
+def make_snippet(text, query_tokens, words=SNIPPET_WORDS):
+    """
+    Фрагмент текста вокруг первого совпадения с выделенными словами;
+    текст экранирован, HTML в нём — только SNIPPET_START и SNIPPET_END.
+    """
+    found = list(TOKEN_RE.finditer(text))
+
+    def matches(match):
+        word = match.group().lower()
+        return any(word.startswith(token) for token in query_tokens)
+
+    first = next(
+        (index for index, match in enumerate(found) if matches(match)), 0
+    )
+    start = max(0, min(first - words // 2, len(found) - words))
+    window = found[start:start + words]
+    if not window:
+        return ''
+    parts = []
+    position = window[0].start()
+    for match in window:
+        parts.append(escape(text[position:match.start()]))
+        if matches(match):
+            parts.append(
+                f'{SNIPPET_START}{escape(match.group())}{SNIPPET_END}'
+            )
+        else:
+            parts.append(escape(match.group()))
+        position = match.end()
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = SNIPPET_ELLIPSIS + snippet
+    if start + words < len(found):
+        snippet += SNIPPET_ELLIPSIS
+    return snippet
+
+
+_backends = {}
+
+
+def fts5_available(using):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any('FTS5' in row[0] for row in cursor.fetchall())
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    """Возвращает бэкенд поиска согласно `settings.SEARCH_BACKEND`."""
+    if using not in _backends:
+        choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if choice == 'fts5' or choice == 'auto' and fts5_available(using):
+            _backends[using] = Fts5SearchBackend(using)
+        else:
+            _backends[using] = PythonSearchBackend(using)
+    return _backends[using]
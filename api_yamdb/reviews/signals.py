@@ -0,0 +1,208 @@
+from django.db.models import Case, F, IntegerField, When
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from reviews.changes import kind_of, record_changes, touch_titles
+from reviews.models import (Category, Comments, Genre, Review,
+                            StaleRecommendations, Title, TitleRanking,
+                            histogram_field)
+from reviews.rankings import (refresh_rankings, shift_prior,
+                              update_title_ranking)
+from reviews.search import get_backend
+from reviews.trending import (COMMENT_WEIGHT, REVIEW_WEIGHT, add_activity,
+                              comment_title_id, refresh_trending)
+
+# Отправляется после массовой загрузки данных в обход сигналов моделей.
+data_loaded = Signal()
+# Отправляется после записи пересчитанных рекомендаций (user_ids).
+recommendations_written = Signal()
+
+
+def shift_rating(title_id, added=None, removed=None):
+    """
+    Учитывает добавленную и/или убранную оценку: счётчики, гистограмма и
+    рейтинг произведения меняются за 1 UPDATE, сумма и число всех оценок
+    для рейтинга — ещё за один.
+    """
+    count_delta = (added is not None) - (removed is not None)
+    reviews_count = F('reviews_count') + count_delta
+    score_sum = F('score_sum') + (added or 0) - (removed or 0)
+    histogram = {}
+    if added != removed:
+        if added is not None:
+            field = histogram_field(added)
+            histogram[field] = F(field) + 1
+        if removed is not None:
+            field = histogram_field(removed)
+            histogram[field] = F(field) - 1
+    Title.objects.filter(pk=title_id).update(
+        updated_at=timezone.now(),
+        reviews_count=reviews_count,
+        score_sum=score_sum,
+        rating=Case(
+            When(reviews_count__lte=-count_delta, then=None),
+            default=score_sum / reviews_count,
+            output_field=IntegerField(),
+        ),
+        **histogram,
+    )
+    record_changes('title', [title_id])
+    shift_prior((added or 0) - (removed or 0), count_delta)
+
+
+def forget_recommendations(user_id, using=None):
+    """
+    Рекомендации устарели: отмечаются для compute_recommendations --stale,
+    до пересчёта отдаются прежние.
+    """
+    stale = StaleRecommendations.objects.using(using)
+    if not stale.filter(user_id=user_id).update(marked_at=timezone.now()):
+        stale.bulk_create(
+            [StaleRecommendations(user_id=user_id)], ignore_conflicts=True
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    old_title_id = getattr(instance, '_loaded_title_id', None)
+    old_score = getattr(instance, '_loaded_score', None)
+    if created or old_title_id is None:
+        shift_rating(instance.title_id, added=instance.score)
+    elif old_title_id != instance.title_id:
+        shift_rating(old_title_id, removed=old_score)
+        shift_rating(instance.title_id, added=instance.score)
+        update_title_ranking(old_title_id, create=False, using=using)
+    elif old_score != instance.score:
+        shift_rating(
+            instance.title_id, added=instance.score, removed=old_score
+        )
+    else:
+        return
+    update_title_ranking(instance.title_id, using=using)
+    forget_recommendations(instance.author_id, using)
+    instance._loaded_title_id = instance.title_id
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, using=None, **kwargs):
+    title_id = (
+        getattr(instance, '_loaded_title_id', None) or instance.title_id
+    )
+    shift_rating(
+        title_id,
+        removed=getattr(instance, '_loaded_score', None) or instance.score,
+    )
+    update_title_ranking(title_id, create=False, using=using)
+    forget_recommendations(instance.author_id, using)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    """Категория и год дублируются в строке рейтинга для индексов."""
+    if not raw and not created:
+        TitleRanking.objects.using(using).filter(title_id=instance.pk).update(
+            category_id=instance.category_id, year=instance.year
+        )
+
+
+@receiver(data_loaded)
+def rankings_after_load(sender, **kwargs):
+    refresh_rankings()
+
+
+@receiver(data_loaded)
+def trending_after_load(sender, **kwargs):
+    refresh_trending()
+
+
+@receiver(post_save, sender=Review)
+def review_activity(sender, instance, created, raw=False, using=None,
+                    **kwargs):
+    if created and not raw:
+        add_activity(instance.title_id, instance.pub_date, REVIEW_WEIGHT,
+                     using)
+
+
+@receiver(post_delete, sender=Review)
+def review_activity_removed(sender, instance, using=None, **kwargs):
+    add_activity(instance.title_id, instance.pub_date, -REVIEW_WEIGHT, using)
+
+
+@receiver(post_save, sender=Comments)
+def comment_activity(sender, instance, created, raw=False, using=None,
+                     **kwargs):
+    if created and not raw:
+        add_activity(comment_title_id(instance, using),
+                     instance.pub_date, COMMENT_WEIGHT, using)
+
+
+@receiver(post_delete, sender=Comments)
+def comment_activity_removed(sender, instance, using=None, **kwargs):
+    title_id = comment_title_id(instance, using)
+    if title_id is not None:
+        add_activity(title_id, instance.pub_date, -COMMENT_WEIGHT, using)
+
+
+def install_search_index(using, **kwargs):
+    get_backend(using).install()
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comments)
+def search_object_saved(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        get_backend(using).object_saved(instance)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comments)
+def search_object_deleted(sender, instance, using=None, **kwargs):
+    get_backend(using).object_deleted(instance)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comments)
+def record_deletion(sender, instance, using=None, **kwargs):
+    record_changes(kind_of(sender), [instance.pk], deleted=True, using=using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comments)
+def record_change(sender, instance, using=None, **kwargs):
+    record_changes(kind_of(sender), [instance.pk], using=using)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    """Категория обнуляется у произведений UPDATE-ом в обход save()."""
+    touch_titles(category=instance)
+
+
+@receiver(pre_delete, sender=Genre)
+def genre_deleting(sender, instance, **kwargs):
+    touch_titles(genre=instance)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_titles(pk=instance.pk)
+    elif action == 'pre_clear':
+        touch_titles(genre=instance)
+    elif action in ('post_add', 'post_remove'):
+        touch_titles(pk__in=pk_set)
@@ -0,0 +1,199 @@
+"""
+Популярные сейчас произведения по затухающей активности.
+
+Каждый отзыв и комментарий добавляет произведению вес, который
+уменьшается вдвое за окно (день, неделю, месяц):
+
+    score(t) = sum weight * 2 ** -((t - pub_date) / window).
+
+Счётчики хранятся умноженными на 2 ** ((t - reference) / window), где
+reference — общая точка отсчёта (TrendReference):
+
+    stored = sum weight * 2 ** ((pub_date - reference) / window).
+
+Тогда новое событие — это атомарное `stored + delta` без пересчёта
+остальных строк, порядок по stored совпадает с порядком по score в любой
+момент, а затухание применяется только при чтении. Когда показатель
+степени превышает MAX_EXPONENT, точка отсчёта переносится вперёд одним
+UPDATE всех строк (раз в MAX_EXPONENT дней для окна «день»).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from reviews.models import Comments, Review, TitleTrend, TrendReference
+
+DAY = 'day'
+WINDOWS = {
+    DAY: timedelta(days=1),
+    'week': timedelta(days=7),
+    'month': timedelta(days=30),
+}
+SHORTEST_WINDOW = min(WINDOWS, key=WINDOWS.get)
+REVIEW_WEIGHT = 1.0
+COMMENT_WEIGHT = 0.5
+MAX_EXPONENT = 512
+# Меньшая активность не показывается: это давно затухшие счётчики и
+# остатки от вычитания удалённых событий.
+MIN_ACTIVITY = 1e-6
+REFERENCE_PK = 1
+
+
+def score_field(window):
+    return f'{window}_score'
+
+
+def exponent(moment, reference, window):
+    return (moment - reference) / WINDOWS[window]
+
+
+def get_reference(using=DEFAULT_DB_ALIAS, lock=False):
+    references = TrendReference.objects.using(using)
+    if lock:
+        references = references.select_for_update()
+    reference = references.filter(pk=REFERENCE_PK).first()
+    if reference is None:
+        reference, _ = references.get_or_create(
+            pk=REFERENCE_PK, defaults={'reference': timezone.now()}
+        )
+    return reference
+
+
+def rebase(reference, moment, using=DEFAULT_DB_ALIAS):
+    """Переносит точку отсчёта в `moment`, пересчитывая все счётчики."""
+    TitleTrend.objects.using(using).update(**{
+        score_field(window): F(score_field(window)) * 2 ** -exponent(
+            moment, reference.reference, window
+        )
+        for window in WINDOWS
+    })
+    reference.reference = moment
+    reference.save(using=using)
+
+
+def rebase_if_due(moment, using=DEFAULT_DB_ALIAS):
+    """
+    Переносит точку отсчёта под блокировкой, если это ещё нужно: пока
+    ждали блокировку, перенос мог сделать другой процесс.
+    """
+    reference = get_reference(using, lock=True)
+    if exponent(moment, reference.reference, SHORTEST_WINDOW) > MAX_EXPONENT:
+        rebase(reference, moment, using)
+    return reference
+
+
+def contributions(moment, weight, reference):
+    return {
+        score_field(window): weight * 2 ** exponent(moment, reference, window)
+        for window in WINDOWS
+    }
+
+
+def increment(trends, deltas):
+    return trends.update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def add_activity(title_id, moment, weight, using=DEFAULT_DB_ALIAS):
+    """
+    Добавляет (или, с отрицательным весом, убирает) событие к счётчикам
+    произведения.
+
+    Точка отсчёта читается без блокировки; блокируется она только для
+    переноса. Если перенос успел закоммититься между чтением и записью,
+    вклад пересчитывается от новой точки и разница доносится вторым
+    UPDATE.
+    """
+    now = max(timezone.now(), moment)
+    with transaction.atomic(using=using):
+        reference = get_reference(using)
+        if exponent(
+            now, reference.reference, SHORTEST_WINDOW
+        ) > MAX_EXPONENT:
+            reference = rebase_if_due(now, using)
+        deltas = contributions(moment, weight, reference.reference)
+        trends = TitleTrend.objects.using(using).filter(title_id=title_id)
+        if not increment(trends, deltas) and weight >= 0:
+            try:
+                with transaction.atomic(using=using):
+                    trends.create(title_id=title_id, **deltas)
+            except IntegrityError:
+                increment(trends, deltas)
+        current = get_reference(using)
+        if current.reference != reference.reference:
+            rebased = contributions(moment, weight, current.reference)
+            increment(trends, {
+                field: rebased[field] - deltas[field] for field in deltas
+            })
+
+
+def comment_title_id(comment, using=DEFAULT_DB_ALIAS):
+    """Произведение комментария; запрос — только если отзыв не загружен."""
+    if Comments.review.is_cached(comment):
+        return comment.review.title_id
+    return Review.objects.using(using).filter(
+        pk=comment.review_id
+    ).values_list('title_id', flat=True).first()
+
+
+def refresh_trending(using=DEFAULT_DB_ALIAS):
+    """
+    Пересчитывает все счётчики по датам отзывов и комментариев: после
+    массовой загрузки в обход сигналов.
+    """
+    reference_time = timezone.now()
+    totals = defaultdict(lambda: defaultdict(float))
+    events = (
+        (Review.objects.using(using).values_list('title_id', 'pub_date'),
+         REVIEW_WEIGHT),
+        (Comments.objects.using(using).values_list(
+            'review__title_id', 'pub_date'
+        ), COMMENT_WEIGHT),
+    )
+    for rows, weight in events:
+        for title_id, pub_date in rows.iterator(chunk_size=10000):
+            for field, delta in contributions(
+                pub_date, weight, reference_time
+            ).items():
+                totals[title_id][field] += delta
+    with transaction.atomic(using=using):
+        reference = get_reference(using, lock=True)
+        reference.reference = reference_time
+        reference.save(using=using)
+        TitleTrend.objects.using(using).all().delete()
+        TitleTrend.objects.using(using).bulk_create(
+            [
+                TitleTrend(title_id=title_id, **fields)
+                for title_id, fields in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def trending_titles(window=DAY, category=None, genre=None, limit=10,
+                    using=DEFAULT_DB_ALIAS):
+    """Первые `limit` произведений по активности: (title_id, активность)."""
+    field = score_field(window)
+    reference = get_reference(using)
+    elapsed = exponent(timezone.now(), reference.reference, window)
+    scale = 2 ** -elapsed
+    # Без записей дольше 1000 окон затухло всё; 2 ** 1000 ещё конечно.
+    threshold = MIN_ACTIVITY * 2 ** min(elapsed, 1000)
+    trends = TitleTrend.objects.using(using).filter(
+        **{f'{field}__gte': threshold}
+    )
+    if category is not None:
+        trends = trends.filter(title__category__slug=category)
+    if genre is not None:
+        trends = trends.filter(title__genre__slug=genre)
+    return [
+        (title_id, value * scale)
+        for title_id, value in trends.order_by(
+            f'-{field}', 'title_id'
+        ).values_list('title_id', field)[:limit]
+    ]
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import CustomUser
+from .models import CustomUser, OutgoingEmail
 
 
 UserAdmin.fieldsets += (
@@ -9,3 +9,13 @@ UserAdmin.fieldsets += (
 )
 
 admin.site.register(CustomUser, UserAdmin)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to', 'subject', 'created_at', 'attempts',
+                    'next_attempt_at', 'sent_at')
+    list_filter = ('sent_at', )
+    # В тексте письма — код подтверждения.
+    exclude = ('message', )
+    readonly_fields = ('created_at', 'last_error', 'sent_at')
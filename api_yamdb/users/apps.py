@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from users.authentication import (User, revocation_saved,
+                                          user_deleted)
+        from users.models import TokenRevocation
+
+        post_save.connect(revocation_saved, sender=TokenRevocation)
+        post_delete.connect(user_deleted, sender=User)
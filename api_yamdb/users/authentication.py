@@ -0,0 +1,172 @@
+"""
+JWT-аутентификация без запроса пользователя на каждый запрос.
+
+Токен доступа (issue_access_token) содержит, кроме id, имя, роль и флаги
+is_superuser и is_staff — всё, что нужно правам в api.permissions.
+Пользователь собирается из этих claims как экземпляр CustomUser с
+отложенными остальными полями: обращение к ним (или load_full_user)
+загружает строку из базы.
+
+Смена имени, роли, флагов или активности увеличивает
+CustomUser.token_version, удаление пользователя отзывает все его токены.
+Токен несёт версию (claim `ver`), и токен старше последнего отзыва
+отклоняется по TokenDenylist в памяти процесса — без запроса к базе;
+отзывы из других процессов видны не позже JWT_DENYLIST_SYNC_INTERVAL
+секунд. Токены без этих claims проверяются как в JWTAuthentication.
+"""
+import threading
+import time
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import TokenRevocation
+
+User = get_user_model()
+
+CLAIM_FIELDS = ('username', 'role', 'is_superuser', 'is_staff')
+VERSION_CLAIM = 'ver'
+# Версия отзыва для удалённых пользователей: действующих токенов нет.
+REVOKE_ALL = 2 ** 31 - 1
+
+
+def issue_access_token(user):
+    token = AccessToken.for_user(user)
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+def token_user(user_id, claims, using=DEFAULT_DB_ALIAS):
+    """CustomUser из claims; остальные поля отложены до обращения."""
+    values = dict(zip(CLAIM_FIELDS, claims), is_active=True)
+    values[User._meta.pk.attname] = user_id
+    names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(using, names, [values[name] for name in names])
+
+
+def load_full_user(user):
+    """Загружает отложенные поля пользователя одним запросом."""
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    return user
+
+
+class TokenDenylist:
+    """
+    Минимальные действующие версии токенов из журнала TokenRevocation:
+    {user_id: (версия, когда отозваны)}. Проверка — поиск в словаре;
+    журнал перечитывается не чаще раза в JWT_DENYLIST_SYNC_INTERVAL
+    секунд, только записи после прошлой синхронизации (с запасом
+    SYNC_OVERLAP на долгие транзакции). Записи старше срока жизни токена
+    доступа не нужны: все токены, выданные до них, уже истекли.
+    """
+    SYNC_OVERLAP = timedelta(minutes=1)
+
+    def __init__(self):
+        self.versions = {}
+        self.synced_at = None
+        self.synced_until = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def interval():
+        return getattr(settings, 'JWT_DENYLIST_SYNC_INTERVAL', 5)
+
+    def add(self, user_id, version, revoked_at):
+        with self.lock:
+            current = self.versions.get(user_id)
+            if current is None or current[0] < version:
+                self.versions[user_id] = (version, revoked_at)
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        with self.lock:
+            if not force and self.synced_at is not None and (
+                now - self.synced_at < self.interval()
+            ):
+                return
+            # Остальные потоки не ждут загрузки и проверяют по старым данным.
+            self.synced_at = now
+            since = self.synced_until
+        started = timezone.now()
+        expired = started - api_settings.ACCESS_TOKEN_LIFETIME
+        since = expired if since is None else max(
+            expired, since - self.SYNC_OVERLAP
+        )
+        rows = TokenRevocation.objects.filter(
+            created_at__gte=since
+        ).values_list('user_id', 'version', 'created_at')
+        for user_id, version, revoked_at in rows:
+            self.add(user_id, version, revoked_at)
+        with self.lock:
+            self.synced_until = started
+            self.versions = {
+                user_id: entry for user_id, entry in self.versions.items()
+                if entry[1] >= expired
+            }
+
+    def min_version(self, user_id):
+        self.sync()
+        entry = self.versions.get(user_id)
+        return 0 if entry is None else entry[0]
+
+    def clear(self):
+        with self.lock:
+            self.versions.clear()
+            self.synced_at = self.synced_until = None
+
+
+token_denylist = TokenDenylist()
+
+
+def revocation_saved(sender, instance, created, **kwargs):
+    """Отзыв из этого процесса действует сразу, без ожидания синхронизации."""
+    if created:
+        transaction.on_commit(
+            partial(token_denylist.add, instance.user_id, instance.version,
+                    instance.created_at),
+            using=kwargs.get('using'),
+        )
+
+
+def user_deleted(sender, instance, using, **kwargs):
+    TokenRevocation.objects.using(using).create(
+        user_id=instance.pk, version=REVOKE_ALL
+    )
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if any(
+            field not in validated_token
+            for field in CLAIM_FIELDS + (VERSION_CLAIM, )
+        ):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('В токене нет id пользователя')
+        if validated_token[VERSION_CLAIM] < token_denylist.min_version(
+            user_id
+        ):
+            raise AuthenticationFailed(
+                'Токен отозван, получите новый', code='token_revoked'
+            )
+        claims = tuple(validated_token[field] for field in CLAIM_FIELDS)
+        return token_user(user_id, claims)
@@ -0,0 +1,51 @@
+"""
+Коды подтверждения для получения токена.
+
+У пользователя один действующий код: новый код (`issue_code`) заменяет
+прежний. В базе хранится только HMAC кода с SECRET_KEY и срок действия
+CONFIRMATION_CODE_TTL секунд. `redeem_code` находит пользователя по имени
+и хешу кода одним запросом и удаляет код: повторно он не сработает.
+"""
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .models import ConfirmationCode
+
+KEY_SALT = 'users.confirmation.ConfirmationCode'
+
+
+def hash_code(code):
+    return salted_hmac(KEY_SALT, code, algorithm='sha256').hexdigest()
+
+
+def issue_code(user):
+    """Создаёт новый код пользователя и возвращает его в открытом виде."""
+    code = secrets.token_urlsafe(9)
+    ConfirmationCode.objects.update_or_create(user=user, defaults={
+        'code_hash': hash_code(code),
+        'expires_at': timezone.now() + timedelta(
+            seconds=settings.CONFIRMATION_CODE_TTL
+        ),
+    })
+    return code
+
+
+def redeem_code(username, code):
+    """Пользователь с действующим кодом `code` или None; код гасится."""
+    confirmation = ConfirmationCode.objects.select_related('user').filter(
+        user__username=username,
+        code_hash=hash_code(str(code)),
+        expires_at__gt=timezone.now(),
+    ).first()
+    if confirmation is None:
+        return None
+    # Код, погашенный параллельным запросом, второй раз не срабатывает.
+    if not ConfirmationCode.objects.filter(
+        pk=confirmation.pk, code_hash=confirmation.code_hash
+    ).delete()[0]:
+        return None
+    return confirmation.user
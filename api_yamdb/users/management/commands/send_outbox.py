@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.outbox import drain_outbox, purge_outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutgoingEmail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать непрерывно, опрашивая очередь.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--purge-interval', type=float, default=60 * 60,
+            help='Как часто в секундах удалять старые письма.'
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        purged_at = None
+        try:
+            while True:
+                if purged_at is None or (
+                    time.monotonic() - purged_at >= options['purge_interval']
+                ):
+                    purged = purge_outbox()
+                    purged_at = time.monotonic()
+                    if purged:
+                        self.stdout.write(f'Удалено старых писем: {purged}')
+                sent, failed = drain_outbox(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(
+                        f'Отправлено: {sent}, ошибок: {failed}'
+                    )
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего отправлено: {total_sent}, ошибок: {total_failed}'
+        ))
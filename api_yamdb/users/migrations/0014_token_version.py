@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версия токенов'),
+        ),
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(verbose_name='Пользователь')),
+                ('version', models.PositiveIntegerField(verbose_name='Минимальная версия')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Отзыв токенов',
+                'verbose_name_plural': 'Отзывы токенов',
+                'ordering': ('created_at', 'id'),
+            },
+        ),
+    ]
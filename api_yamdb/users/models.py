@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 
 class CustomUser(AbstractUser):
@@ -11,14 +12,56 @@ class CustomUser(AbstractUser):
         (MODER_ROLE, 'moderator'),
         (ADMIN_ROLE, 'admin'),
     ]
+    # Поля, от которых зависят права по токену: их смена отзывает токены.
+    ACCESS_FIELDS = ('username', 'role', 'is_superuser', 'is_staff',
+                     'is_active')
     bio = models.TextField(verbose_name='Биография', blank=True)
     role = models.CharField(
         verbose_name='Роль', default=USER_ROLE,
         max_length=20, choices=ROLE_CHOISES)
+    token_version = models.PositiveIntegerField(
+        verbose_name='Версия токенов', default=0)
 
     class Meta:
         ordering = ('username', )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access = instance.access_state()
+        return instance
+
+    def access_state(self):
+        """Загруженные значения ACCESS_FIELDS."""
+        return {
+            field: self.__dict__[field]
+            for field in self.ACCESS_FIELDS if field in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        """
+        При смене ACCESS_FIELDS увеличивает token_version и записывает
+        TokenRevocation: выданные раньше токены перестают действовать.
+        QuerySet.update() это обходит.
+        """
+        loaded = getattr(self, '_loaded_access', {})
+        revoke = any(
+            getattr(self, field) != value for field, value in loaded.items()
+        )
+        if revoke:
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {
+                    *kwargs['update_fields'], 'token_version'
+                }
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if revoke:
+                TokenRevocation.objects.using(self._state.db).create(
+                    user_id=self.pk, version=self.token_version
+                )
+        self._loaded_access = self.access_state()
+
     @property
     def is_user(self):
         return self.role == self.USER_ROLE
@@ -33,3 +76,61 @@ class CustomUser(AbstractUser):
             self.role == self.ADMIN_ROLE
             or self.is_superuser
             or self.is_staff)
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку воркером `send_outbox`."""
+    subject = models.CharField('Тема', max_length=255)
+    message = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    to = models.EmailField('Получатель', max_length=254)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка', default=timezone.now, db_index=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('next_attempt_at', 'id')
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
+
+
+class ConfirmationCode(models.Model):
+    """Действующий код подтверждения пользователя: хранится только хеш."""
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.CASCADE, primary_key=True,
+        related_name='+', verbose_name='Пользователь')
+    code_hash = models.CharField('Хеш кода', max_length=64)
+    expires_at = models.DateTimeField('Действует до')
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self):
+        return f'{self.user_id}: до {self.expires_at}'
+
+
+class TokenRevocation(models.Model):
+    """
+    Журнал отзыва токенов: токены пользователя с версией меньше `version`
+    недействительны. Из него синхронизируется TokenDenylist.
+    """
+    # Без внешнего ключа: запись об удалённом пользователе остаётся.
+    user_id = models.BigIntegerField('Пользователь')
+    version = models.PositiveIntegerField('Минимальная версия')
+    created_at = models.DateTimeField(
+        'Создано', default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ('created_at', 'id')
+        verbose_name = 'Отзыв токенов'
+        verbose_name_plural = 'Отзывы токенов'
+
+    def __str__(self):
+        return f'{self.user_id}: < {self.version}'
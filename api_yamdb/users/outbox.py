@@ -0,0 +1,144 @@
+"""
+Очередь исходящих писем.
+
+`enqueue_mail` только сохраняет письмо; отправляет его `drain_outbox`,
+который вызывает команда `send_outbox`. При `EMAIL_OUTBOX_EAGER = True`
+очередь разбирается сразу после коммита — для тестов и отладки.
+Доставка «как минимум один раз»: письмо, отправленное воркером, который
+упал до отметки об отправке, будет отправлено повторно. Текст
+отправленного или исчерпавшего попытки письма сразу стирается: в нём
+код подтверждения. Сами записи удаляет `purge_outbox` через
+EMAIL_OUTBOX_RETENTION секунд.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def enqueue_mail(subject, message, recipient_list, from_email=None):
+    emails = OutgoingEmail.objects.bulk_create(
+        OutgoingEmail(
+            subject=subject,
+            message=message,
+            from_email=from_email or settings.EMAIL_HOST_USER,
+            to=recipient,
+        )
+        for recipient in recipient_list
+    )
+    if settings.EMAIL_OUTBOX_EAGER:
+        transaction.on_commit(drain_outbox)
+    return emails
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой."""
+    return timedelta(seconds=min(
+        settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.EMAIL_OUTBOX_MAX_RETRY_DELAY,
+    ))
+
+
+def pending_emails(now):
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        next_attempt_at__lte=now,
+    )
+
+
+def claim_batch(batch_size):
+    """Забирает пачку писем, сдвигая им next_attempt_at на время аренды."""
+    now = timezone.now()
+    leased_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+    emails = pending_emails(now).order_by('next_attempt_at', 'id')
+    if not connection.features.has_select_for_update_skip_locked:
+        return claim_each(emails[:batch_size], now, leased_until)
+    with transaction.atomic():
+        batch = list(emails.select_for_update(skip_locked=True)[:batch_size])
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in batch]
+        ).update(next_attempt_at=leased_until)
+    return batch
+
+
+def claim_each(candidates, now, leased_until):
+    """
+    Без SKIP LOCKED (SQLite) письмо достаётся воркеру, чей условный UPDATE
+    изменил строку: забранное другим воркером уже не ожидает отправки.
+    """
+    return [
+        email for email in candidates
+        if pending_emails(now).filter(pk=email.pk).update(
+            next_attempt_at=leased_until
+        )
+    ]
+
+
+def purge_outbox():
+    """Удаляет отправленные и исчерпавшие попытки письма старше срока."""
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETENTION
+    )
+    return OutgoingEmail.objects.filter(created_at__lt=cutoff).filter(
+        Q(sent_at__isnull=False)
+        | Q(attempts__gte=settings.EMAIL_OUTBOX_MAX_ATTEMPTS)
+    ).delete()[0]
+
+
+def mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = f'{error.__class__.__name__}: {error}'
+    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.message = ''
+
+
+def drain_outbox(batch_size=None):
+    """
+    Отправляет одну пачку писем через одно соединение с почтовым бэкендом.
+    Возвращает количество отправленных и неудачных писем.
+    """
+    batch = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+    sent, failed = [], []
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+    except Exception as error:
+        for email in batch:
+            mark_failed(email, error)
+        failed = batch
+    else:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.message,
+                from_email=email.from_email,
+                to=[email.to],
+                connection=mail_connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                mark_failed(email, error)
+                failed.append(email)
+            else:
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                email.message = ''
+                sent.append(email)
+        mail_connection.close()
+    OutgoingEmail.objects.bulk_update(
+        sent, ('attempts', 'sent_at', 'message')
+    )
+    OutgoingEmail.objects.bulk_update(
+        failed, ('attempts', 'last_error', 'next_attempt_at', 'message')
+    )
+    return len(sent), len(failed)
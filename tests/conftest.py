@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +34,29 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def eager_email_outbox(settings):
+    """Очередь писем разбирается сразу, как это ожидают тесты регистрации."""
+    settings.EMAIL_OUTBOX_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def clean_token_denylist():
+    """Отзывы токенов в памяти процесса не переходят между тестами."""
+    from users.authentication import token_denylist
+
+    token_denylist.clear()
+    yield
+    token_denylist.clear()
+
+
+@pytest.fixture(autouse=True)
+def clean_auth_throttle():
+    """Каждый тест начинает с полными вёдрами лимитов."""
+    from api.throttling import get_store
+
+    get_store().clear()
+    yield
+    get_store().clear()
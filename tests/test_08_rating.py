@@ -0,0 +1,72 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/{review_id}/'
+
+    def get_rating(self, client, title_id):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.status_code == HTTPStatus.OK
+        return response.json()['rating']
+
+    def test_01_rating_follows_review_changes(self, admin_client, user_client,
+                                              moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        assert self.get_rating(admin_client, title_id) is None
+
+        create_single_review(user_client, title_id, 'Так себе', 3)
+        response = create_single_review(
+            moderator_client, title_id, 'Отлично', 8
+        )
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Проверьте, что рейтинг произведения обновляется при создании '
+            'отзыва.'
+        )
+
+        review_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=response.json()['id']
+        )
+        moderator_client.patch(review_url, data={'score': 10})
+        assert self.get_rating(admin_client, title_id) == 6, (
+            'Проверьте, что рейтинг произведения обновляется при изменении '
+            'оценки в отзыве.'
+        )
+
+        moderator_client.delete(review_url)
+        assert self.get_rating(admin_client, title_id) == 3, (
+            'Проверьте, что рейтинг произведения обновляется при удалении '
+            'отзыва.'
+        )
+        assert self.get_rating(admin_client, titles[1]['id']) is None
+
+    def test_02_recalculate_ratings_fixes_drift(self, admin_client,
+                                                user_client):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Неплохо', 7)
+        Title.objects.filter(pk=title_id).update(
+            rating=1, reviews_count=5, score_sum=5
+        )
+
+        call_command('recalculate_ratings')
+
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating, title.reviews_count, title.score_sum) == (
+            7, 1, 7
+        ), (
+            'Проверьте, что команда `recalculate_ratings` пересчитывает '
+            'сохранённый рейтинг произведений.'
+        )
@@ -0,0 +1,79 @@
+import pytest
+
+from tests.utils import assert_max_queries
+
+LIST_QUERY_BUDGET = 4
+
+
+@pytest.fixture
+def catalogue(django_user_model):
+    from reviews.models import Category, Comments, Genre, Review, Title
+
+    categories = [
+        Category.objects.create(name=f'Категория {idx}', slug=f'cat-{idx}')
+        for idx in range(3)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+        for idx in range(3)
+    ]
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+        )
+        for idx in range(12)
+    ]
+    titles = []
+    for idx in range(12):
+        title = Title.objects.create(
+            name=f'Произведение {idx}', year=1990 + idx,
+            category=categories[idx % len(categories)]
+        )
+        title.genre.set(genres[:idx % len(genres) + 1])
+        titles.append(title)
+    reviews = [
+        Review.objects.create(
+            title=titles[0], author=author, text='Отзыв', score=5
+        )
+        for author in authors
+    ]
+    for author in authors:
+        Comments.objects.create(
+            review=reviews[0], author=author, text='Комментарий'
+        )
+    return titles[0], reviews[0]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueryBudget:
+
+    def list_urls(self, title, review):
+        return (
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+            '/api/v1/titles/',
+            f'/api/v1/titles/{title.id}/reviews/',
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+        )
+
+    @pytest.mark.parametrize('limit', (2, 10))
+    def test_01_list_endpoints_within_budget(self, client, catalogue, limit):
+        for url in self.list_urls(*catalogue):
+            with assert_max_queries(LIST_QUERY_BUDGET, url):
+                response = client.get(url, {'limit': limit})
+            assert len(response.json()['results']) == min(
+                limit, response.json()['count']
+            )
+
+    @pytest.mark.parametrize('limit', (2, 10))
+    def test_02_users_list_within_budget(self, admin_client, catalogue,
+                                         limit):
+        url = '/api/v1/users/'
+        with assert_max_queries(LIST_QUERY_BUDGET, url):
+            admin_client.get(url, {'limit': limit})
+
+    def test_03_title_detail_within_budget(self, client, catalogue):
+        title, _ = catalogue
+        url = f'/api/v1/titles/{title.id}/'
+        with assert_max_queries(2, url):
+            client.get(url)
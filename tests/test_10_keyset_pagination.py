@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.fixture
+def titles():
+    from reviews.models import Title
+
+    return [
+        Title.objects.create(name=f'Произведение {idx}', year=2000 + idx % 3)
+        for idx in range(7)
+    ]
+
+
+@pytest.fixture
+def reviews(titles, django_user_model):
+    from reviews.models import Review
+
+    return [
+        Review.objects.create(
+            title=titles[0], text=f'Отзыв {idx}', score=idx % 2 + 5,
+            author=django_user_model.objects.create_user(
+                username=f'reviewer{idx}', email=f'reviewer{idx}@yamdb.fake'
+            )
+        )
+        for idx in range(5)
+    ]
+
+
+def walk(client, url, params):
+    pages = []
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        pages.append(data)
+        if not data['next']:
+            return pages
+        response = client.get(data['next'])
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10KeysetPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_titles_cursor_walk(self, client, titles):
+        pages = walk(client, self.TITLES_URL, {'limit': 3})
+        ids = [item['id'] for page in pages for item in page['results']]
+        expected = [
+            title.id for title in sorted(titles, key=lambda t: (t.year, t.id))
+        ]
+        assert ids == expected, (
+            'Проверьте, что переход по ссылкам `next` возвращает все '
+            'произведения по одному разу в порядке `year`, `id`.'
+        )
+        assert all(page['count'] == len(titles) for page in pages)
+
+        previous = client.get(pages[-1]['previous']).json()
+        assert previous['results'] == pages[-2]['results'], (
+            'Проверьте, что ссылка `previous` возвращает предыдущую страницу.'
+        )
+
+    def test_02_reviews_mixed_ordering(self, client, titles, reviews):
+        url = f'/api/v1/titles/{titles[0].id}/reviews/'
+        pages = walk(client, url, {'limit': 2})
+        ids = [item['id'] for page in pages for item in page['results']]
+        expected = [
+            review.id for review in sorted(
+                reviews,
+                key=lambda r: (-r.score, -r.pub_date.timestamp(), r.id)
+            )
+        ]
+        assert ids == expected
+
+    def test_03_count_opt_out_and_invalid_cursor(self, client, titles):
+        response = client.get(self.TITLES_URL, {'limit': 2, 'count': 'false'})
+        data = response.json()
+        assert data['count'] is None
+        assert len(data['results']) == 2
+        assert 'cursor=' in data['next']
+
+        response = client.get(self.TITLES_URL, {'cursor': 'not-a-cursor'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_04_offset_still_supported(self, client, titles):
+        data = client.get(self.TITLES_URL, {'limit': 2, 'offset': 2}).json()
+        assert data['count'] == len(titles)
+        assert len(data['results']) == 2
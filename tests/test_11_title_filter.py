@@ -0,0 +1,49 @@
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleFilter:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get_names(self, client, params):
+        response = client.get(self.TITLES_URL, params)
+        return {title['name'] for title in response.json()['results']}
+
+    def test_01_exact_slug_and_year(self, admin_client, client):
+        titles, categories, genres = create_titles(admin_client)
+        assert self.get_names(client, {'category': 'film'}) == set(), (
+            'Проверьте, что фильтр `category` сравнивает slug целиком.'
+        )
+        assert self.get_names(
+            client, {'category': categories[0]['slug']}
+        ) == {titles[0]['name']}
+        assert self.get_names(client, {'year': 198}) == set()
+        assert self.get_names(
+            client, {'year_min': 1985, 'year_max': 2000}
+        ) == {titles[1]['name']}
+
+    def test_02_genre_modes(self, admin_client, client):
+        titles, _, genres = create_titles(admin_client)
+        slugs = ','.join((genres[0]['slug'], genres[2]['slug']))
+        assert self.get_names(client, {'genre': slugs}) == {
+            titles[0]['name'], titles[1]['name']
+        }, 'Проверьте, что `genre=a,b` по умолчанию работает как ИЛИ.'
+        assert self.get_names(
+            client, {'genre': slugs, 'genre_mode': 'and'}
+        ) == set()
+        both = ','.join((genres[0]['slug'], genres[1]['slug']))
+        assert self.get_names(
+            client, {'genre': both, 'genre_mode': 'and'}
+        ) == {titles[0]['name']}
+
+    def test_03_substring_parameters(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        assert self.get_names(client, {'category_contains': 'film'}) == {
+            titles[0]['name']
+        }
+        assert self.get_names(client, {'genre_contains': 'r'}) == {
+            titles[0]['name'], titles[1]['name']
+        }
@@ -0,0 +1,124 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import (
+    create_single_comment, create_single_review, create_titles
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12Search:
+
+    SEARCH_URL = '/api/v1/search/'
+
+    def search(self, client, **params):
+        response = client.get(self.SEARCH_URL, params)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.SEARCH_URL}` возвращает '
+            'ответ со статусом 200.'
+        )
+        return response.json()['results']
+
+    def test_01_search_requires_query(self, client):
+        response = client.get(self.SEARCH_URL)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.get(self.SEARCH_URL, {'q': 'x', 'type': 'user'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_02_search_titles_reviews_comments(self, admin_client,
+                                               user_client, client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review = create_single_review(
+            user_client, title_id, 'Смотрел терминатора дважды', 9
+        ).json()
+        comment = create_single_comment(
+            user_client, title_id, review['id'], 'Согласен, киборг отличный'
+        ).json()
+
+        hits = self.search(client, q='терминатор')
+        found = {(hit['type'], hit['id']) for hit in hits}
+        assert found == {('title', title_id), ('review', review['id'])}, (
+            'Проверьте, что поиск находит произведения и отзывы по '
+            'префиксу слова без учёта регистра.'
+        )
+        review_hit = next(hit for hit in hits if hit['type'] == 'review')
+        assert review_hit['title_id'] == title_id
+        assert '<b>терминатора</b>' in review_hit['snippet']
+
+        hits = self.search(client, q='киборг', type='comment')
+        assert [(hit['id'], hit['title_id'], hit['review_id']) for hit in
+                hits] == [(comment['id'], title_id, review['id'])]
+
+        user_client.delete(
+            f'/api/v1/titles/{title_id}/reviews/{review["id"]}/'
+        )
+        assert self.search(client, q='киборг') == [], (
+            'Проверьте, что удалённые объекты пропадают из индекса.'
+        )
+
+    def test_03_title_filter_search(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get('/api/v1/titles/', {'search': 'yippie'})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[1]['id']
+        ]
+
+    def test_04_python_backend_and_rebuild(self, admin_client, user_client):
+        from reviews.search import PythonSearchBackend
+
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[1]['id'], 'Орешек крепок', 8)
+        call_command('rebuild_search_index')
+
+        backend = PythonSearchBackend()
+        hits = backend.search('орешек')
+        assert {hit.kind for hit in hits} == {'title', 'review'}
+        assert all(hit.title_id == titles[1]['id'] for hit in hits)
+        assert backend.title_ids('крепкий') == [titles[1]['id']]
+
+    def test_05_snippet_is_escaped(self, admin_client, user_client, client):
+        from reviews.search import PythonSearchBackend, get_backend
+
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(
+            user_client, titles[0]['id'],
+            'Взлом <script>alert(1)</script> взломщик', 5
+        )
+        for backend in (get_backend(), PythonSearchBackend()):
+            snippet = backend.search('взлом', kinds=('review', ))[0].snippet
+            assert '<script>' not in snippet, (
+                'Проверьте, что текст в сниппете экранируется от HTML.'
+            )
+            assert '&lt;script&gt;' in snippet
+            assert '<b>Взлом</b>' in snippet
+
+    def test_06_python_backend_prefix_index(self, admin_client, user_client,
+                                            monkeypatch):
+        from reviews import search
+
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(
+            user_client, titles[1]['id'], 'Орешек крепок', 8
+        )
+        backend = search.PythonSearchBackend()
+        backend.rebuild()
+        assert backend.terms == sorted(backend.postings), (
+            'Проверьте, что слова индекса хранятся отсортированным списком.'
+        )
+        assert backend.prefixed('крепо') == ['крепок']
+        backend.discard(('review', review.json()['id']))
+        assert 'крепок' not in backend.terms
+        assert backend.total_length == sum(
+            document[2] for document in backend.documents.values()
+        )
+
+        def no_snippets(*args, **kwargs):
+            raise AssertionError('Сниппет для title_ids не нужен.')
+
+        monkeypatch.setattr(search, 'make_snippet', no_snippets)
+        assert backend.title_ids('орешек') == [titles[1]['id']], (
+            'Проверьте, что title_ids не строит сниппеты.'
+        )
@@ -0,0 +1,66 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13CatalogueCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    GENRES_URL = '/api/v1/genres/'
+
+    def test_01_anonymous_get_is_cached(self, admin_client, client):
+        create_titles(admin_client)
+        first = client.get(self.TITLES_URL, {'limit': 5, 'year': ''})
+        second = client.get(self.TITLES_URL, {'year': '', 'limit': 5})
+        assert first['X-Cache'] == 'MISS'
+        assert second['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный анонимный GET-запрос с теми же '
+            'параметрами отдаётся из кеша.'
+        )
+        assert second.json() == first.json()
+        response = admin_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert not response.has_header('X-Cache')
+
+    def test_02_review_invalidates_rating(self, admin_client, user_client,
+                                          client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        assert client.get(url).json()['rating'] is None
+        assert client.get(url)['X-Cache'] == 'HIT'
+
+        create_single_review(user_client, titles[0]['id'], 'Хорошо', 7)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] == 7, (
+            'Проверьте, что кеш сбрасывается при добавлении отзыва.'
+        )
+
+    def test_03_genre_changes_invalidate(self, admin_client, client):
+        assert client.get(self.GENRES_URL).json()['count'] == 0
+        admin_client.post(self.GENRES_URL, {'name': 'Рок', 'slug': 'rock'})
+        assert client.get(self.GENRES_URL).json()['count'] == 1
+        admin_client.delete(f'{self.GENRES_URL}rock/')
+        assert client.get(self.GENRES_URL).json()['count'] == 0
+
+    def test_04_versions_shared_between_workers(self, admin_client,
+                                                client, settings):
+        from django.core.cache.backends.filebased import FileBasedCache
+
+        from api.cache import CATALOGUE, VERSION_KEY_TEMPLATE
+
+        create_titles(admin_client)
+        assert client.get(self.TITLES_URL)['X-Cache'] == 'MISS'
+        assert client.get(self.TITLES_URL)['X-Cache'] == 'HIT'
+        # Другой воркер: свой экземпляр кеша версий с тем же хранилищем.
+        other_worker = FileBasedCache(
+            settings.CACHES[settings.CACHE_VERSIONS_ALIAS]['LOCATION'], {}
+        )
+        other_worker.incr(VERSION_KEY_TEMPLATE.format(CATALOGUE))
+        assert client.get(self.TITLES_URL)['X-Cache'] == 'MISS', (
+            'Проверьте, что версии коллекций хранятся в кеше, общем для '
+            'всех воркеров.'
+        )
@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14ConditionalRequests:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def test_01_if_none_match(self, admin_client, user_client, client):
+        titles, _, _ = create_titles(admin_client)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        response = client.get(url)
+        etag = response['ETag']
+        assert response.has_header('Last-Modified')
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что GET-запрос с актуальным `If-None-Match` '
+            'возвращает ответ со статусом 304.'
+        )
+        assert response['ETag'] == etag
+        assert not response.content
+
+        response = client.get(
+            url, {'limit': 1}, HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK
+
+        create_single_review(user_client, titles[0]['id'], 'Хорошо', 7)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response['ETag'] != etag
+
+        other_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[1]['id']
+        )
+        other_etag = client.get(other_url)['ETag']
+        create_single_review(admin_client, titles[0]['id'], 'Повтор', 7)
+        response = client.get(other_url, HTTP_IF_NONE_MATCH=other_etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что отзывы к другому произведению не сбрасывают '
+            'валидаторы списка.'
+        )
+
+    def test_02_if_modified_since(self, admin_client, client):
+        create_titles(admin_client)
+        response = client.get(self.TITLES_URL)
+        last_modified = response['Last-Modified']
+        response = client.get(
+            self.TITLES_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_03_if_match_on_patch_and_delete(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        etag = admin_client.get(url)['ETag']
+
+        response = admin_client.patch(
+            url, data={'name': 'Терминатор 2'}, HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK
+        new_etag = response['ETag']
+        assert new_etag != etag
+
+        response = admin_client.patch(
+            url, data={'name': 'Терминатор 3'}, HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED, (
+            'Проверьте, что PATCH-запрос с устаревшим `If-Match` '
+            'возвращает ответ со статусом 412.'
+        )
+        response = admin_client.delete(url, HTTP_IF_MATCH=etag)
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+        response = admin_client.delete(url, HTTP_IF_MATCH=new_etag)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+    def test_04_version_name_required(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from rest_framework.viewsets import ModelViewSet
+
+        from api.mixins import ConditionalRequestMixin
+
+        with pytest.raises(ImproperlyConfigured):
+            type('NoVersionViewSet', (ConditionalRequestMixin, ModelViewSet),
+                 {})
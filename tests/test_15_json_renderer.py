@@ -0,0 +1,46 @@
+from decimal import Decimal
+from http import HTTPStatus
+
+import pytest
+from django.http import QueryDict
+from rest_framework.renderers import JSONRenderer
+
+from tests.utils import create_titles
+
+
+def test_01_fast_renderer_matches_default():
+    from api.renderers import FastJSONRenderer
+
+    data = {
+        'text': 'строка с разделителем',
+        'score': Decimal('4.5'),
+        'items': [1, None, {'nested': True}],
+    }
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data), (
+        'Проверьте, что FastJSONRenderer возвращает те же байты, что и '
+        'стандартный JSONRenderer.'
+    )
+    assert FastJSONRenderer().render(None) == b''
+    query = QueryDict('username=a&email=b')
+    assert FastJSONRenderer().render(query) == JSONRenderer().render(query)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_02_json_request_and_response(admin_client, client):
+    from api.renderers import FastJSONRenderer
+
+    titles, _, _ = create_titles(admin_client)
+    response = admin_client.patch(
+        f'/api/v1/titles/{titles[0]["id"]}/',
+        data={'name': 'Терминатор 2'}, format='json'
+    )
+    assert response.status_code == HTTPStatus.OK
+    response = client.get('/api/v1/titles/')
+    assert response.content == FastJSONRenderer().render(response.data)
+    assert response.content == JSONRenderer().render(response.data)
+
+    response = admin_client.generic(
+        'PATCH', f'/api/v1/titles/{titles[0]["id"]}/', '{"name": ',
+        content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,49 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+
+@pytest.mark.django_db(transaction=True)
+def test_values_serializers_match_model_serializers(django_user_model):
+    from api.serializers import (
+        CommentsSerializer, CommentsValuesSerializer, ReviewSerializer,
+        ReviewValuesSerializer, TitleReadSerializer, TitleValuesSerializer
+    )
+    from reviews.models import Category, Comments, Genre, Review, Title
+
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name=name, slug=slug)
+        for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'))
+    ]
+    with_category = Title.objects.create(
+        name='Терминатор', year=1984, category=category,
+        description='I`ll be back'
+    )
+    with_category.genre.set(genres)
+    Title.objects.create(name='Без категории', year=1990)
+    author = django_user_model.objects.create_user(
+        username='author', email='author@yamdb.fake'
+    )
+    review = Review.objects.create(
+        title=with_category, author=author, text='Отзыв', score=7
+    )
+    Comments.objects.create(review=review, author=author, text='Коммент')
+
+    cases = (
+        (Title.objects.select_related('category').prefetch_related('genre'),
+         TitleReadSerializer, TitleValuesSerializer),
+        (Review.objects.select_related('author'),
+         ReviewSerializer, ReviewValuesSerializer),
+        (Comments.objects.select_related('author'),
+         CommentsSerializer, CommentsValuesSerializer),
+    )
+    renderer = JSONRenderer()
+    for queryset, model_serializer, values_serializer in cases:
+        expected = renderer.render(model_serializer(queryset, many=True).data)
+        actual = renderer.render(
+            values_serializer(values_serializer.values_queryset(queryset)).data
+        )
+        assert actual == expected, (
+            f'Проверьте, что {values_serializer.__name__} выводит те же '
+            f'данные, что и {model_serializer.__name__}.'
+        )
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17EmailOutbox:
+
+    SIGNUP_URL = '/api/v1/auth/signup/'
+
+    def test_01_signup_only_enqueues(self, client, settings):
+        from users.models import OutgoingEmail
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        outbox_before_count = len(mail.outbox)
+        data = {'email': 'queued@yamdb.fake', 'username': 'queued'}
+        response = client.post(self.SIGNUP_URL, data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == outbox_before_count, (
+            'Проверьте, что при регистрации письмо только ставится в очередь.'
+        )
+        email = OutgoingEmail.objects.get(to=data['email'])
+        assert email.sent_at is None
+
+        call_command('send_outbox')
+        assert len(mail.outbox) == outbox_before_count + 1
+        assert mail.outbox[-1].to == [data['email']]
+        email.refresh_from_db()
+        assert email.sent_at is not None and email.attempts == 1
+
+    def test_02_failed_send_is_retried_with_backoff(self, settings,
+                                                    monkeypatch):
+        from users import outbox
+        from users.models import OutgoingEmail
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        outbox.enqueue_mail('Тема', 'Текст', ['retry@yamdb.fake'])
+
+        def broken_send(self, *args, **kwargs):
+            raise ConnectionError('smtp недоступен')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(outbox.EmailMessage, 'send', broken_send)
+            assert outbox.drain_outbox() == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1
+        assert 'smtp недоступен' in email.last_error
+        assert email.next_attempt_at > timezone.now() + timedelta(seconds=20)
+        assert outbox.drain_outbox() == (0, 0), (
+            'Проверьте, что письмо не отправляется повторно до истечения '
+            'задержки.'
+        )
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert outbox.drain_outbox() == (1, 0)
+        assert OutgoingEmail.objects.get().sent_at is not None
+
+    def test_03_claim_is_exclusive(self, settings):
+        from users import outbox
+        from users.models import OutgoingEmail
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        outbox.enqueue_mail('Тема', 'Текст', ['a@yamdb.fake', 'b@yamdb.fake'])
+        now = timezone.now()
+        leased_until = now + timedelta(minutes=5)
+        candidates = list(outbox.pending_emails(now))
+        # Второй воркер прочитал тех же кандидатов, но первый успел раньше.
+        first = outbox.claim_each(candidates[:1], now, leased_until)
+        second = outbox.claim_each(candidates, now, leased_until)
+        assert [email.pk for email in first] == [candidates[0].pk]
+        assert [email.pk for email in second] == [candidates[1].pk], (
+            'Проверьте, что письмо, забранное одним воркером, не достаётся '
+            'другому.'
+        )
+        assert OutgoingEmail.objects.filter(
+            next_attempt_at=leased_until
+        ).count() == 2
+
+    def test_04_purge_old_emails(self, settings):
+        from users import outbox
+        from users.models import OutgoingEmail
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        outbox.enqueue_mail('Тема', 'Текст', ['old@yamdb.fake'])
+        assert outbox.drain_outbox() == (1, 0)
+        outbox.enqueue_mail('Тема', 'Текст', ['queued@yamdb.fake'])
+        OutgoingEmail.objects.update(
+            created_at=timezone.now() - timedelta(
+                seconds=settings.EMAIL_OUTBOX_RETENTION + 1
+            )
+        )
+        call_command('send_outbox')
+        assert list(OutgoingEmail.objects.values_list('to', flat=True)) == [
+            'queued@yamdb.fake'
+        ], (
+            'Проверьте, что send_outbox удаляет старые отправленные письма '
+            'и не трогает неотправленные.'
+        )
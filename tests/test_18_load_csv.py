@@ -0,0 +1,109 @@
+import csv
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from tests.conftest import MANAGE_PATH
+
+DATA_PATH = os.path.join(MANAGE_PATH, 'static', 'data')
+
+
+def read_csv(filename):
+    with open(os.path.join(DATA_PATH, filename), encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18LoadCsv:
+
+    def test_01_load_all_datasets(self, client):
+        from reviews.models import Comments, Review, Title
+
+        out = StringIO()
+        call_command('load_csv', stdout=out)
+        assert 'строк/с' in out.getvalue()
+
+        assert Title.objects.count() == len(read_csv('titles.csv'))
+        assert Review.objects.count() == len(read_csv('review.csv'))
+        assert Comments.objects.count() == len(read_csv('comments.csv'))
+        assert Title.genre.through.objects.count() == len(
+            read_csv('genre_title.csv')
+        )
+
+        row = read_csv('review.csv')[0]
+        review = Review.objects.get(pk=row['id'])
+        assert review.pub_date.isoformat().startswith(row['pub_date'][:19]), (
+            'Проверьте, что `load_csv` сохраняет дату публикации из CSV.'
+        )
+        scores = [
+            int(item['score']) for item in read_csv('review.csv')
+            if item['title_id'] == row['title_id']
+        ]
+        response = client.get(f'/api/v1/titles/{row["title_id"]}/')
+        assert response.json()['rating'] == sum(scores) // len(scores)
+        assert response.json()['genre'], (
+            'Проверьте, что `load_csv` загружает связи произведений и жанров.'
+        )
+
+    def test_02_reload_requires_ignore_conflicts(self):
+        from django.core.management.base import CommandError
+        from reviews.models import Genre
+
+        call_command('load_csv', 'genre', stdout=StringIO())
+        with pytest.raises(CommandError):
+            call_command('load_csv', 'genre', stdout=StringIO())
+        call_command(
+            'load_csv', 'genre', '--ignore-conflicts', stdout=StringIO()
+        )
+        assert Genre.objects.count() == len(read_csv('genre.csv'))
+
+    def test_03_only_referenced_ids_loaded(self):
+        from reviews.csv_loader import DATASETS_BY_NAME, CsvLoader
+        from reviews.models import Review
+
+        call_command('load_csv', 'users', 'category', 'genre', 'titles',
+                     stdout=StringIO())
+        loader = CsvLoader()
+        loader.load(
+            DATASETS_BY_NAME['review'], os.path.join(DATA_PATH, 'review.csv')
+        )
+        assert set(loader.ids) == {'titles', 'users'}, (
+            'Проверьте, что загрузчик читает id только тех таблиц, на '
+            'которые ссылается загружаемый набор.'
+        )
+        assert Review._meta.get_field('pub_date').auto_now_add, (
+            'Проверьте, что загрузка не меняет определения полей модели.'
+        )
+        row = read_csv('review.csv')[0]
+        assert Review.objects.get(
+            pk=row['id']
+        ).pub_date.isoformat().startswith(row['pub_date'][:19])
+
+    def test_04_ignored_rows_keep_existing_data(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from reviews.models import Review
+
+        call_command('load_csv', stdout=StringIO())
+        row = read_csv('review.csv')[0]
+        live_date = timezone.now() - timedelta(days=1)
+        Review.objects.filter(pk=row['id']).update(pub_date=live_date)
+        Review.objects.exclude(pk=row['id']).delete()
+        out = StringIO()
+        call_command(
+            'load_csv', 'review', '--ignore-conflicts', stdout=out
+        )
+        assert Review.objects.get(pk=row['id']).pub_date == live_date, (
+            'Проверьте, что загрузка с --ignore-conflicts не меняет '
+            'существующие строки.'
+        )
+        created = len(read_csv('review.csv')) - 1
+        assert Review.objects.count() == created + 1
+        assert f'review: {created} строк' in out.getvalue(), (
+            'Проверьте, что пропущенные из-за конфликта строки не '
+            'считаются созданными.'
+        )
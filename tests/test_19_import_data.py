@@ -0,0 +1,113 @@
+import csv
+import os
+import shutil
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from tests.test_18_load_csv import DATA_PATH, read_csv
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19ImportData:
+
+    def test_01_parallel_import(self):
+        from reviews.models import Comments, Review, Title
+
+        out = StringIO()
+        call_command('import_data', '--workers', '2', stdout=out)
+        output = out.getvalue()
+        assert 'review: разобрано' in output, (
+            'Проверьте, что `import_data` сообщает о разборе файлов.'
+        )
+        assert 'review: записано' in output, (
+            'Проверьте, что `import_data` сообщает о записи файлов.'
+        )
+        assert Title.objects.count() == len(read_csv('titles.csv'))
+        assert Review.objects.count() == len(read_csv('review.csv'))
+        assert Comments.objects.count() == len(read_csv('comments.csv'))
+        assert Title.objects.exclude(reviews=None).filter(
+            rating=None
+        ).count() == 0, (
+            'Проверьте, что после `import_data` рейтинги пересчитаны.'
+        )
+
+        with pytest.raises(CommandError):
+            call_command('import_data', 'genre', stdout=StringIO())
+        out = StringIO()
+        call_command(
+            'import_data', 'genre', '--ignore-conflicts', stdout=out
+        )
+        assert f'уже было в базе {len(read_csv("genre.csv"))}' in (
+            out.getvalue()
+        )
+
+    def test_02_invalid_rows_skipped(self, tmp_path):
+        from reviews.models import Review
+
+        for filename in ('users.csv', 'category.csv', 'genre.csv',
+                         'titles.csv'):
+            shutil.copy(os.path.join(DATA_PATH, filename), tmp_path)
+        rows = read_csv('review.csv')
+        rows[0]['score'] = 'десять'
+        rows[1]['title_id'] = '100500'
+        with open(tmp_path / 'review.csv', 'w', encoding='utf-8',
+                  newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_data', 'users', 'category', 'genre', 'titles', 'review',
+            '--path', str(tmp_path), stdout=out, stderr=err
+        )
+        assert Review.objects.count() == len(rows) - 2
+        assert 'review.csv:2:' in err.getvalue()
+        assert 'review.csv:3:' in err.getvalue(), (
+            'Проверьте, что `import_data` сообщает о строках со ссылками '
+            'на несуществующие объекты.'
+        )
+
+    def test_03_missing_file(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command(
+                'import_data', 'genre', '--path', str(tmp_path),
+                stdout=StringIO()
+            )
+
+    def test_04_finish_after_failed_dataset(self, tmp_path):
+        from reviews.models import Title
+        from reviews.signals import data_loaded
+
+        for filename in ('users.csv', 'category.csv', 'genre.csv',
+                         'titles.csv'):
+            shutil.copy(os.path.join(DATA_PATH, filename), tmp_path)
+        rows = read_csv('review.csv')
+        # Повтор первичного ключа: ошибка при записи, после titles.
+        with open(tmp_path / 'review.csv', 'w', encoding='utf-8',
+                  newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows + rows[:1])
+        loaded = []
+
+        def receiver(sender, datasets, **kwargs):
+            loaded.extend(datasets)
+
+        data_loaded.connect(receiver)
+        try:
+            with pytest.raises(CommandError):
+                call_command(
+                    'import_data', 'users', 'category', 'genre', 'titles',
+                    'review', '--path', str(tmp_path), stdout=StringIO()
+                )
+        finally:
+            data_loaded.disconnect(receiver)
+        assert Title.objects.count() == len(read_csv('titles.csv'))
+        assert set(loaded) == {'users', 'category', 'genre', 'titles'}, (
+            'Проверьте, что после ошибки в одном наборе данные, уже '
+            'записанные в базу, пересчитываются.'
+        )
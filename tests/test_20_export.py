@@ -0,0 +1,164 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+
+from tests.utils import assert_max_queries
+
+
+def streamed(response):
+    assert response.streaming, (
+        'Проверьте, что выгрузка отдаётся через `StreamingHttpResponse`.'
+    )
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.fixture
+def exported_data(django_user_model):
+    from reviews.models import Category, Comments, Review, Title
+
+    category = Category.objects.create(name='Фильм', slug='films')
+    titles = [
+        Title.objects.create(name=f'Фильм {year}', year=year,
+                             category=category)
+        for year in (1984, 1991, 2003)
+    ]
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'author{index}', email=f'author{index}@yamdb.fake'
+        )
+        for index in range(2)
+    ]
+    reviews = [
+        Review.objects.create(
+            title=title, author=author, text='Отзыв, "с кавычками"',
+            score=score
+        )
+        for title, score in zip(titles, (3, 7, 9))
+        for author in authors
+    ]
+    Comments.objects.create(review=reviews[0], author=authors[1], text='Да')
+    return titles, reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20Export:
+    url = '/api/v1/export/{}/'
+
+    def test_01_permissions(self, client, user_client, admin_client):
+        assert client.get(self.url.format('titles')).status_code == 401
+        assert user_client.get(self.url.format('titles')).status_code == 403
+        response = admin_client.get(self.url.format('users'))
+        assert response.status_code == 404
+
+    def test_02_csv(self, admin_client, exported_data):
+        titles, reviews = exported_data
+        with assert_max_queries(3, self.url.format('reviews')):
+            response = admin_client.get(self.url.format('reviews'))
+            content = streamed(response)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(StringIO(content)))
+        assert len(rows) == len(reviews)
+        assert rows[0]['text'] == reviews[0].text
+        assert rows[0]['author'] == reviews[0].author.username
+        assert [int(row['id']) for row in rows] == sorted(
+            review.id for review in reviews
+        )
+
+    def test_03_ndjson_fields_and_filters(self, admin_client, exported_data):
+        titles, reviews = exported_data
+        response = admin_client.get(
+            self.url.format('reviews'),
+            {'format': 'ndjson', 'fields': 'id,score', 'score_min': 7}
+        )
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = [json.loads(line) for line in streamed(response).splitlines()]
+        assert lines == [
+            {'id': review.id, 'score': review.score}
+            for review in reviews if review.score >= 7
+        ], 'Проверьте выбор полей и фильтры в выгрузке отзывов.'
+
+        response = admin_client.get(
+            self.url.format('titles'),
+            {'fields': 'name,category', 'year_min': 1990},
+            HTTP_ACCEPT='application/x-ndjson'
+        )
+        lines = [json.loads(line) for line in streamed(response).splitlines()]
+        assert lines == [
+            {'name': title.name, 'category': 'films'}
+            for title in titles if title.year >= 1990
+        ]
+
+        response = admin_client.get(
+            self.url.format('comments'), {'format': 'ndjson'}
+        )
+        lines = [json.loads(line) for line in streamed(response).splitlines()]
+        assert len(lines) == 1
+        assert lines[0]['title_id'] == titles[0].id
+
+    def test_04_invalid_params(self, admin_client, exported_data):
+        response = admin_client.get(
+            self.url.format('titles'), {'fields': 'name,password'}
+        )
+        assert response.status_code == 400
+        response = admin_client.get(
+            self.url.format('reviews'), {'pub_date_after': 'вчера'}
+        )
+        assert response.status_code == 400
+
+    def test_05_columnar(self, admin_client, exported_data):
+        from io import BytesIO
+
+        from api import columnar
+
+        titles, reviews = exported_data
+        titles[0].genre.create(name='Драма', slug='drama')
+        response = admin_client.get(
+            self.url.format('reviews'),
+            {'format': 'ycol', 'fields': 'id,title_id,score,pub_date'}
+        )
+        assert response.status_code == 200
+        reader = columnar.Reader(BytesIO(b''.join(response.streaming_content)))
+        assert reader.types[0] in (columnar.INT32, columnar.INT64)
+        assert reader.types[1:] == [
+            reader.types[0], columnar.INT16, columnar.TIMESTAMP
+        ], 'Проверьте типы колонок в колоночной выгрузке.'
+        groups = list(reader)
+        assert groups[0]['score'] == [review.score for review in reviews]
+        assert groups[0]['pub_date'][0] == reviews[0].pub_date
+
+        response = admin_client.get(
+            self.url.format('genre_title'), {'format': 'ycol'}
+        )
+        reader = columnar.Reader(BytesIO(b''.join(response.streaming_content)))
+        assert [
+            (group['title_id'], group['genre_id']) for group in reader
+        ] == [([titles[0].id], [titles[0].genre.get().id])]
+
+
+def test_columnar_row_groups_and_nulls():
+    from datetime import datetime, timezone
+    from io import BytesIO
+
+    from api import columnar
+
+    moment = datetime(2020, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+    rows = [
+        (index, None if index % 3 else f'строка {index}',
+         None if index % 2 else moment)
+        for index in range(25)
+    ]
+    encoded = b''.join(columnar.encode(
+        ['id', 'text', 'at'],
+        [columnar.INT64, columnar.STRING, columnar.TIMESTAMP],
+        rows, row_group_size=10
+    ))
+    groups = list(columnar.Reader(BytesIO(encoded)))
+    assert [len(group['id']) for group in groups] == [10, 10, 5]
+    assert [
+        row for group in groups
+        for row in zip(group['id'], group['text'], group['at'])
+    ] == rows
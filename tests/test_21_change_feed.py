@@ -0,0 +1,150 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+
+def read_feed(client, **params):
+    response = client.get('/api/v1/changes/', params)
+    assert response.status_code == 200, (
+        'Проверьте, что `/api/v1/changes/` доступен администратору.'
+    )
+    return response.json()
+
+
+def read_all(client, since=None, limit=2):
+    """Читает ленту страницами по `limit`, как это делает хранилище."""
+    changes, cursor = [], since
+    while True:
+        params = {'limit': limit}
+        if cursor:
+            params['since'] = cursor
+        data = read_feed(client, **params)
+        changes.extend(data['results'])
+        if len(data['results']) < limit:
+            return changes, data['next']
+        cursor = data['next']
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21ChangeFeed:
+
+    def test_01_permissions(self, client, user_client):
+        assert client.get('/api/v1/changes/').status_code == 401
+        assert user_client.get('/api/v1/changes/').status_code == 403
+
+    def test_02_updates_and_deletes(self, admin_client, admin):
+        from reviews.models import Category, Comments, Genre, Review, Title
+
+        category = Category.objects.create(name='Фильм', slug='films')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(name='Терминатор', year=1984,
+                                     category=category)
+        title.genre.add(genre)
+        review = Review.objects.create(title=title, author=admin,
+                                       text='Отзыв', score=7)
+        comment = Comments.objects.create(review=review, author=admin,
+                                          text='Коммент')
+
+        changes, cursor = read_all(admin_client)
+        keys = [(change['type'], change['id']) for change in changes]
+        assert len(keys) == len(set(keys)), (
+            'Проверьте, что постраничное чтение ленты не повторяет записи.'
+        )
+        assert set(keys) == {
+            ('category', category.id), ('genre', genre.id),
+            ('title', title.id), ('review', review.id),
+            ('comment', comment.id),
+        }
+        assert [change['changed_at'] for change in changes] == sorted(
+            change['changed_at'] for change in changes
+        )
+        title_change = next(c for c in changes if c['type'] == 'title')
+        assert title_change['data']['genre'] == ['drama']
+        assert title_change['data']['rating'] == 7
+
+        assert read_feed(admin_client, since=cursor)['results'] == [], (
+            'Проверьте, что лента после курсора пуста, если изменений нет.'
+        )
+
+        review.score = 9
+        review.save()
+        comment_id, genre_id = comment.id, genre.id
+        comment.delete()
+        genre.delete()
+        changes, _ = read_all(admin_client, since=cursor)
+        assert {
+            (change['type'], change['id'], change['action'])
+            for change in changes
+        } == {
+            ('review', review.id, 'updated'),
+            ('title', title.id, 'updated'),
+            ('comment', comment_id, 'deleted'),
+            ('genre', genre_id, 'deleted'),
+        }, 'Проверьте, что лента содержит только изменения после курсора.'
+        deleted = next(c for c in changes if c['action'] == 'deleted')
+        assert deleted['data'] is None
+
+    def test_03_since_timestamp_and_type(self, admin_client):
+        from reviews.models import Category, Genre
+
+        Category.objects.create(name='Старая', slug='old')
+        since = timezone.now().isoformat()
+        category = Category.objects.create(name='Новая', slug='new')
+        Genre.objects.create(name='Жанр', slug='genre')
+        data = read_feed(admin_client, since=since, type='category')
+        assert [c['id'] for c in data['results']] == [category.id]
+
+        for since in ('вчера', 'bm90LWEtY3Vyc29y'):
+            response = admin_client.get('/api/v1/changes/', {'since': since})
+            assert response.status_code == 400
+
+    def test_04_late_commit_not_skipped(self, admin_client):
+        from reviews.models import Category, ChangeLogEntry
+
+        early = Category.objects.create(name='Ранняя', slug='early')
+        ChangeLogEntry.objects.all().delete()
+        late = Category.objects.create(name='Поздняя', slug='late')
+        changes, cursor = read_all(admin_client)
+        assert [c['id'] for c in changes] == [late.id]
+        # Долгая транзакция записала изменение раньше (меньший id, старое
+        # время), а закоммитила после того, как курсор ушёл вперёд.
+        ChangeLogEntry.objects.create(
+            id=ChangeLogEntry.objects.get().id - 1, kind='category',
+            object_id=early.id,
+        )
+        ChangeLogEntry.objects.filter(object_id=early.id).update(
+            created_at=timezone.now() - timezone.timedelta(hours=1)
+        )
+        changes, _ = read_all(admin_client, since=cursor)
+        assert [c['id'] for c in changes] == [early.id], (
+            'Проверьте, что изменение, закоммиченное после чтения ленты, '
+            'попадает после курсора.'
+        )
+
+    def test_05_purge(self, admin_client, settings):
+        from reviews.changes import encode_position
+        from reviews.models import Category, ChangeLogEntry
+
+        Category.objects.create(name='Старая', slug='old')
+        _, cursor = read_all(admin_client)
+        ChangeLogEntry.objects.update(
+            created_at=timezone.now() - timezone.timedelta(days=2)
+        )
+        category = Category.objects.create(name='Новая', slug='new')
+        settings.CHANGE_LOG_RETENTION = 24 * 60 * 60
+        call_command('purge_changes', stdout=StringIO())
+        assert list(ChangeLogEntry.objects.values_list(
+            'object_id', flat=True
+        )) == [category.id], (
+            'Проверьте, что purge_changes удаляет старые записи журнала.'
+        )
+        changes = read_feed(admin_client, since=cursor)['results']
+        assert [change['id'] for change in changes] == [category.id]
+        response = admin_client.get(
+            '/api/v1/changes/', {'since': encode_position(0)}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что курсор до очищенной части журнала отклоняется.'
+        )
@@ -0,0 +1,123 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import assert_max_queries
+
+URL = '/api/v1/titles/top/'
+
+
+@pytest.fixture
+def leaderboard_data(django_user_model):
+    from reviews.models import Category, Genre, Review, Title
+
+    films = Category.objects.create(name='Фильм', slug='films')
+    books = Category.objects.create(name='Книга', slug='books')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'critic{index}', email=f'critic{index}@yamdb.fake'
+        )
+        for index in range(20)
+    ]
+    lucky = Title.objects.create(name='Один отзыв', year=2000,
+                                 category=films)
+    classic = Title.objects.create(name='Классика', year=1970,
+                                   category=films)
+    classic.genre.add(drama)
+    average = Title.objects.create(name='Середняк', year=2010,
+                                   category=books)
+    Review.objects.create(title=lucky, author=authors[0], text='!',
+                          score=10)
+    for author in authors:
+        Review.objects.create(title=classic, author=author, text='!',
+                              score=9)
+        Review.objects.create(title=average, author=author, text='!',
+                              score=5)
+    call_command('refresh_rankings', stdout=StringIO())
+    return lucky, classic, average, authors
+
+
+def ids(response):
+    assert response.status_code == 200, (
+        f'Проверьте, что `{URL}` доступен без токена.'
+    )
+    return [title['id'] for title in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Leaderboard:
+
+    def test_01_bayesian_order(self, client, leaderboard_data):
+        lucky, classic, average, _ = leaderboard_data
+        with assert_max_queries(4, URL):
+            response = client.get(URL)
+        assert ids(response) == [classic.id, lucky.id, average.id], (
+            'Проверьте, что рейтинг использует байесовскую оценку и '
+            'произведение с одним отзывом не обгоняет классику.'
+        )
+        first = response.json()['results'][0]
+        assert first['name'] == classic.name
+        assert first['genre'] == [{'name': 'Драма', 'slug': 'drama'}]
+        assert first['reviews_count'] == 20
+        assert 8 < first['score'] < 9
+
+        response = client.get(URL, {'order': 'reviews', 'limit': 2})
+        assert ids(response) == [classic.id, average.id]
+
+    def test_02_filters(self, client, leaderboard_data):
+        lucky, classic, average, _ = leaderboard_data
+        assert ids(client.get(URL, {'category': 'books'})) == [average.id]
+        assert ids(client.get(URL, {'genre': 'drama'})) == [classic.id]
+        assert ids(client.get(
+            URL, {'year_min': 1990, 'year_max': 2005}
+        )) == [lucky.id]
+        assert client.get(URL, {'order': 'name'}).status_code == 400
+
+    def test_03_incremental_updates(self, client, leaderboard_data):
+        from reviews.models import Review, Title
+
+        lucky, classic, average, authors = leaderboard_data
+        for author in authors[1:]:
+            Review.objects.create(title=lucky, author=author, text='!',
+                                  score=10)
+        assert ids(client.get(URL))[0] == lucky.id, (
+            'Проверьте, что рейтинг обновляется при добавлении отзывов.'
+        )
+        Title.objects.filter(pk=average.pk).delete()
+        classic.reviews.all().delete()
+        assert ids(client.get(URL)) == [lucky.id], (
+            'Проверьте, что произведения без отзывов и удалённые '
+            'произведения выпадают из рейтинга.'
+        )
+        lucky.year = 1950
+        lucky.save()
+        assert ids(client.get(URL, {'year_max': 1960})) == [lucky.id]
+
+    def test_04_prior_follows_reviews(self, leaderboard_data):
+        from reviews.models import Review, TitleRanking
+        from reviews.rankings import (bayesian_score, compute_prior,
+                                      get_prior)
+
+        lucky, classic, average, authors = leaderboard_data
+        Review.objects.create(title=lucky, author=authors[1], text='!',
+                              score=1)
+        average.reviews.filter(author=authors[0]).delete()
+        review = classic.reviews.get(author=authors[0])
+        review.score = 2
+        review.save()
+        prior = get_prior()
+        expected = compute_prior()
+        assert (prior.score_sum, prior.reviews_count) == (
+            expected.score_sum, expected.reviews_count
+        ), (
+            'Проверьте, что сумма и число оценок для рейтинга меняются '
+            'вместе со счётчиками произведений, без refresh_rankings.'
+        )
+        classic.refresh_from_db()
+        assert TitleRanking.objects.get(
+            title=classic
+        ).score == pytest.approx(
+            bayesian_score(classic.score_sum, classic.reviews_count, prior)
+        )
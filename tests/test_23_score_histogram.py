@@ -0,0 +1,105 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import assert_max_queries
+
+
+def histogram(**counts):
+    result = {str(score): 0 for score in range(1, 11)}
+    result.update(counts)
+    return result
+
+
+@pytest.fixture
+def scored_title(django_user_model):
+    from reviews.models import Review, Title
+
+    title = Title.objects.create(name='Терминатор', year=1984)
+    reviews = [
+        Review.objects.create(
+            title=title, text='!', score=score,
+            author=django_user_model.objects.create_user(
+                username=f'critic{index}', email=f'critic{index}@yamdb.fake'
+            )
+        )
+        for index, score in enumerate((2, 8, 8, 10))
+    ]
+    return title, reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23ScoreHistogram:
+
+    def test_01_histogram_maintained(self, client, scored_title):
+        from reviews.models import Title
+
+        title, reviews = scored_title
+        url = f'/api/v1/titles/{title.id}/'
+        response = client.get(url)
+        assert 'score_histogram' not in response.json(), (
+            'Проверьте, что гистограмма выводится только по запросу.'
+        )
+        response = client.get(url, {'include': 'histogram'})
+        assert response.json()['score_histogram'] == histogram(
+            **{'2': 1, '8': 2, '10': 1}
+        )
+
+        reviews[0].score = 9
+        reviews[0].save()
+        reviews[3].delete()
+        other = Title.objects.create(name='Чужой', year=1979)
+        reviews[1].title = other
+        reviews[1].save()
+        title.refresh_from_db()
+        other.refresh_from_db()
+        assert title.score_counts == [0] * 7 + [1, 1, 0], (
+            'Проверьте, что гистограмма обновляется при изменении, '
+            'удалении и переносе отзывов.'
+        )
+        assert other.score_counts == [0] * 7 + [1, 0, 0]
+
+        response = client.get('/api/v1/titles/', {'include': 'histogram'})
+        listed = {
+            item['id']: item['score_histogram']
+            for item in response.json()['results']
+        }
+        assert listed[title.id] == histogram(**{'8': 1, '9': 1})
+        assert listed[other.id] == histogram(**{'8': 1})
+
+    def test_02_score_stats(self, client, scored_title):
+        from reviews.models import Review
+
+        title, _ = scored_title
+        url = f'/api/v1/titles/{title.id}/scores/'
+        with assert_max_queries(1, url) as context:
+            response = client.get(url)
+        sql = context.captured_queries[0]['sql']
+        assert Review._meta.db_table not in sql, (
+            'Проверьте, что статистика считается без чтения отзывов.'
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            'histogram': histogram(**{'2': 1, '8': 2, '10': 1}),
+            'count': 4,
+            'mean': 7.0,
+            'median': 8.0,
+            'percentiles': {'25': 6.5, '50': 8.0, '75': 8.5, '90': 9.4},
+        }
+        response = client.get(url, {'percentiles': '0,100'})
+        assert response.json()['percentiles'] == {'0': 2.0, '100': 10.0}
+        assert client.get(url, {'percentiles': '150'}).status_code == 400
+        assert client.get('/api/v1/titles/100500/scores/').status_code == 404
+        assert client.get('/api/v1/titles/abc/scores/').status_code == 404, (
+            'Проверьте, что для нечислового id возвращается 404.'
+        )
+
+    def test_03_recalculate_fixes_histogram(self, scored_title):
+        from reviews.models import Title
+
+        title, _ = scored_title
+        Title.objects.filter(pk=title.pk).update(score_8_count=0)
+        call_command('recalculate_ratings', stdout=StringIO())
+        title.refresh_from_db()
+        assert title.score_8_count == 2
@@ -0,0 +1,135 @@
+import random
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from tests.utils import assert_max_queries
+
+
+def similar_url(title_id):
+    return f'/api/v1/titles/{title_id}/similar/'
+
+
+@pytest.fixture
+def similar_data(django_user_model):
+    from reviews.models import Category, Review, Title
+
+    films = Category.objects.create(name='Фильм', slug='films')
+    drama, sequel, comedy, lonely = (
+        Title.objects.create(name=name, year=2000, category=films)
+        for name in ('Драма', 'Драма 2', 'Комедия', 'Без оценок')
+    )
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'viewer{index}', email=f'viewer{index}@yamdb.fake'
+        )
+        for index in range(6)
+    ]
+    # Любители драм ставят обеим драмам высокие оценки, комедии — низкие,
+    # любители комедий — наоборот.
+    for index, author in enumerate(authors):
+        high, low = (9, 3) if index % 2 else (2, 8)
+        Review.objects.create(title=drama, author=author, text='!',
+                              score=high)
+        Review.objects.create(title=sequel, author=author, text='!',
+                              score=high - index % 3 % 2)
+        Review.objects.create(title=comedy, author=author, text='!',
+                              score=low)
+    call_command('compute_similarities', stdout=StringIO())
+    return drama, sequel, comedy, lonely, authors
+
+
+def random_ratings():
+    generator = random.Random(24)
+    ratings = {}
+    for author_id in range(1, 60):
+        titles = generator.sample(range(1, 40), generator.randint(1, 12))
+        scores = [(title_id, generator.randint(1, 10)) for title_id in titles]
+        mean = sum(score for _, score in scores) / len(scores)
+        ratings[author_id] = sorted(
+            (title_id, score - mean) for title_id, score in scores
+        )
+    return ratings
+
+
+class Test24SimilarityEngines:
+
+    def test_01_numpy_matches_python(self, monkeypatch):
+        from reviews import recommendations
+
+        pytest.importorskip('numpy')
+        ratings = random_ratings()
+        title_ids = list(range(1, 42))
+        expected = recommendations.PythonEngine(ratings).neighbours(
+            title_ids, 5, 2, 3
+        )
+        assert any(expected.values())
+        engine = recommendations.NumpyEngine(ratings)
+        monkeypatch.setattr(recommendations, 'PAIRS_PER_BLOCK', 7)
+        for chunk in (title_ids[:10], title_ids[10:]):
+            actual = engine.neighbours(chunk, 5, 2, 3)
+            for title_id in chunk:
+                assert [pair[0] for pair in actual[title_id]] == [
+                    pair[0] for pair in expected[title_id]
+                ], (
+                    'Проверьте, что расчёт на NumPy выбирает тех же соседей, '
+                    'что и расчёт без NumPy.'
+                )
+                assert [pair[1] for pair in actual[title_id]] == (
+                    pytest.approx([pair[1] for pair in expected[title_id]])
+                )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24SimilarTitles:
+
+    def test_01_neighbours(self, client, similar_data):
+        drama, sequel, comedy, lonely, _ = similar_data
+        url = similar_url(drama.id)
+        with assert_max_queries(1, url):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что `{url}` доступен без токена.'
+        )
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [sequel.id], (
+            'Проверьте, что в похожие попадают произведения с похожими '
+            'оценками и не попадают произведения с противоположными.'
+        )
+        assert results[0]['name'] == sequel.name
+        assert results[0]['category'] == {'name': 'Фильм', 'slug': 'films'}
+        assert 0 < results[0]['similarity'] <= 1
+        assert client.get(similar_url(lonely.id)).json() == {'results': []}
+        assert client.get(similar_url(lonely.id + 100)).status_code == 404
+        assert client.get(similar_url('abc')).status_code == 404, (
+            'Проверьте, что для нечислового id возвращается 404.'
+        )
+        assert client.get(url, {'limit': 0}).status_code == 400
+
+    def test_02_incremental_refresh(self, similar_data):
+        from reviews.models import Review, TitleSimilarity
+
+        drama, sequel, comedy, lonely, authors = similar_data
+        started = timezone.now()
+        for index, author in enumerate(authors):
+            Review.objects.create(title=lonely, author=author, text='!',
+                                  score=8 if index % 2 else 3)
+        call_command(
+            'compute_similarities', changed_since=started.isoformat(),
+            stdout=StringIO()
+        )
+        neighbours = set(TitleSimilarity.objects.filter(
+            title=lonely
+        ).values_list('similar_id', flat=True))
+        assert neighbours == {drama.id, sequel.id}, (
+            'Проверьте, что `compute_similarities --changed-since` '
+            'пересчитывает изменённые произведения.'
+        )
+        assert lonely.id in TitleSimilarity.objects.filter(
+            title=drama
+        ).values_list('similar_id', flat=True), (
+            'Проверьте, что при инкрементном пересчёте обновляются и '
+            'соседи изменённых произведений.'
+        )
@@ -0,0 +1,186 @@
+import random
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from tests.utils import assert_max_queries
+
+URL = '/api/v1/users/me/recommendations/'
+
+
+@pytest.fixture
+def recommendations_data(django_user_model, user):
+    from reviews.models import Category, Review, Title
+
+    cache.clear()
+    films = Category.objects.create(name='Фильм', slug='films')
+    drama, sequel, comedy = (
+        Title.objects.create(name=name, year=2000, category=films)
+        for name in ('Драма', 'Драма 2', 'Комедия')
+    )
+    for index in range(6):
+        author = django_user_model.objects.create_user(
+            username=f'viewer{index}', email=f'viewer{index}@yamdb.fake'
+        )
+        high, low = (9, 3) if index % 2 else (2, 8)
+        Review.objects.create(title=drama, author=author, text='!',
+                              score=high)
+        Review.objects.create(title=sequel, author=author, text='!',
+                              score=high - index % 3 % 2)
+        Review.objects.create(title=comedy, author=author, text='!',
+                              score=low)
+    Review.objects.create(title=drama, author=user, text='!', score=10)
+    Review.objects.create(title=comedy, author=user, text='!', score=2)
+    call_command('compute_similarities', stdout=StringIO())
+    call_command('compute_recommendations', stdout=StringIO())
+    yield drama, sequel, comedy
+    cache.clear()
+
+
+def random_data():
+    generator = random.Random(25)
+    ratings, means = {}, {}
+    for author_id in range(1, 30):
+        titles = generator.sample(range(1, 40), generator.randint(1, 10))
+        scores = sorted(
+            (title_id, generator.randint(1, 10)) for title_id in titles
+        )
+        means[author_id] = sum(score for _, score in scores) / len(scores)
+        ratings[author_id] = [
+            (title_id, score - means[author_id]) for title_id, score in scores
+        ]
+    similarities = sorted(
+        (title_id, similar_id, generator.random())
+        for title_id in range(1, 40)
+        for similar_id in generator.sample(range(1, 40), 5)
+        if similar_id != title_id
+    )
+    return ratings, means, similarities
+
+
+class Test25RecommendationEngines:
+
+    def test_01_numpy_matches_python(self):
+        from reviews import recommendations
+
+        pytest.importorskip('numpy')
+        ratings, means, similarities = random_data()
+        expected = recommendations.predict_python(
+            ratings, means, similarities, 7
+        )
+        actual = recommendations.predict_numpy(
+            ratings, means, similarities, 7
+        )
+        assert any(expected.values())
+        for author_id, rows in expected.items():
+            assert [row[0] for row in actual[author_id]] == [
+                row[0] for row in rows
+            ], (
+                'Проверьте, что рекомендации на NumPy совпадают с '
+                'рекомендациями без NumPy.'
+            )
+            assert [row[1] for row in actual[author_id]] == pytest.approx(
+                [row[1] for row in rows]
+            )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25Recommendations:
+
+    def test_01_requires_auth(self, client):
+        assert client.get(URL).status_code == 401, (
+            f'Проверьте, что `{URL}` недоступен без токена.'
+        )
+
+    def test_02_recommendations(self, user_client, recommendations_data):
+        drama, sequel, comedy = recommendations_data
+        with assert_max_queries(2, URL):
+            response = user_client.get(URL)
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [sequel.id], (
+            'Проверьте, что пользователю рекомендуются непросмотренные '
+            'произведения, похожие на те, что он оценил высоко.'
+        )
+        assert results[0]['category'] == {'name': 'Фильм', 'slug': 'films'}
+        assert 8 < results[0]['score'] <= 10
+        with assert_max_queries(1, URL):
+            assert user_client.get(URL).json()['results'] == results, (
+                'Проверьте, что рекомендации кешируются.'
+            )
+        assert user_client.get(URL, {'limit': 0}).status_code == 400
+
+    def test_03_invalidation(self, user_client, user, recommendations_data):
+        from reviews.models import (Review, StaleRecommendations,
+                                    UserRecommendation)
+
+        drama, sequel, comedy = recommendations_data
+        assert user_client.get(URL).json()['results']
+        Review.objects.get(title=comedy, author=user).delete()
+        assert UserRecommendation.objects.filter(user=user).exists()
+        assert StaleRecommendations.objects.filter(user=user).exists(), (
+            'Проверьте, что после изменения отзывов рекомендации '
+            'отмечаются как устаревшие, а не удаляются.'
+        )
+        with assert_max_queries(2, URL):
+            results = user_client.get(URL).json()['results']
+        assert [title['id'] for title in results] == [sequel.id], (
+            'Проверьте, что до пересчёта отдаются прежние рекомендации, '
+            'без расчёта в запросе.'
+        )
+        Review.objects.create(title=sequel, author=user, text='!', score=9)
+        results = user_client.get(URL).json()['results']
+        assert sequel.id not in [title['id'] for title in results], (
+            'Проверьте, что оценённые произведения не рекомендуются.'
+        )
+        Review.objects.get(title=sequel, author=user).delete()
+        Review.objects.create(title=comedy, author=user, text='!', score=1)
+        call_command('compute_recommendations', '--stale', stdout=StringIO())
+        assert not StaleRecommendations.objects.exists()
+        assert [
+            title['id'] for title in user_client.get(URL).json()['results']
+        ] == [sequel.id]
+
+    def test_05_recompute_replaces_cached(self, user_client, user,
+                                          recommendations_data):
+        from reviews.models import Review
+
+        drama, sequel, comedy = recommendations_data
+        Review.objects.get(title=comedy, author=user).delete()
+        Review.objects.create(title=comedy, author=user, text='!', score=10)
+        stale = user_client.get(URL).json()['results']
+        assert [title['id'] for title in stale] == [sequel.id]
+        Review.objects.filter(title=comedy).update(score=10)
+        Review.objects.filter(title=drama).exclude(author=user).update(
+            score=1
+        )
+        call_command('compute_similarities', stdout=StringIO())
+        call_command('compute_recommendations', '--stale', stdout=StringIO())
+        assert user_client.get(URL).json()['results'] != stale, (
+            'Проверьте, что после пересчёта не отдаются закешированные '
+            'прежние рекомендации.'
+        )
+
+    def test_04_popular_fallback(self, recommendations_data,
+                                 django_user_model):
+        from rest_framework.test import APIClient
+
+        from reviews.rankings import top_titles
+        from users.authentication import issue_access_token
+
+        newcomer = django_user_model.objects.create_user(
+            username='newcomer', email='newcomer@yamdb.fake'
+        )
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {issue_access_token(newcomer)}'
+        )
+        results = client.get(URL).json()['results']
+        assert [title['id'] for title in results] == [
+            row[0] for row in top_titles()
+        ], (
+            'Проверьте, что без рекомендаций отдаются популярные '
+            'произведения из рейтинга.'
+        )
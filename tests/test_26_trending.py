@@ -0,0 +1,186 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from tests.utils import assert_max_queries
+
+URL = '/api/v1/titles/trending/'
+
+
+@pytest.fixture
+def trending_data(django_user_model):
+    from reviews.models import Category, Comments, Review, Title
+
+    cache.clear()
+    films = Category.objects.create(name='Фильм', slug='films')
+    books = Category.objects.create(name='Книга', slug='books')
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'reader{index}', email=f'reader{index}@yamdb.fake'
+        )
+        for index in range(4)
+    ]
+    old = Title.objects.create(name='Вчерашний хит', year=2000,
+                               category=films)
+    new = Title.objects.create(name='Новинка', year=2020, category=books)
+    for author in authors:
+        Review.objects.create(title=old, author=author, text='!', score=7)
+    review = Review.objects.create(title=new, author=authors[0], text='!',
+                                   score=9)
+    Comments.objects.create(review=review, author=authors[1], text='!')
+    yield old, new, authors
+    cache.clear()
+
+
+def make_old(title, days):
+    """Сдвигает даты отзывов в прошлое и пересчитывает счётчики."""
+    from reviews.models import Review
+    from reviews.trending import refresh_trending
+
+    Review.objects.filter(title=title).update(
+        pub_date=timezone.now() - timedelta(days=days)
+    )
+    refresh_trending()
+
+
+def ids(response):
+    assert response.status_code == 200, (
+        f'Проверьте, что `{URL}` доступен без токена.'
+    )
+    return [title['id'] for title in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26Trending:
+
+    def test_01_windows(self, client, trending_data):
+        old, new, _ = trending_data
+        make_old(old, days=3)
+        with assert_max_queries(4, URL):
+            response = client.get(URL)
+        assert ids(response) == [new.id, old.id], (
+            'Проверьте, что за окно «день» старая активность затухает.'
+        )
+        activity = response.json()['results'][0]['activity']
+        assert activity == pytest.approx(1.5, abs=0.01), (
+            'Проверьте, что отзыв весит 1, а комментарий — 0.5.'
+        )
+        assert ids(client.get(URL, {'window': 'month'})) == [old.id, new.id]
+        assert ids(client.get(URL, {'category': 'films'})) == [old.id]
+        assert client.get(URL, {'window': 'year'}).status_code == 400
+
+    def test_02_incremental_matches_refresh(self, trending_data):
+        from reviews.trending import refresh_trending, trending_titles
+
+        for window in ('day', 'week', 'month'):
+            incremental = trending_titles(window)
+            refresh_trending()
+            rebuilt = trending_titles(window)
+            assert [row[0] for row in incremental] == [
+                row[0] for row in rebuilt
+            ]
+            assert [row[1] for row in incremental] == pytest.approx(
+                [row[1] for row in rebuilt], rel=1e-3
+            ), (
+                'Проверьте, что счётчики, обновляемые при записи, совпадают '
+                'с пересчитанными по датам отзывов и комментариев.'
+            )
+
+    def test_03_delete_and_rebase(self, client, trending_data):
+        from django.db.models import F
+
+        from reviews.models import Review, TitleTrend, TrendReference
+        from reviews.trending import WINDOWS, score_field, trending_titles
+
+        old, new, authors = trending_data
+        Review.objects.filter(title=new).delete()
+        assert ids(client.get(URL)) == [old.id], (
+            'Проверьте, что удалённые отзывы и комментарии не учитываются.'
+        )
+        before = dict(trending_titles('week'))
+        # Те же счётчики относительно точки отсчёта 600 дней назад.
+        shift = timedelta(days=600)
+        reference = TrendReference.objects.get()
+        reference.reference -= shift
+        reference.save()
+        TitleTrend.objects.update(**{
+            score_field(window): F(score_field(window)) * 2 ** (
+                shift / WINDOWS[window]
+            )
+            for window in WINDOWS
+        })
+        Review.objects.create(title=new, author=authors[0], text='!',
+                              score=5)
+        assert TrendReference.objects.get().reference > reference.reference, (
+            'Проверьте, что точка отсчёта переносится вперёд, когда '
+            'множители счётчиков становятся слишком большими.'
+        )
+        after = dict(trending_titles('week'))
+        assert after[old.id] == pytest.approx(before[old.id], rel=1e-6)
+        assert after[new.id] == pytest.approx(1, rel=1e-3)
+
+    def test_04_concurrent_rebase(self, trending_data, monkeypatch):
+        from copy import copy
+
+        from reviews import trending
+        from reviews.models import Review, TrendReference
+
+        old, new, authors = trending_data
+        stale = copy(TrendReference.objects.get())
+        # Другой процесс перенёс точку отсчёта после того, как эта запись
+        # прочитала её без блокировки.
+        trending.rebase(
+            TrendReference.objects.get(),
+            stale.reference + timedelta(hours=1),
+        )
+        get_reference = trending.get_reference
+        calls = []
+
+        def read_before_rebase(using, lock=False):
+            calls.append(lock)
+            if len(calls) == 1:
+                return stale
+            return get_reference(using, lock)
+
+        monkeypatch.setattr(trending, 'get_reference', read_before_rebase)
+        Review.objects.create(title=new, author=authors[2], text='!',
+                              score=5)
+        monkeypatch.undo()
+        assert not any(calls), (
+            'Проверьте, что запись активности не блокирует точку отсчёта.'
+        )
+        incremental = dict(trending.trending_titles('day'))
+        trending.refresh_trending()
+        assert incremental == pytest.approx(
+            dict(trending.trending_titles('day')), rel=1e-3
+        ), (
+            'Проверьте, что вклад пересчитывается, если точку отсчёта '
+            'перенесли между чтением и записью.'
+        )
+
+    def test_05_comments_refresh_cached_response(self, client, trending_data,
+                                                 settings, monkeypatch):
+        import time
+
+        from reviews.models import Comments, Review
+
+        old, new, authors = trending_data
+        make_old(old, days=3)
+        assert ids(client.get(URL)) == [new.id, old.id]
+        review = Review.objects.filter(title=old).first()
+        for author in authors:
+            Comments.objects.create(review=review, author=author, text='!')
+        response = client.get(URL)
+        assert response['X-Cache'] == 'HIT'
+        later = time.time() + settings.TRENDING_CACHE_TIMEOUT + 1
+        # Кеш проверяет срок по time.time().
+        monkeypatch.setattr(time, 'time', lambda: later)
+        assert ids(client.get(URL)) == [old.id, new.id], (
+            'Проверьте, что кеш популярного сейчас живёт не дольше '
+            'TRENDING_CACHE_TIMEOUT и новые комментарии в нём видны.'
+        )
+        assert settings.TRENDING_CACHE_TIMEOUT < (
+            settings.CATALOGUE_CACHE_TIMEOUT
+        )
@@ -0,0 +1,105 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import assert_max_queries
+
+
+@pytest.fixture
+def nested_data(admin):
+    from reviews.models import Comments, Review, Title
+
+    title = Title.objects.create(name='Произведение', year=2000)
+    other = Title.objects.create(name='Другое', year=2001)
+    review = Review.objects.create(title=title, author=admin, text='!',
+                                   score=5)
+    comment = Comments.objects.create(review=review, author=admin, text='!')
+    return title, other, review, comment
+
+
+def object_fetches(context, table):
+    """Запросы, загружающие объекты таблицы целиком."""
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith(f'SELECT "{table}"."id", ')
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27NestedRoutes:
+
+    def test_01_review_create(self, user_client, nested_data):
+        from reviews.models import Review
+
+        title, _, _, _ = nested_data
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['title'] == title.id
+        assert len(object_fetches(context, 'reviews_title')) == 1, (
+            'Проверьте, что при создании отзыва произведение '
+            'запрашивается один раз.'
+        )
+        assert not any(
+            query['sql'].startswith('SELECT (1) AS "a" FROM "reviews_review"')
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что повторный отзыв отсекается ограничением '
+            'unique_review, без отдельного запроса на проверку.'
+        )
+
+        response = user_client.post(url, {'text': 'Ещё', 'score': 1})
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['Вы уже оставили отзыв']
+        }
+        assert Review.objects.filter(title=title).count() == 2
+
+    def test_02_review_detail(self, admin_client, nested_data):
+        title, other, review, _ = nested_data
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        # Пользователь, отзыв, UPDATE и запись в журнал изменений.
+        with assert_max_queries(4, url):
+            response = admin_client.patch(url, {'text': 'Исправлено'})
+        assert response.status_code == 200
+        assert response.json()['title'] == title.id
+        with assert_max_queries(2, url):
+            assert admin_client.get(url).status_code == 200
+        assert admin_client.get(
+            f'/api/v1/titles/{other.id}/reviews/{review.id}/'
+        ).status_code == 404, (
+            'Проверьте, что отзыв ищется только среди отзывов '
+            'произведения из URL.'
+        )
+        assert admin_client.get(
+            f'/api/v1/titles/{other.id + 100}/reviews/'
+        ).status_code == 404
+
+    def test_03_comments(self, admin_client, nested_data):
+        title, other, review, comment = nested_data
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, {'text': 'Комментарий'})
+        assert response.status_code == 201
+        assert len(object_fetches(context, 'reviews_review')) == 1, (
+            'Проверьте, что при создании комментария отзыв запрашивается '
+            'один раз.'
+        )
+        detail_url = f'{url}{comment.id}/'
+        with assert_max_queries(2, detail_url):
+            assert admin_client.get(detail_url).status_code == 200
+        with assert_max_queries(4, detail_url):
+            assert admin_client.patch(
+                detail_url, {'text': 'Исправлено'}
+            ).status_code == 200
+        wrong_title = (
+            f'/api/v1/titles/{other.id}/reviews/{review.id}/comments/'
+        )
+        assert admin_client.get(wrong_title).status_code == 404
+        assert admin_client.post(
+            wrong_title, {'text': '!'}
+        ).status_code == 404
+        assert admin_client.get(
+            f'{wrong_title}{comment.id}/'
+        ).status_code == 404
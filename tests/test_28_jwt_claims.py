@@ -0,0 +1,96 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+USERS_URL = '/api/v1/users/'
+ME_URL = '/api/v1/users/me/'
+
+
+def client_for(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def user_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "users_customuser"' in query['sql']
+    ]
+
+
+@pytest.fixture
+def claims_admin(admin):
+    from users.authentication import issue_access_token
+
+    return admin, client_for(issue_access_token(admin))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28JWTClaims:
+
+    def test_01_token_contains_claims(self, client, user):
+        from users.confirmation import issue_code
+
+        response = client.post('/api/v1/auth/token/', {
+            'username': user.username,
+            'confirmation_code': issue_code(user),
+        })
+        assert response.status_code == 200
+        token = AccessToken(response.json()['token'])
+        assert (token['username'], token['role'], token['is_superuser'],
+                token['is_staff']) == (user.username, 'user', False, False), (
+            'Проверьте, что токен содержит имя, роль и флаги пользователя.'
+        )
+
+    def test_02_no_user_query_per_request(self, claims_admin):
+        from reviews.models import Review, Title
+
+        admin, client = claims_admin
+        title = Title.objects.create(name='Произведение', year=2000)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.get(url).status_code == 200
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, {'text': '!', 'score': 5})
+        assert response.status_code == 201
+        assert user_queries(context) == [], (
+            'Проверьте, что пользователь берётся из токена, без запроса '
+            'к базе на каждый запрос.'
+        )
+        assert response.json()['author'] == admin.username
+        assert Review.objects.get().author == admin
+
+    def test_03_me_loads_full_user(self, claims_admin):
+        admin, client = claims_admin
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(ME_URL)
+        assert response.status_code == 200
+        assert response.json()['email'] == admin.email
+        assert response.json()['bio'] == admin.bio
+        assert len(user_queries(context)) <= 2, (
+            'Проверьте, что для /users/me/ пользователь загружается одним '
+            'запросом.'
+        )
+
+    def test_04_role_change_revokes_token(self, claims_admin):
+        from users.models import CustomUser
+
+        admin, client = claims_admin
+        assert client.get(USERS_URL).status_code == 200
+        admin.role = CustomUser.USER_ROLE
+        admin.save()
+        assert client.get(USERS_URL).status_code == 401, (
+            'Проверьте, что после смены роли старый токен отклоняется.'
+        )
+        admin.role = CustomUser.ADMIN_ROLE
+        admin.save()
+        assert client.get(USERS_URL).status_code == 401, (
+            'Проверьте, что возврат роли не оживляет отозванный токен.'
+        )
+
+    def test_05_tokens_without_claims(self, user_client, user):
+        response = user_client.get(ME_URL)
+        assert response.status_code == 200
+        assert response.json()['username'] == user.username
@@ -0,0 +1,115 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+USERS_URL = '/api/v1/users/'
+ME_URL = '/api/v1/users/me/'
+
+
+def client_for(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def claims_client(user):
+    from users.authentication import issue_access_token
+
+    return client_for(issue_access_token(user))
+
+
+def revocation_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'users_tokenrevocation' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29TokenRevocation:
+
+    def test_01_role_change_via_api(self, client, admin, user):
+        from users.confirmation import issue_code
+
+        admin_client = claims_client(admin)
+        user_client = claims_client(user)
+        assert user_client.get(ME_URL).status_code == 200
+        response = admin_client.patch(
+            f'{USERS_URL}{user.username}/', {'role': 'moderator'}
+        )
+        assert response.status_code == 200
+        assert user_client.get(ME_URL).status_code == 401, (
+            'Проверьте, что после смены роли через API старый токен '
+            'пользователя отклоняется.'
+        )
+        response = client.post('/api/v1/auth/token/', {
+            'username': user.username,
+            'confirmation_code': issue_code(user),
+        })
+        assert response.status_code == 200
+        token = AccessToken(response.json()['token'])
+        assert (token['role'], token['ver']) == ('moderator', 1)
+        assert client_for(token).get(ME_URL).status_code == 200
+
+    def test_02_no_query_per_request(self, admin, settings):
+        client = claims_client(admin)
+        assert client.get(USERS_URL).status_code == 200
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(USERS_URL).status_code == 200
+        assert revocation_queries(context) == [], (
+            'Проверьте, что журнал отзывов читается не чаще раза в '
+            'JWT_DENYLIST_SYNC_INTERVAL секунд.'
+        )
+        settings.JWT_DENYLIST_SYNC_INTERVAL = 0
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(USERS_URL).status_code == 200
+        assert len(revocation_queries(context)) == 1
+
+    def test_03_revocation_from_other_process(self, admin, settings):
+        from users.models import TokenRevocation
+
+        client = claims_client(admin)
+        assert client.get(USERS_URL).status_code == 200
+        # bulk_create не шлёт сигналов: так выглядит отзыв другим процессом.
+        TokenRevocation.objects.bulk_create([
+            TokenRevocation(user_id=admin.pk, version=1)
+        ])
+        assert client.get(USERS_URL).status_code == 200
+        settings.JWT_DENYLIST_SYNC_INTERVAL = 0
+        assert client.get(USERS_URL).status_code == 401, (
+            'Проверьте, что отзывы из других процессов подхватываются при '
+            'синхронизации.'
+        )
+
+    def test_04_deactivate_and_delete(self, admin, user, moderator):
+        user_client = claims_client(user)
+        moderator_client = claims_client(moderator)
+        user.is_active = False
+        user.save()
+        assert user_client.get(ME_URL).status_code == 401, (
+            'Проверьте, что токены деактивированного пользователя '
+            'отклоняются.'
+        )
+        response = claims_client(admin).delete(
+            f'{USERS_URL}{moderator.username}/'
+        )
+        assert response.status_code == 204
+        assert moderator_client.get(ME_URL).status_code == 401, (
+            'Проверьте, что токены удалённого пользователя отклоняются.'
+        )
+
+    def test_05_other_changes_keep_token(self, user):
+        from users.models import TokenRevocation
+
+        client = claims_client(user)
+        response = client.patch(ME_URL, {'bio': 'Новая биография'})
+        assert response.status_code == 200
+        assert client.get(ME_URL).status_code == 200, (
+            'Проверьте, что изменения, не влияющие на права, не отзывают '
+            'токен.'
+        )
+        user.refresh_from_db()
+        assert user.token_version == 0
+        assert not TokenRevocation.objects.exists()
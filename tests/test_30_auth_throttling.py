@@ -0,0 +1,122 @@
+import pytest
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+
+
+def signup(client, index, email='reader@yamdb.fake', **extra):
+    return client.post(SIGNUP_URL, {
+        'username': f'reader{index}', 'email': email
+    }, **extra)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test30AuthThrottling:
+
+    def test_01_signup_limits(self, client, settings):
+        settings.AUTH_THROTTLE_RATES = {
+            'signup': {'ip': '2/minute', 'email': '1/minute'},
+        }
+        assert signup(client, 0).status_code == 200
+        response = signup(client, 1)
+        assert response.status_code == 429, (
+            'Проверьте, что повторная регистрация на тот же email '
+            'ограничена.'
+        )
+        assert 0 < int(response['Retry-After']) <= 60, (
+            'Проверьте, что ответ 429 содержит заголовок Retry-After.'
+        )
+        assert signup(
+            client, 2, 'other@yamdb.fake', REMOTE_ADDR='10.0.0.1'
+        ).status_code == 200
+        assert signup(client, 3, 'third@yamdb.fake').status_code == 200, (
+            'Проверьте, что отклонённый по email запрос не расходует '
+            'лимит IP.'
+        )
+        assert signup(client, 4, 'fourth@yamdb.fake').status_code == 429, (
+            'Проверьте, что число регистраций с одного IP ограничено.'
+        )
+
+    def test_02_token_limits(self, client, user, settings):
+        settings.AUTH_THROTTLE_RATES = {'token': {'username': '2/hour'}}
+        data = {'username': user.username, 'confirmation_code': 'wrong'}
+        assert client.post(TOKEN_URL, data).status_code == 400
+        assert client.post(TOKEN_URL, data).status_code == 400
+        response = client.post(TOKEN_URL, data)
+        assert response.status_code == 429, (
+            'Проверьте, что подбор кода подтверждения ограничен по имени '
+            'пользователя.'
+        )
+        assert int(response['Retry-After']) == 30 * 60
+
+    @pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+    def test_03_buckets(self, backend, tmp_path):
+        from api.throttling import MemoryBucketStore, SQLiteBucketStore
+
+        if backend == 'sqlite':
+            path = tmp_path / 'throttle.sqlite3'
+            first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+        else:
+            first = second = MemoryBucketStore()
+        assert first.consume('key', 2, 60, now=0) == 0
+        assert second.consume('key', 2, 60, now=0) == 0, (
+            'Проверьте, что ведро вмещает N запросов подряд.'
+        )
+        assert second.consume('key', 2, 60, now=0) == pytest.approx(30)
+        assert first.consume('key', 2, 60, now=30) == 0, (
+            'Проверьте, что токены добавляются равномерно за период.'
+        )
+        assert first.consume('other', 2, 60, now=30) == 0
+
+    @pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+    def test_04_rejected_request_keeps_tokens(self, backend, tmp_path):
+        from api.throttling import MemoryBucketStore, SQLiteBucketStore
+
+        if backend == 'sqlite':
+            store = SQLiteBucketStore(tmp_path / 'throttle.sqlite3')
+        else:
+            store = MemoryBucketStore()
+        ip, email = ('ip', 2, 60), ('email', 1, 60)
+        assert store.consume_all([ip, email], now=0) == 0
+        assert store.consume_all([ip, email], now=0) == pytest.approx(60)
+        assert store.consume('ip', 2, 60, now=0) == 0, (
+            'Проверьте, что запрос, отклонённый одним ведром, не забирает '
+            'токены из остальных.'
+        )
+        assert store.consume('ip', 2, 60, now=0) == pytest.approx(30)
+
+    @pytest.mark.parametrize('url', [SIGNUP_URL, TOKEN_URL])
+    @pytest.mark.parametrize('body', ['[1]', '"x"'])
+    def test_05_non_object_body(self, client, url, body):
+        response = client.post(url, body, content_type='application/json')
+        assert response.status_code == 400, (
+            'Проверьте, что тело запроса не-объектом отклоняется с 400.'
+        )
+
+    def test_06_forwarded_for_ignored(self, client, settings):
+        settings.AUTH_THROTTLE_RATES = {'signup': {'ip': '1/minute'}}
+        assert signup(client, 0).status_code == 200
+        response = signup(
+            client, 1, 'other@yamdb.fake', HTTP_X_FORWARDED_FOR='10.0.0.2'
+        )
+        assert response.status_code == 429, (
+            'Проверьте, что лимит по IP нельзя обойти заголовком '
+            'X-Forwarded-For.'
+        )
+
+    def test_07_memory_store_is_bounded(self):
+        from api.throttling import MemoryBucketStore
+
+        store = MemoryBucketStore(max_size=10)
+        store.consume('busy', 2, 60, now=0)
+        store.consume('busy', 2, 60, now=0)
+        for index in range(100):
+            store.consume_all(
+                [(f'ip{index}', 20, 60), (f'email{index}', 20, 60)], now=1
+            )
+            assert len(store.buckets) <= 10, (
+                'Проверьте, что хранилище в памяти не растёт больше max_size.'
+            )
+        assert store.consume('busy', 2, 60, now=1) == pytest.approx(29), (
+            'Проверьте, что вытесняются вёдра, ближайшие к наполнению.'
+        )
@@ -0,0 +1,96 @@
+import re
+
+import pytest
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+USER = {'username': 'reader', 'email': 'reader@yamdb.fake'}
+
+
+def signup_code(client):
+    mail.outbox.clear()
+    assert client.post(SIGNUP_URL, USER).status_code == 200
+    return re.search(r'<strong>(.+)</strong>', mail.outbox[-1].body)[1]
+
+
+def get_token(client, code):
+    return client.post(TOKEN_URL, {
+        'username': USER['username'], 'confirmation_code': code
+    })
+
+
+@pytest.mark.django_db(transaction=True)
+class Test31ConfirmationCodes:
+
+    def test_01_single_use(self, client):
+        code = signup_code(client)
+        with CaptureQueriesContext(connection) as context:
+            response = get_token(client, code)
+        assert response.status_code == 200
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        assert len(selects) == 1, (
+            'Проверьте, что код и пользователь проверяются одним запросом.'
+        )
+        assert get_token(client, code).status_code == 400, (
+            'Проверьте, что код подтверждения действует один раз.'
+        )
+
+    def test_02_stored_hashed_and_replaced(self, client):
+        from users.models import ConfirmationCode
+
+        old_code = signup_code(client)
+        stored = ConfirmationCode.objects.get()
+        assert old_code not in stored.code_hash, (
+            'Проверьте, что код хранится только в виде хеша.'
+        )
+        new_code = signup_code(client)
+        assert ConfirmationCode.objects.count() == 1
+        assert get_token(client, old_code).status_code == 400, (
+            'Проверьте, что новый код заменяет прежний.'
+        )
+        assert get_token(client, new_code).status_code == 200
+
+    def test_03_expired(self, client, settings):
+        settings.CONFIRMATION_CODE_TTL = 0
+        code = signup_code(client)
+        assert get_token(client, code).status_code == 400, (
+            'Проверьте, что просроченный код не принимается.'
+        )
+        assert client.post(TOKEN_URL, {
+            'username': 'unknown', 'confirmation_code': code
+        }).status_code == 404
+
+    def test_04_sent_code_not_kept(self, client, django_user_model,
+                                   settings):
+        from django.test import Client
+
+        from users.models import OutgoingEmail
+
+        code = signup_code(client)
+        email = OutgoingEmail.objects.get()
+        assert email.sent_at is not None
+        assert code not in email.message, (
+            'Проверьте, что после отправки текст письма с кодом стирается.'
+        )
+        settings.EMAIL_OUTBOX_EAGER = False
+        client.post(SIGNUP_URL, USER)
+        pending = OutgoingEmail.objects.get(sent_at__isnull=True)
+        admin_client = Client()
+        admin_client.force_login(django_user_model.objects.create_superuser(
+            username='superadmin', email='superadmin@yamdb.fake',
+            password='1234567'
+        ))
+        response = admin_client.get(
+            f'/admin/users/outgoingemail/{pending.pk}/change/'
+        )
+        assert response.status_code == 200
+        pending_code = re.search(r'<strong>(.+)</strong>', pending.message)[1]
+        assert pending_code not in response.content.decode(), (
+            'Проверьте, что текст письма не показывается в админке.'
+        )
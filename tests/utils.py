@@ -1,5 +1,9 @@
+from contextlib import contextmanager
 from http import HTTPStatus
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 
 check_name_and_slug_patterns = (
     (
@@ -305,3 +309,16 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f'данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не '
         'найдено или не является целым числом.'
     )
+
+
+@contextmanager
+def assert_max_queries(max_queries, url=''):
+    """Падает, если внутри блока выполнено больше `max_queries` запросов."""
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    executed = [query['sql'] for query in context.captured_queries]
+    assert len(executed) <= max_queries, (
+        f'Проверьте, что запрос к `{url}` выполняет не больше '
+        f'{max_queries} SQL-запросов. Сейчас их {len(executed)}:\n'
+        + '\n'.join(executed)
+    )